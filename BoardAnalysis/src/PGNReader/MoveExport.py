@@ -1,59 +1,263 @@
 from .game import Replay
+from .pgn import ReadGames
+from .writers import OpenWriter
+from .sampling import Sampler
+from .prefixtrie import PrefixTrie, BatchReplayer
+from .diagnostics import ErrorReport
+from .positioncache import PositionCache
+from .board import PackedFEN, packedSize
+from .checkpoint import ExportResumable
 import json
-import random
+import logging
 import os
 import pathlib
+import itertools
+import collections
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+
+logger = logging.getLogger(__name__)
+
+
+# Replayer and position cache of each worker process, kept between chunks so the games of every chunk share one
+# prefix trie and cache connection
+_workerReplayer = None
+_workerCache = None
+
+
+def _CacheLocation(positionCache):
+    '''File name and size bound of a PositionCache, which is how it is passed to worker processes.'''
+    return (positionCache.filename, positionCache.maxBytes) if positionCache != None else None
+
+
+def _ProcessChunk(games, sampler, prefixMemory=0, cacheLocation=None):
+    '''Worker task: process a chunk of PGNGames and return the json entries and the error report records.'''
+    global _workerReplayer, _workerCache
+    if prefixMemory and (_workerReplayer == None or _workerReplayer.trie.maxMemory != prefixMemory):
+        _workerReplayer = BatchReplayer(PrefixTrie(prefixMemory))
+    if cacheLocation != None and _CacheLocation(_workerCache) != cacheLocation:
+        _workerCache = PositionCache(*cacheLocation)
+    exporter = MoveExporter(sampler, replayer=_workerReplayer if prefixMemory else None,
+                            positionCache=_workerCache if cacheLocation != None else None)
+    entries = [entry for game in games for entry in exporter._SafeProcess(game)]
+    if cacheLocation != None:
+        _workerCache.Commit()
+    return entries, exporter.errors.records
+
 
 class MoveExporter:
+    def __init__(self, sampler=None, prefixMemory=0, replayer=None, errors=None, gameFilter=None,
+                 positionCache=None):
+        '''sampler (a sampling.Sampler) picks the exported plies, prefixMemory, replayer and positionCache choose
+        how games are replayed, errors collects the failures and gameFilter selects the games read from files.'''
+        self.sampler = sampler if sampler != None else Sampler()
+        self.gameFilter = gameFilter
+        self.prefixMemory = prefixMemory
+        self.errors = errors if errors != None else ErrorReport()
+        if replayer == None and prefixMemory:
+            replayer = BatchReplayer(PrefixTrie(prefixMemory))
+        if replayer != None:
+            replayer.errors = self.errors
+        self.replayer = replayer
+        self.positionCache = positionCache
+
     def ProcessGame(self, filename):
-        currentGame = Replay()
+        '''Processes the first game in a pgn file.'''
         gameDict = {}
 
-        try: 
-            currentGame.ReadFile(filename)
+        try:
+            for game in ReadGames(filename, self.gameFilter):
+                gameDict = self.ProcessPGNGame(game)
+                break
+        except Exception as e:
+            logger.warning("Error processing %s: %s", filename, e)
+            self.errors.Add('exception', message=filename + ": " + repr(e))
 
-            numMoves = currentGame.MoveCount()
+        return gameDict
 
-            if (numMoves -1) > 2:
-                randomMove = random.randint(2,numMoves-1)
-                currentGame.NextMove(randomMove)
+    def ProcessPGNGame(self, game):
+        '''Replays a PGNGame (see pgn.ReadGames) and returns the json entry for the first sampled position in the
+        game, or an empty dictionary if the game is too short.'''
+        entries = self.SampleGame(game)
+        return entries[0] if entries else {}
 
-                # Create the json entry
-                # Determine the current player, this assumes we start with white
-                # a better option would be to implement tracking in the board
-                player = "w" if (randomMove % 2) == 0 else "b"
-                gameDict["tags"] = currentGame._tags
-                gameDict["FEN"] = currentGame.board.ExportFEN(player)
-                gameDict["totalMoves"] = numMoves
-                gameDict["move"] = randomMove
+    def SampleGame(self, game):
+        '''Replays a PGNGame once and returns a json entry for every ply chosen by the sampler.'''
+        if self.positionCache != None:
+            return self._CachedSample(game)
 
-                if(currentGame.winner != None):
-                    gameDict["winner"] = currentGame.winner
-        except Exception as e:
-            print("Error: " + filename)
-            print(e)
+        if self.replayer != None:
+            numMoves = len(game.moves)
+            return [self._Entry(game, fen, numMoves, ply)
+                    for ply, fen in self.replayer.Positions(game, self.sampler.Plies(numMoves))]
+
+        # Only the sampled plies are needed, so play the moves lazily instead of creating every position
+        currentGame = Replay(lazy=True, errors=self.errors)
+        entries = []
+
+        currentGame.LoadGame(game)
+
+        numMoves = currentGame.MoveCount()
+
+        for ply in self.sampler.Plies(numMoves):
+            currentGame.NextMove(ply - currentGame.currentMove)
+            if currentGame.errorPly != None:
+                # A move could not be resolved, the positions from here on would be wrong
+                break
+
+            # The board tracks the side to move
+            entries.append(self._Entry(game, currentGame.board.ExportFEN(), numMoves, ply))
+
+        return entries
+
+    def _CachedSample(self, game):
+        '''SampleGame from the positions in the position cache, which replays the game if it is not cached.'''
+        positions, _ = self.positionCache.Positions(game, self.errors)
+        numMoves = len(game.moves)
+        lastPly = len(positions) // packedSize - 1
+        entries = []
+        for ply in self.sampler.Plies(numMoves):
+            if ply > lastPly:
+                # A move could not be resolved, there are no positions from here on
+                break
+            entries.append(self._Entry(game, PackedFEN(positions, ply*packedSize), numMoves, ply))
+        return entries
+
+    def _Entry(self, game, fen, numMoves, ply):
+        '''Create the json entry for a sampled position.'''
+        gameDict = {}
+        gameDict["tags"] = game.tags
+        gameDict["FEN"] = fen
+        gameDict["totalMoves"] = numMoves
+        gameDict["move"] = ply
+
+        if(game.winner != None):
+            gameDict["winner"] = game.winner
 
         return gameDict
 
-    def LoadGames(self, directory, outfile):
-        '''Loads all games in a directory, processes them, and exports a json file.'''
+    def _SafeProcess(self, game):
+        '''SampleGame that reports errors and returns no entries instead of raising.'''
+        try:
+            return self.SampleGame(game)
+        except Exception as e:
+            logger.warning("Error processing game %s: %s", game.tags, e)
+            self.errors.Add('exception', game.tags, message=repr(e))
+            return []
+
+    def ProcessFile(self, filename):
+        '''Generator that yields the json entry for every game in a pgn file.'''
+        for game in ReadGames(filename, self.gameFilter):
+            yield from self._SafeProcess(game)
+
+    def ProcessGames(self, games, workers=None, chunksize=64, ordered=True):
+        '''Generator that processes an iterable of PGNGames on a pool of worker processes and yields the json
+        entries. Games are submitted in chunks of chunksize games and at most two chunks per worker are in
+        flight, so the input is consumed lazily. If ordered is False, results are yielded as soon as a chunk
+        finishes instead of in input order. workers defaults to the number of CPUs. Each chunk gets its own
+        fork of the sampler, so a seeded sampler gives the same output whatever the worker scheduling.'''
+        workers = workers or os.cpu_count() or 1
+        games = iter(games)
+        pending = collections.deque()
+        chunkIndex = 0
+
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            while True:
+                # Keep the pool busy without reading the whole input
+                while len(pending) < 2*workers:
+                    chunk = list(itertools.islice(games, chunksize))
+                    if not chunk:
+                        break
+                    pending.append(pool.submit(_ProcessChunk, chunk, self.sampler.Fork(chunkIndex),
+                                               self.prefixMemory, _CacheLocation(self.positionCache)))
+                    chunkIndex += 1
+
+                if not pending:
+                    break
 
-        gameList = []
+                if ordered:
+                    yield from self._Collect(pending.popleft())
+                else:
+                    done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        pending.remove(future)
+                        yield from self._Collect(future)
+
+    def _Collect(self, future):
+        '''Entries of a finished chunk, its errors are added to the exporter's report.'''
+        entries, errors = future.result()
+        self.errors.Extend(errors)
+        return entries
+
+    def _Process(self, games, workers, chunksize, ordered):
+        '''Serial processing for workers=1, the process pool otherwise.'''
+        if workers == 1:
+            return self._ProcessSerial(games, chunksize)
+        return self.ProcessGames(games, workers, chunksize, ordered)
+
+    def _ProcessSerial(self, games, chunksize):
+        '''Serial counterpart of ProcessGames. Chunks use the same sampler forks, so a seeded run gives the same
+        entries with or without the pool.'''
+        games = iter(games)
+        chunkIndex = 0
+        while True:
+            chunk = list(itertools.islice(games, chunksize))
+            if not chunk:
+                break
+            exporter = MoveExporter(self.sampler.Fork(chunkIndex), replayer=self.replayer, errors=self.errors,
+                                    positionCache=self.positionCache)
+            for game in chunk:
+                yield from exporter._SafeProcess(game)
+            if self.positionCache != None:
+                self.positionCache.Commit()
+            chunkIndex += 1
+
+    def _Write(self, entries, outfile, format):
+        '''Write the entries to outfile. json writes a single list, ndjson and binary stream the entries as
+        they are produced (see writers), columnar appends shards to the dataset directory outfile (see
+        dataset).'''
+        if format == 'json':
+            # save the list as a JSON file
+            jsonString = json.dumps(list(entries),indent=4)
+
+            with open(outfile, "w") as out:
+                out.write(jsonString)
+            return
+
+        with OpenWriter(outfile, format) as writer:
+            for entry in entries:
+                writer.Write(entry)
+
+    def LoadGames(self, directory, outfile, workers=1, chunksize=64, ordered=True, format='json', errorReport=None):
+        '''Loads all games in a directory, processes them, and exports a json file. Set workers to process the
+        games in parallel (None uses every CPU), see ProcessGames. format is json, ndjson, binary or columnar.
+        errorReport is a file name for the NDJSON report of the games that could not be replayed.'''
 
         # Check whether the directory is valid
         if(not os.path.exists(directory) or not os.path.isdir(directory)):
-            print("The directory either doesn't exist or is not a directory.")
+            logger.error("The directory %s either doesn't exist or is not a directory.", directory)
             return
 
-        # for each file in directory, process the game and add to the list
-        for currentFile in os.listdir(directory):
-            if os.path.isfile(directory + '/' + currentFile) and pathlib.Path(currentFile).suffix == '.pgn':
-                newGame = self.ProcessGame(directory + '/' + currentFile)
-                if newGame != {}:
-                    gameList.append(newGame)
+        # for each file in directory, process the games and add to the list
+        pgnFiles = [directory + '/' + currentFile for currentFile in sorted(os.listdir(directory))
+                    if os.path.isfile(directory + '/' + currentFile) and pathlib.Path(currentFile).suffix == '.pgn']
+        games = itertools.chain.from_iterable(ReadGames(pgnFile, self.gameFilter) for pgnFile in pgnFiles)
+        self._Write(self._Process(games, workers, chunksize, ordered), outfile, format)
+        self._WriteErrors(errorReport)
+
+    def LoadPGN(self, filename, outfile, workers=1, chunksize=64, ordered=True, format='json', errorReport=None):
+        '''Processes every game in a single (multi-game) pgn file and exports it in format.'''
+        self._Write(self._Process(ReadGames(filename, self.gameFilter), workers, chunksize, ordered), outfile, format)
+        self._WriteErrors(errorReport)
 
-        # save the list as a JSON file
-        jsonString = json.dumps(gameList,indent=4)
+    def LoadGamesResumable(self, directory, outputDirectory, format='ndjson', shardGames=10000, workers=1,
+                           chunksize=64):
+        '''LoadGames that writes a shard of output every shardGames games to outputDirectory together with a
+        checkpoint manifest. If the run is interrupted, calling it again with the same arguments skips the
+        finished shards and continues from the last one (see checkpoint). Returns the checkpoint.Checkpoint.'''
+        return ExportResumable(self, directory, outputDirectory, format, shardGames, workers, chunksize)
 
-        with open(outfile, "w") as out:
-            out.write(jsonString)
\ No newline at end of file
+    def _WriteErrors(self, errorReport):
+        if self.errors:
+            logger.info("%d games could not be fully replayed: %s", len(self.errors), self.errors.Counts())
+        if errorReport != None:
+            self.errors.Write(errorReport)
@@ -1,6 +1,18 @@
 from .board import Board
 from .game import Replay
 from .search import Search
+from .pgn import ReadGames, PGNGame
+from .gameindex import GameIndex, BuildIndex
+from .filters import GameFilter
+from .writers import NDJSONWriter, BinaryWriter, ReadNDJSON, ReadBinary, OpenWriter
+from .positionindex import PositionIndex
+from .positioncache import PositionCache
+from .movegen import GenerateMoves, Perft
+from .sampling import Sampler
+from .prefixtrie import PrefixTrie, BatchReplayer
+from .packedgames import PackedGames
 from .test import *
 from .MoveExport import MoveExporter
+from .pipeline import Pipeline, RunPipeline
+from .diagnostics import ErrorReport, EnableLogging
 #from .game import Game
@@ -0,0 +1,127 @@
+"""Precomputed attack tables. The tables are built once when the module is imported.
+
+Squares are indexed 0-63 starting at a1 (same layout as Board). Sliding piece attacks are looked up by
+occupancy: each square has a mask of the relevant blocker squares (edges excluded), and a table that maps
+every blocker arrangement inside that mask to the attacked squares. This is the same idea as the C#
+PrecomputedMagics/MagicHelper, except that a dict keyed on the masked occupancy takes the place of the
+magic multiply and shift.
+"""
+
+rookDirections = [(1,0),(-1,0),(0,1),(0,-1)]
+bishopDirections = [(1,1),(-1,-1),(1,-1),(-1,1)]
+knightOffsets = [(-2,-1),(-2,1),(-1,2),(1,2),(2,1),(2,-1),(-1,-2),(1,-2)]
+kingOffsets = [(-1,-1),(-1,1),(1,-1),(1,1),(1,0),(-1,0),(0,1),(0,-1)]
+
+
+def _OffsetMask(square, offsets):
+    """Bitboard of the squares reachable from square by a single step of each offset."""
+    file, rank = square & 7, square >> 3
+    mask = 0
+    for fileOffset, rankOffset in offsets:
+        newFile, newRank = file + fileOffset, rank + rankOffset
+        if 0 <= newFile < 8 and 0 <= newRank < 8:
+            mask |= 1 << (newRank*8 + newFile)
+    return mask
+
+
+def _RayAttacks(square, directions, occupancy):
+    """Walk each direction until the edge of the board or the first blocker (the blocker is included)."""
+    file, rank = square & 7, square >> 3
+    attacks = 0
+    for fileDirection, rankDirection in directions:
+        newFile, newRank = file + fileDirection, rank + rankDirection
+        while 0 <= newFile < 8 and 0 <= newRank < 8:
+            bit = 1 << (newRank*8 + newFile)
+            attacks |= bit
+            if occupancy & bit:
+                break
+            newFile += fileDirection
+            newRank += rankDirection
+    return attacks
+
+
+def _BlockerMask(square, directions):
+    """Squares whose occupancy can change the attacks from square. The last square of each ray is excluded
+    because a piece there does not block anything."""
+    file, rank = square & 7, square >> 3
+    mask = 0
+    for fileDirection, rankDirection in directions:
+        newFile, newRank = file + fileDirection, rank + rankDirection
+        while 0 <= newFile + fileDirection < 8 and 0 <= newRank + rankDirection < 8:
+            mask |= 1 << (newRank*8 + newFile)
+            newFile += fileDirection
+            newRank += rankDirection
+    return mask
+
+
+def _SlidingTable(square, directions, mask):
+    """Map every subset of mask to the attacks for that blocker arrangement."""
+    table = {}
+    subset = 0
+    while True:
+        table[subset] = _RayAttacks(square, directions, subset)
+        # Carry-rippler trick to enumerate all subsets of the mask
+        subset = (subset - mask) & mask
+        if subset == 0:
+            break
+    return table
+
+
+knightAttacks = [_OffsetMask(square, knightOffsets) for square in range(64)]
+kingAttacks = [_OffsetMask(square, kingOffsets) for square in range(64)]
+
+# pawnAttacks[0] are the squares attacked by a white pawn, pawnAttacks[1] by a black pawn
+pawnAttacks = [[_OffsetMask(square, [(-1,1),(1,1)]) for square in range(64)],
+               [_OffsetMask(square, [(-1,-1),(1,-1)]) for square in range(64)]]
+
+rookMasks = [_BlockerMask(square, rookDirections) for square in range(64)]
+bishopMasks = [_BlockerMask(square, bishopDirections) for square in range(64)]
+
+rookTables = [_SlidingTable(square, rookDirections, rookMasks[square]) for square in range(64)]
+bishopTables = [_SlidingTable(square, bishopDirections, bishopMasks[square]) for square in range(64)]
+
+
+def _Between(start, end):
+    """Squares strictly between start and end if they share a rank, file or diagonal, otherwise 0."""
+    fileStep = (end & 7) - (start & 7)
+    rankStep = (end >> 3) - (start >> 3)
+    if start == end or (fileStep != 0 and rankStep != 0 and abs(fileStep) != abs(rankStep)):
+        return 0
+
+    fileStep = (fileStep > 0) - (fileStep < 0)
+    rankStep = (rankStep > 0) - (rankStep < 0)
+    step = rankStep*8 + fileStep
+    mask = 0
+    square = start + step
+    while square != end:
+        mask |= 1 << square
+        square += step
+    return mask
+
+
+# betweenSquares[a][b] is used for check blocking and pin rays
+betweenSquares = [[_Between(start, end) for end in range(64)] for start in range(64)]
+
+
+def RookAttacks(square, occupancy):
+    return rookTables[square][occupancy & rookMasks[square]]
+
+
+def BishopAttacks(square, occupancy):
+    return bishopTables[square][occupancy & bishopMasks[square]]
+
+
+def QueenAttacks(square, occupancy):
+    return rookTables[square][occupancy & rookMasks[square]] | bishopTables[square][occupancy & bishopMasks[square]]
+
+
+def PawnAttacks(square, color):
+    return pawnAttacks[0 if color == 'w' else 1][square]
+
+
+def Squares(bitboard):
+    """Generator over the square indices set in bitboard, lowest square first."""
+    while bitboard:
+        lowestBit = bitboard & -bitboard
+        yield lowestBit.bit_length() - 1
+        bitboard ^= lowestBit
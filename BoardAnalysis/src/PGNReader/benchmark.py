@@ -0,0 +1,255 @@
+"""Benchmark suite for the PGN pipeline.
+
+Measures FEN decoding and encoding (positions/s), SAN resolution with Search.GetMove (moves/s), replaying games
+with Replay (games/s) and end-to-end MoveExporter.LoadGames (games/s). The default corpus is a synthetic set of
+random legal games generated from a fixed seed, so every run measures the same work; --corpus uses a directory
+of PGN files instead. Each benchmark is repeated and the fastest run is kept.
+
+Results are written as JSON. --compare checks them against a baseline result file and flags every benchmark
+that got slower by more than the threshold (the exit code is 1 if there are any regressions). Run with:
+
+    python -m PGNReader.benchmark [--games N] [--output FILE] [--compare BASELINE] [--threshold 0.1]
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import tempfile
+import time
+from . import board as boardModule
+from .board import Board, startFEN, SetFENCacheSize
+from .game import Replay, PlayMoves
+from .movegen import GenerateMoves, InCheck
+from .MoveExport import MoveExporter
+from .pgn import ReadGames
+from .sampling import Sampler
+from .search import Search, MoveToSAN
+
+resultVersion = 1
+
+
+def RandomGame(rng, maxPlies=120):
+    """Play random legal moves from the start position. Returns the SAN moves and the result."""
+    board = Board()
+    moves = []
+    for _ in range(maxPlies):
+        legalMoves = GenerateMoves(board)
+        if not legalMoves:
+            if InCheck(board):
+                return moves, '0-1' if board.SideToMove() == 'w' else '1-0'
+            return moves, '1/2-1/2'
+        move = rng.choice(legalMoves)
+        moves.append(MoveToSAN(board, move, legalMoves))
+        board.MakeMove(*move)
+    return moves, '*'
+
+
+def WriteCorpus(directory, games=200, seed=1, files=4, maxPlies=120):
+    """Write a synthetic corpus of random games to files .pgn files in directory. The same seed always writes
+    the same games. Returns the file names."""
+    rng = random.Random(seed)
+    os.makedirs(directory, exist_ok=True)
+    fileNames = []
+    for fileNumber in range(files):
+        fileName = os.path.join(directory, 'synthetic' + str(fileNumber) + '.pgn')
+        with open(fileName, "w") as pgnFile:
+            for gameNumber in range(fileNumber, games, files):
+                moves, result = RandomGame(rng, maxPlies)
+                tags = [('Event', 'Synthetic'), ('Site', 'benchmark'), ('Round', str(gameNumber + 1)),
+                        ('White', 'Random'), ('Black', 'Random'), ('Result', result),
+                        ('WhiteElo', str(rng.randint(1000, 2800))), ('BlackElo', str(rng.randint(1000, 2800)))]
+                pgnFile.write(''.join('[' + name + ' "' + value + '"]\n' for name, value in tags) + '\n')
+                movetext = ' '.join((str(ply//2 + 1) + '. ' if ply % 2 == 0 else '') + move
+                                    for ply, move in enumerate(moves))
+                pgnFile.write(movetext + ' ' + result + '\n\n')
+        fileNames.append(fileName)
+    return fileNames
+
+
+def _Best(function, repeat):
+    """Run function repeat times and return (fastest seconds, result of that run)."""
+    best = None
+    for _ in range(repeat):
+        seconds, count = function()
+        if best == None or seconds < best[0]:
+            best = (seconds, count)
+    return best
+
+
+def _Result(unit, seconds, count):
+    return {"unit": unit, "count": count, "seconds": seconds, "rate": count / seconds if seconds > 0 else 0.0}
+
+
+def _Positions(games):
+    """Every FEN of the games, replayed with the move generator's SAN resolution."""
+    fens = []
+    for game in games:
+        board = Board(game.tags.get('FEN', startFEN))
+        fens.append(board.ExportFEN())
+        for _ in PlayMoves(board, game.moves):
+            fens.append(board.ExportFEN())
+    return fens
+
+
+def BenchmarkFEN(fens, repeat=3):
+    """SetFEN without the decode cache, SetFEN with a warm cache and ExportFEN."""
+    board = Board()
+
+    def Decode():
+        started = time.perf_counter()
+        for fen in fens:
+            board.SetFEN(fen)
+        return time.perf_counter() - started, len(fens)
+
+    results = {}
+    cacheSize = boardModule.fenCacheSize
+    try:
+        SetFENCacheSize(0)
+        results["setFEN"] = _Result("positions", *_Best(Decode, repeat))
+        SetFENCacheSize(max(cacheSize, len(fens)))
+        Decode()
+        results["setFENCached"] = _Result("positions", *_Best(Decode, repeat))
+    finally:
+        SetFENCacheSize(cacheSize)
+
+    boards = [Board(fen) for fen in fens]
+
+    def Export():
+        started = time.perf_counter()
+        for position in boards:
+            position.ExportFEN()
+        return time.perf_counter() - started, len(boards)
+
+    results["exportFEN"] = _Result("positions", *_Best(Export, repeat))
+    return results
+
+
+def BenchmarkSAN(games, repeat=3):
+    """Search.GetMove for every move of the games. Only the GetMove calls are timed."""
+    def Run():
+        elapsed = 0.0
+        count = 0
+        perfCounter = time.perf_counter
+        for game in games:
+            board = Board(game.tags.get('FEN', startFEN))
+            search = Search(board)
+            for move in game.moves:
+                started = perfCounter()
+                result = search.GetMove(move)
+                elapsed += perfCounter() - started
+                if result == None:
+                    break
+                count += 1
+                board.MovePiece(*result)
+        return elapsed, count
+
+    return {"getMove": _Result("moves", *_Best(Run, repeat))}
+
+
+def BenchmarkReplay(pgnFiles, repeat=3):
+    """Replay every game of the files the way Replay.ReadFile does for the first one: ReadGames then
+    Replay.LoadGame, so reading and parsing are included."""
+    def Run():
+        started = time.perf_counter()
+        count = 0
+        for pgnFile in pgnFiles:
+            for game in ReadGames(pgnFile):
+                Replay().LoadGame(game)
+                count += 1
+        return time.perf_counter() - started, count
+
+    return {"replay": _Result("games", *_Best(Run, repeat))}
+
+
+def BenchmarkExport(directory, games, repeat=3, workers=1, format='ndjson'):
+    """MoveExporter.LoadGames over the corpus directory with a seeded sampler."""
+    with tempfile.TemporaryDirectory() as outputDirectory:
+        outfile = os.path.join(outputDirectory, 'export.' + format)
+
+        def Run():
+            started = time.perf_counter()
+            MoveExporter(Sampler('nth', seed=1)).LoadGames(directory, outfile, workers=workers, format=format)
+            return time.perf_counter() - started, games
+
+        return {"loadGames": _Result("games", *_Best(Run, repeat))}
+
+
+def RunBenchmarks(directory, repeat=3, workers=1):
+    """Run every benchmark over the PGN files in directory. Returns the benchmark results by name."""
+    pgnFiles = sorted(os.path.join(directory, name) for name in os.listdir(directory) if name.endswith('.pgn'))
+    games = [game for pgnFile in pgnFiles for game in ReadGames(pgnFile)]
+
+    results = {}
+    results.update(BenchmarkFEN(_Positions(games), repeat))
+    results.update(BenchmarkSAN(games, repeat))
+    results.update(BenchmarkReplay(pgnFiles, repeat))
+    results.update(BenchmarkExport(directory, len(games), repeat, workers))
+    return results
+
+
+def Compare(results, baseline, threshold=0.1):
+    """Compare the rates of two result files. Returns (name, baseline rate, rate, change) for every benchmark
+    in both and the names of the ones that are more than threshold (a fraction) slower."""
+    rows = []
+    regressions = []
+    for name, result in results["benchmarks"].items():
+        previous = baseline["benchmarks"].get(name)
+        if previous == None or previous["rate"] <= 0:
+            continue
+        change = result["rate"] / previous["rate"] - 1
+        rows.append((name, previous["rate"], result["rate"], change))
+        if change < -threshold:
+            regressions.append(name)
+    return rows, regressions
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(description="PGN pipeline benchmarks.")
+    parser.add_argument("--corpus", default=None, help="directory of PGN files (default: a synthetic corpus)")
+    parser.add_argument("--games", type=int, default=200, help="number of synthetic games")
+    parser.add_argument("--seed", type=int, default=1, help="seed of the synthetic corpus")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per benchmark, the fastest is kept")
+    parser.add_argument("--workers", type=int, default=1, help="workers for the LoadGames benchmark")
+    parser.add_argument("--output", default=None, help="write the results to this JSON file")
+    parser.add_argument("--compare", default=None, help="baseline JSON file to compare against")
+    parser.add_argument("--threshold", type=float, default=0.1, help="slowdown that counts as a regression")
+    options = parser.parse_args(args)
+
+    settings = {"games": options.games, "seed": options.seed, "repeat": options.repeat, "workers": options.workers,
+                "corpus": options.corpus or "synthetic"}
+    if options.corpus:
+        benchmarks = RunBenchmarks(options.corpus, options.repeat, options.workers)
+    else:
+        with tempfile.TemporaryDirectory() as corpus:
+            WriteCorpus(corpus, options.games, options.seed)
+            benchmarks = RunBenchmarks(corpus, options.repeat, options.workers)
+
+    results = {"version": resultVersion, "time": time.strftime('%Y-%m-%dT%H:%M:%S'),
+               "python": platform.python_version(), "machine": platform.machine(), "settings": settings,
+               "benchmarks": benchmarks}
+
+    for name, result in benchmarks.items():
+        print(format(name, '14') + format(result["rate"], '>14.1f') + ' ' + result["unit"] + '/s  (' +
+              str(result["count"]) + ' in ' + format(result["seconds"], '.3f') + 's)')
+
+    if options.output:
+        with open(options.output, "w") as outputFile:
+            json.dump(results, outputFile, indent=4)
+
+    if options.compare:
+        with open(options.compare, "r") as baselineFile:
+            baseline = json.load(baselineFile)
+        if baseline.get("settings") != settings:
+            print("Warning: baseline was run with different settings " + str(baseline.get("settings")))
+        rows, regressions = Compare(results, baseline, options.threshold)
+        for name, previous, rate, change in rows:
+            print(format(name, '14') + format(previous, '>14.1f') + format(rate, '>14.1f') +
+                  format(100*change, '>+9.1f') + '%' + ('  REGRESSION' if name in regressions else ''))
+        return 1 if regressions else 0
+
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -1,116 +1,250 @@
-import re
+import functools
+import logging
+import struct
+from array import array
+from .zobrist import pieceKeys, castleKeys, epFileKeys, sideKey, ComputeKey
+
+
+# Piece codes used by the mailbox. 0 is an empty square, 1-6 are the white pieces and 7-12 the black pieces.
+# The bitboard for a piece code is stored at index code-1.
+pieceCodes = '.PNBRQKpnbrqk'
+pieceIndex = {piece: code for code, piece in enumerate(pieceCodes) if piece != '.'}
+
+# Castling rights are stored as a four bit mask
+whiteKingCastle = 1
+whiteQueenCastle = 2
+blackKingCastle = 4
+blackQueenCastle = 8
+
+# Castling rights that survive a move from or to each square
+castleMasks = [15]*64
+castleMasks[0] = 15 & ~whiteQueenCastle
+castleMasks[4] = 15 & ~(whiteKingCastle | whiteQueenCastle)
+castleMasks[7] = 15 & ~whiteKingCastle
+castleMasks[56] = 15 & ~blackQueenCastle
+castleMasks[60] = 15 & ~(blackKingCastle | blackQueenCastle)
+castleMasks[63] = 15 & ~blackKingCastle
+
+# Move flags, the same values as the C# Framework/Chess/Board/Move.cs
+noFlag = 0
+enPassantFlag = 1
+castleFlag = 2
+pawnTwoUpFlag = 3
+promoteToQueenFlag = 4
+promoteToKnightFlag = 5
+promoteToRookFlag = 6
+promoteToBishopFlag = 7
+
+# Packed 16 bit move, the same layout as Move.cs (ffffttttttssssss): bits 0-5 the start square, bits 6-11 the
+# end square and bits 12-15 the flag. No legal move packs to 0, which is the null move.
+nullMove = 0
+
+promotionFlags = {'Q': promoteToQueenFlag, 'N': promoteToKnightFlag, 'R': promoteToRookFlag, 'B': promoteToBishopFlag}
+# White piece code for each promotion flag
+promotionCodes = {promoteToQueenFlag: 5, promoteToKnightFlag: 2, promoteToRookFlag: 4, promoteToBishopFlag: 3}
+
+allFiles = ['a','b','c','d','e','f','g','h']
+
+startFEN = 'rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1'
+
+# Square lookups. Squares are indexed 0-63 starting with a1 (0), b1 (1), ... h8 (63).
+squareIndex = {(allFiles[sq & 7], (sq >> 3) + 1): sq for sq in range(64)}
+squarePosition = [(allFiles[sq & 7], (sq >> 3) + 1) for sq in range(64)]
+squareNames = [allFiles[sq & 7] + str((sq >> 3) + 1) for sq in range(64)]
+
+# Packed position: 32 bytes of 4 bit piece codes (two squares per byte, a1 first), a flags byte (bit 0 set when
+# black is to move, bits 1-4 castling rights), the en passant square (255 if none), then the half and full move
+# counters.
+packedFormat = struct.Struct('<32sBBHH')
+packedSize = packedFormat.size
+
+
+# FEN tables. Placement characters map to a piece code, a negative number of empty squares, or 0 for the rank
+# separator. Encoding translates the mailbox to piece characters ('.' for empty) and then replaces runs of dots.
+_placementValues = dict(pieceIndex, **{str(count): -count for count in range(1, 9)}, **{'/': 0})
+_placementTable = bytes.maketrans(bytes(range(13)), pieceCodes.encode())
+_emptyRuns = [(b'.'*count, str(count).encode()) for count in range(8, 0, -1)]
+_castleStrings = [''.join(character for bit, character in ((whiteKingCastle, 'K'), (whiteQueenCastle, 'Q'),
+                                                           (blackKingCastle, 'k'), (blackQueenCastle, 'q'))
+                          if rights & bit) or '-' for rights in range(16)]
+_castleValues = {'K': whiteKingCastle, 'Q': whiteQueenCastle, 'k': blackKingCastle, 'q': blackQueenCastle, '-': 0}
+_epSquares = {name: square for square, name in enumerate(squareNames)}
+_epSquares['-'] = -1
+# Piece codes of the even and odd squares of a packed byte
+_lowNibbles = bytes(value & 15 for value in range(256))
+_highNibbles = bytes(value >> 4 for value in range(256))
+
+fenCacheSize = 4096
+
+logger = logging.getLogger(__name__)
+
+
+def DecodeFEN(fen):
+    """Decode a FEN string in a single pass. Returns (mailbox, bitboards, currentPlayer, castle, ep, halfmoves,
+    fullmoves, key) with the mailbox as bytes and the bitboards as a tuple, or None if the FEN is malformed.
+    Missing fields default to white to move, no castling, no en passant, 0 and 1."""
+    fields = fen.split()
+    if not fields:
+        return None
+
+    mailbox = bytearray(64)
+    bitboards = [0]*12
+    rankStart = square = 56
+    for character in fields[0]:
+        value = _placementValues.get(character)
+        if value == None:
+            return None
+        if value > 0:
+            if square >= rankStart + 8:
+                return None
+            mailbox[square] = value
+            bitboards[value-1] |= 1 << square
+            square += 1
+        elif value < 0:
+            square -= value
+            if square > rankStart + 8:
+                return None
+        else:
+            if square != rankStart + 8 or rankStart == 0:
+                return None
+            rankStart -= 8
+            square = rankStart
+    if rankStart != 0 or square != 8:
+        return None
+
+    currentPlayer = fields[1] if len(fields) > 1 else 'w'
+    castle = 0
+    ep = -1
+    try:
+        if currentPlayer not in ('w', 'b'):
+            return None
+        if len(fields) > 2:
+            for character in fields[2]:
+                castle |= _castleValues[character]
+        if len(fields) > 3:
+            ep = _epSquares[fields[3]]
+        halfmoves = int(fields[4]) if len(fields) > 4 else 0
+        fullmoves = int(fields[5]) if len(fields) > 5 else 1
+    except (KeyError, ValueError):
+        return None
+
+    return bytes(mailbox), tuple(bitboards), currentPlayer, castle, ep, halfmoves, fullmoves, \
+        ComputeKey(mailbox, currentPlayer == 'b', castle, ep)
+
+
+def EncodeFEN(mailbox, currentPlayer, castle, ep, halfmoves, fullmoves):
+    """Encode a position as a FEN string. mailbox holds 64 piece codes, a1 first."""
+    text = mailbox.translate(_placementTable)
+    placement = b'/'.join([text[56:64], text[48:56], text[40:48], text[32:40], text[24:32], text[16:24],
+                           text[8:16], text[0:8]])
+    for run, digit in _emptyRuns:
+        placement = placement.replace(run, digit)
+
+    return placement.decode() + " " + currentPlayer + " " + _castleStrings[castle] + " " + \
+        (squareNames[ep] if ep >= 0 else '-') + " " + str(halfmoves) + " " + str(fullmoves)
+
+
+def PackMove(startSquare, endSquare, flag=noFlag):
+    """Pack a move into 16 bits, see nullMove."""
+    return startSquare | (endSquare << 6) | (flag << 12)
+
+
+def UnpackMove(move):
+    """(startSquare, endSquare, flag) of a packed move."""
+    return move & 63, (move >> 6) & 63, move >> 12
+
+
+def PackedFEN(data, offset=0):
+    """FEN of a position packed by Board.Pack, read from data at offset, without setting up a board."""
+    squares, flags, ep, halfmoves, fullmoves = packedFormat.unpack_from(data, offset)
+    mailbox = bytearray(64)
+    mailbox[0::2] = squares.translate(_lowNibbles)
+    mailbox[1::2] = squares.translate(_highNibbles)
+    return EncodeFEN(mailbox, 'b' if flags & 1 else 'w', flags >> 1, -1 if ep == 255 else ep, halfmoves, fullmoves)
+
+
+def SetFENCacheSize(size):
+    """Set how many decoded FENs Board.SetFEN keeps (least recently used are dropped). 0 turns the cache off."""
+    global CachedDecodeFEN, fenCacheSize
+    fenCacheSize = size
+    CachedDecodeFEN = functools.lru_cache(maxsize=size)(DecodeFEN) if size > 0 else DecodeFEN
+
+
+CachedDecodeFEN = functools.lru_cache(maxsize=fenCacheSize)(DecodeFEN)
 
 
 class Board:
-    """Class to manage the chess board."""
+    """Class to manage the chess board. The position is stored as twelve bitboards (one per piece) plus a 64 byte
+    mailbox so that lookups by square and by piece are both cheap."""
+
+    __slots__ = ('_bitboards', '_mailbox', '_currentPlayer', '_castle', '_ep', '_halfmoves', '_fullmoves', '_undo',
+                 '_key')
 
-    allFiles = ['a','b','c','d','e','f','g','h']
+    allFiles = allFiles
 
-    def __init__(self, inputFen='rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1'):
+    def __init__(self, inputFen=startFEN):
         """Initialize the chess board. Takes one parameter (in FEN) that sets the board. If no parameter is passed,
         the board is initialized to the starting position."""
         self.SetFEN(inputFen)
 
     def SetFEN(self, inputFen):
-        fenElements = re.split('\s',inputFen)
-        if len(fenElements) == 0:
-            print("Improper format.")
-            return None
-
-        self._fen = re.findall("[a-zA-Z1-8]+",fenElements[0])
-        # Check whether the board is in the correct format.
-        if not self._CheckFenInput():
-            print("Improper format")
-            return None
-
-        # Create a blank board
-        self._board = []*8
-
-        # create the board
-        for currentRow in self._ReadRow():
-            self._board.append(currentRow)
-        
-        if len(fenElements) > 1:
-            self._currentPlayer = fenElements[1]
-
-        if len(fenElements) > 2:
-            self._castle = {'whiteKing': False, 'whiteQueen': False, 'blackKing':False, 'blackQueen':False}
-            for character in fenElements[2]:
-                if character == 'K':
-                    self._castle['whiteKing'] = True
-                elif character == 'Q':
-                    self._castle['whiteQueen'] = True
-                elif character == 'k':
-                    self._castle['blackKing'] = True
-                elif character == 'q':
-                    self._castle['blackQueen'] = True
-
-        # En passant
-        if len(fenElements) > 3:
-            self._ep = fenElements[3]
-
-        # Half moves
-        if len(fenElements) > 4:
-            self._halfmoves = int(fenElements[4])
-
-        # Full moves
-        if len(fenElements) > 5:
-            self._fullmoves = int(fenElements[5])
-
-    def _CheckFenInput(self):
-        """Checks whether FEN input is properly formatted. 
-        Returns true if properly formatted and false otherwise"""
-
-        if len(self._fen) != 8:
+        """Set the position from a FEN string. Returns False, leaving the board unchanged, if the FEN is
+        malformed."""
+        state = CachedDecodeFEN(inputFen)
+        if state == None:
+            logger.warning("Improper FEN %r", inputFen)
             return False
 
-        for row in self._fen:
-            count = 0
-            for element in row:
-                if str.isalpha(element):
-                    count += 1
-                elif str.isnumeric(element):
-                    count += int(element)
-            
-            if count != 8:
-                return False
-        
+        mailbox, bitboards, self._currentPlayer, self._castle, self._ep, self._halfmoves, self._fullmoves, \
+            self._key = state
+        self._mailbox = bytearray(mailbox)
+        self._bitboards = array('Q', bitboards)
+        self._undo = []
         return True
 
-    def _ReadRow(self):
-        """Generator to read next row in self._fen"""
-        currRank = 7
-
-        while currRank >= 0:
-            row = []
-            position = 0
-            while (position < len(self._fen[currRank])):
-                nextElemetn = self._fen[position]
-                if str.isnumeric(self._fen[currRank][position]):
-                    for _ in range(int(self._fen[currRank][position])):
-                        row.append('.')
-                else:
-                    row.append(self._fen[currRank][position])
-                position += 1
-            yield row
-
-            currRank -= 1
-    
+    def _PutPiece(self, square, code):
+        """Place piece code on an empty square."""
+        self._mailbox[square] = code
+        self._bitboards[code-1] |= 1 << square
+        self._key ^= pieceKeys[code][square]
+
+    def _RemovePiece(self, square):
+        """Remove whatever is on square and return its piece code (0 if the square was empty)."""
+        code = self._mailbox[square]
+        if code:
+            self._mailbox[square] = 0
+            self._bitboards[code-1] ^= 1 << square
+            self._key ^= pieceKeys[code][square]
+        return code
+
     def _ConvertPosition(self,position):
         """Converts tuple input (e.g., (a,1)) into file, rank positions."""
-        # Convert file to number
-        if not(position[0] in self.allFiles):
-            file = None
-        else:
-            file = self.allFiles.index(position[0])
+        square = squareIndex.get(position)
+        if square == None:
+            # Report which half of the position is invalid
+            file = self.allFiles.index(position[0]) if position[0] in self.allFiles else None
+            rank = position[1]-1 if position[1] in range(1,9) else None
+            return file, rank
+
+        return square & 7, square >> 3
+
+    def Occupancy(self, color=None):
+        """Bitboard of all occupied squares, or of the squares occupied by color ('w' or 'b')."""
+        bitboards = self._bitboards
+        if color == 'w':
+            return bitboards[0] | bitboards[1] | bitboards[2] | bitboards[3] | bitboards[4] | bitboards[5]
+        elif color == 'b':
+            return bitboards[6] | bitboards[7] | bitboards[8] | bitboards[9] | bitboards[10] | bitboards[11]
+
+        occupancy = 0
+        for bitboard in bitboards:
+            occupancy |= bitboard
+        return occupancy
+
+    def PieceBitboard(self, piece):
+        """Bitboard for a piece given as a FEN character (e.g., 'N' or 'q')."""
+        return self._bitboards[pieceIndex[piece]-1]
 
-        if position[1] < 1 or position[1]>8:
-            rank = None
-        else:
-            rank = position[1]-1
-
-        return file, rank
-    
     def __str__(self):
         output = str()
 
@@ -118,7 +252,7 @@ class Board:
         for rank in range(8):
             output += str(8-rank) + " + "
             for file in range(8):
-                output += self._board[7-rank][file] + ' '            
+                output += pieceCodes[self._mailbox[(7-rank)*8 + file]] + ' '
             output += '+\n'
         output += '  +'+'-'*17+'+\n'
         output += '    a b c d e f g h\n'
@@ -128,151 +262,210 @@ class Board:
     def PrintBoard(self):
         """Print the current board."""
         print(self)
-    
+
     def GetPiece(self,position):
         """Get the piece at a particular position. The input is a tuple with (file,rank). Example (a,1)"""
-        file, rank = self._ConvertPosition(position)
+        square = squareIndex.get(position)
 
-        if file == None or rank == None:
+        if square == None:
             return None
 
-        piece = self._board[rank][file]
+        code = self._mailbox[square]
 
-        if piece == '.':
-            piece = None
+        if code == 0:
+            return None
 
-        return piece
+        return pieceCodes[code]
 
     def GetColor(self,position):
         """Get the color of a piece at position."""
+        square = squareIndex.get(position)
 
-        # Get the piece at the position
-        piece = self.GetPiece(position)
+        if square == None:
+            return None
+
+        code = self._mailbox[square]
 
-        if piece == None:
+        if code == 0:
             return None
 
-        if str.upper(piece) == piece:
-            return 'w'
-        
-        return 'b'
+        return 'w' if code < 7 else 'b'
 
     def MovePiece(self,start,end, special=None):
         """Conduct the actual move. Start and end are tuples. Special is used to specify castle, promotion, and en passant."""
 
-        piece = self.GetPiece(start)
-        capture = True if self.GetPiece(end) != None else False
-        
-        startFile, startRank = self._ConvertPosition(start)
-        endFile, endRank = self._ConvertPosition(end)
-
-        self._board[startRank][startFile] = '.'
-        self._board[endRank][endFile] = piece
-        
+        flag = noFlag
         if special == 'castle':
-            if end[0] == 'g':
-                # King side castle move rook to f file
-                rookStartFile = 'h'
-                rookEndFile = 'f'
+            flag = castleFlag
+        elif (special != None) and ('promotion' in special):
+            flag = promotionFlags[special.split()[1].upper()]
+        elif special == 'ep':
+            flag = enPassantFlag
+        elif abs(start[1]-end[1]) == 2 and self.GetPiece(start) in ('P', 'p'):
+            flag = pawnTwoUpFlag
+
+        self.MakeMove(squareIndex[start], squareIndex[end], flag)
+
+    def MakeMove(self, startSquare, endSquare, flag=noFlag):
+        """Play a move given by square indexes and a move flag. The previous state is pushed on the undo stack
+        so the move can be taken back with UnmakeMove. Raises ValueError, without changing the board, if there
+        is no piece on startSquare or no rook for a castling king to castle with."""
+        code = self._mailbox[startSquare]
+        if code == 0:
+            raise ValueError("No piece to move on " + squareNames[startSquare])
+        if flag == castleFlag:
+            if endSquare > startSquare:
+                # King side castle move rook from the h file to the f file
+                rookStart, rookEnd = startSquare + 3, startSquare + 1
             else:
-                # Queen side castle, move rook to d file
-                rookStartFile = 'a'
-                rookEndFile = 'd'
+                # Queen side castle, move rook from the a file to the d file
+                rookStart, rookEnd = startSquare - 4, startSquare - 1
+            # The rook has the color of the king, its code is two less
+            if not 0 <= rookStart < 64 or self._mailbox[rookStart] != code - 2:
+                raise ValueError("No rook to castle with from " + squareNames[startSquare])
+
+        self._undo.append((startSquare, endSquare, flag, code, self._mailbox[endSquare],
+                           self._castle, self._ep, self._halfmoves, self._key, self._currentPlayer))
+
+        # Remove the old castling rights and en passant file from the key, they are added back below
+        self._key ^= castleKeys[self._castle]
+        if self._ep >= 0:
+            self._key ^= epFileKeys[self._ep & 7]
 
+        self._RemovePiece(startSquare)
+        captured = self._RemovePiece(endSquare)
+        self._PutPiece(endSquare, code)
+
+        if flag == castleFlag:
             # Move the rook
-            rookPiece = self.GetPiece((rookStartFile,start[1]))
-            startRookFile, startRookRank = self._ConvertPosition((rookStartFile,start[1]))
-            endRookFile, endRookRank = self._ConvertPosition((rookEndFile,end[1]))
-            self._board[startRookRank][startRookFile] = '.'
-            self._board[endRookRank][endRookFile] = rookPiece
-        elif (special != None) and ('promotion' in special):
-            promoPiece = special.split()[1]
-            self._board[endRank][endFile] = promoPiece
-        elif special == 'ep':
+            self._PutPiece(rookEnd, self._RemovePiece(rookStart))
+        elif flag >= promoteToQueenFlag:
+            # The promotion piece takes the color of the pawn
+            self._RemovePiece(endSquare)
+            self._PutPiece(endSquare, promotionCodes[flag] + (0 if code < 7 else 6))
+        elif flag == enPassantFlag:
             # Need to remove the pawn that the player captured
             # Removed pawn is at the end file and starting rank
-            removeFile, removeRank = self._ConvertPosition((end[0],start[1]))
-            self._board[removeRank][removeFile] = '.'
-        
+            self._RemovePiece((startSquare & ~7) | (endSquare & 7))
+
+        # The en passant square is the square a pawn skipped, it is only available for one move
+        self._ep = (startSquare + endSquare) >> 1 if flag == pawnTwoUpFlag else -1
+
         # Update number of move numbers
         # Half moves are number of moves since last capture or pawn advance
-        self._halfmoves = 0 if (str.upper(piece) == 'P' or capture) else self._halfmoves + 1
+        self._halfmoves = 0 if (code == 1 or code == 7 or captured) else self._halfmoves + 1
         # Full moves always increment after blackmove
-        if str.lower(piece) == piece:
+        if code >= 7:
             self._fullmoves += 1
-        # Did the king or rook move?
-        if piece == 'K':
-            self._castle['whiteKing'] = False
-            self._castle['whiteQueen'] = False
-        elif piece == 'k':
-            self._castle['blackKing'] = False
-            self._castle['blackQueen'] = False
-        
-        if piece == 'R':
-            # which side
-            if start[0] == 'a':
-                self._castle['whiteQueen'] = False
-            elif start[0] == 'h':
-                self._castle['whiteKing'] = False
-        elif piece == 'r':
-             # which side
-            if start[0] == 'a':
-                self._castle['blackQueen'] = False
-            elif start[0] == 'h':
-                self._castle['blackKing'] = False
-        
-        if str.upper(piece) == 'P':
-            # Did the pawn move two
-            numSpaces = start[1]-end[1]
-            if abs(numSpaces) == 2:
-                self._ep = start[0]+'6' if numSpaces == -2 else start[0]+'3'
+
+        # Moving a king or rook, or capturing a rook, removes castling rights
+        self._castle &= castleMasks[startSquare] & castleMasks[endSquare]
+
+        self._key ^= castleKeys[self._castle]
+        if self._ep >= 0:
+            self._key ^= epFileKeys[self._ep & 7]
+
+        # The other side moves next
+        nextPlayer = 'b' if code < 7 else 'w'
+        if nextPlayer != self._currentPlayer:
+            self._currentPlayer = nextPlayer
+            self._key ^= sideKey
+
+    def MakePackedMove(self, move):
+        """MakeMove for a move packed with PackMove."""
+        self.MakeMove(move & 63, (move >> 6) & 63, move >> 12)
+
+    def UnmakeMove(self):
+        """Take back the last move made with MakeMove or MovePiece."""
+        startSquare, endSquare, flag, code, captured, self._castle, self._ep, self._halfmoves, key, \
+            self._currentPlayer = self._undo.pop()
+
+        self._RemovePiece(endSquare)
+        self._PutPiece(startSquare, code)
+        if captured:
+            self._PutPiece(endSquare, captured)
+
+        if flag == castleFlag:
+            if endSquare > startSquare:
+                rookStart, rookEnd = startSquare + 3, startSquare + 1
+            else:
+                rookStart, rookEnd = startSquare - 4, startSquare - 1
+            self._PutPiece(rookStart, self._RemovePiece(rookEnd))
+        elif flag == enPassantFlag:
+            self._PutPiece((startSquare & ~7) | (endSquare & 7), 7 if code == 1 else 1)
+
+        if code >= 7:
+            self._fullmoves -= 1
+
+        self._key = key
+
+    def SideToMove(self):
+        """'w' or 'b'. Set from the FEN and updated by every move."""
+        return self._currentPlayer
+
+    def ZobristKey(self):
+        """64-bit Zobrist key of the position (see zobrist.py)."""
+        return self._key
 
     def GetAllPieces(self,player):
         """Returns a list of all pieces for a particular player and the corresponding positions on the board."""
         allPieces = []
-        pieceTest = str.isupper if player=='w' else str.islower
+        occupancy = self.Occupancy(player)
 
-        for rank in range(8):
-            for files in range(8):
-                if self._board[rank][files] != '.' and pieceTest(self._board[rank][files]):
-                    allPieces.append((self.allFiles[files],rank+1))
+        while occupancy:
+            lowestBit = occupancy & -occupancy
+            allPieces.append(squarePosition[lowestBit.bit_length()-1])
+            occupancy ^= lowestBit
 
         return allPieces
 
-    def ExportFEN(self,currentPlayer):
-        """Convert board into FEN string."""
-        counter = 0
-        fen = ''
-        for rank in range(8):
-            for file in range(8):
-                piece = self._board[rank][file]
-                if piece == '.':
-                    counter += 1
-                else:
-                    if counter > 0:
-                        fen += str(counter)
-                    
-                    fen += piece
-                    counter = 0
-                
-            if counter > 0:
-                fen += str(counter)
-            
-            if rank < 7:
-                fen += '/'
-                counter = 0
-        
-        fen = fen + " " + currentPlayer + " "
-
-        if self._castle['whiteKing']:
-            fen = fen + 'K'
-        if self._castle['whiteQueen']:
-            fen = fen + 'Q'
-        if self._castle['blackKing']:
-            fen = fen + 'k'
-        if self._castle['blackQueen']:
-            fen = fen + 'q'
-
-        fen = fen + " " + self._ep + " " + str(self._halfmoves) + " " + str(self._fullmoves)
-
-        return fen
+    def ExportFEN(self,currentPlayer=None):
+        """Convert board into FEN string. The side to move is the board's own unless currentPlayer is given."""
+        return EncodeFEN(self._mailbox, currentPlayer or self._currentPlayer, self._castle, self._ep,
+                         self._halfmoves, self._fullmoves)
+
+    def Pack(self):
+        """Pack the position into packedSize bytes."""
+        mailbox = self._mailbox
+        squares = bytes(mailbox[square] | (mailbox[square+1] << 4) for square in range(0, 64, 2))
+        flags = (1 if self._currentPlayer == 'b' else 0) | (self._castle << 1)
+        return packedFormat.pack(squares, flags, self._ep & 255, self._halfmoves, self._fullmoves)
+
+    def Unpack(self, data):
+        """Set the position from the output of Pack."""
+        squares, flags, ep, self._halfmoves, self._fullmoves = packedFormat.unpack(data)
+
+        self._bitboards = array('Q', bytes(8*12))
+        self._mailbox = bytearray(64)
+        self._key = 0
+        for index, pair in enumerate(squares):
+            if pair & 15:
+                self._PutPiece(2*index, pair & 15)
+            if pair >> 4:
+                self._PutPiece(2*index + 1, pair >> 4)
+
+        self._currentPlayer = 'b' if flags & 1 else 'w'
+        self._castle = flags >> 1
+        self._ep = -1 if ep == 255 else ep
+        self._undo = []
+        self._key = ComputeKey(self._mailbox, flags & 1, self._castle, self._ep)
+
+    def SetBitboards(self, bitboards, currentPlayer='w', castle=0, ep=-1, halfmoves=0, fullmoves=1):
+        """Set the position from twelve piece bitboards in piece code order (PNBRQK white, then black)."""
+        self._bitboards = array('Q', bytes(8*12))
+        self._mailbox = bytearray(64)
+        self._key = 0
+        for index, bitboard in enumerate(bitboards):
+            bitboard = int(bitboard)
+            while bitboard:
+                lowestBit = bitboard & -bitboard
+                self._PutPiece(lowestBit.bit_length() - 1, index + 1)
+                bitboard ^= lowestBit
+
+        self._currentPlayer = currentPlayer
+        self._castle = castle
+        self._ep = ep
+        self._halfmoves = halfmoves
+        self._fullmoves = fullmoves
+        self._undo = []
+        self._key = ComputeKey(self._mailbox, currentPlayer == 'b', castle, ep)
@@ -0,0 +1,154 @@
+"""Resumable, checkpointed export of a directory of PGN files.
+
+The output directory holds one output shard per shardGames games and a checkpoint.json manifest. The manifest
+records, for every input file, the byte offset up to which its games have been exported, and the list of
+completed shards. A shard is written under a temporary name and renamed once it is complete, and only then is
+the manifest (written the same way) updated, so after a crash the manifest always describes finished work.
+Running the export again skips the finished files and shards and continues each file from its offset. The
+errors of a shard are written next to it (errors-NNNNN.ndjson) the same way, before the manifest is updated, so
+a shard that is redone after a crash replaces its error file instead of adding to it.
+
+Every shard is sampled with its own fork of the sampler (see Sampler.Fork) keyed by the shard number, so with a
+seeded sampler a resumed export writes exactly the same shards as one that was never interrupted.
+"""
+import json
+import os
+import pathlib
+import shutil
+from .diagnostics import ErrorReport
+from .pgn import ReadGameOffsets
+
+_manifestName = 'checkpoint.json'
+_extensions = {'json': '.json', 'ndjson': '.ndjson', 'binary': '.bin', 'columnar': ''}
+
+
+def _SamplerSettings(sampler):
+    return {"strategy": sampler.strategy, "count": sampler.count, "seed": sampler.seed, "minPly": sampler.minPly,
+            "every": sampler.every, "openingPlies": sampler.openingPlies}
+
+
+class Checkpoint:
+    """The checkpoint manifest of an output directory."""
+
+    def __init__(self, directory, settings):
+        self.directory = directory
+        self.path = os.path.join(directory, _manifestName)
+        if os.path.exists(self.path):
+            with open(self.path, "r") as manifestFile:
+                self.manifest = json.load(manifestFile)
+            if self.manifest["settings"] != settings:
+                raise ValueError("The export in " + directory + " was started with different settings " +
+                                 str(self.manifest["settings"]))
+        else:
+            self.manifest = {"version": 1, "settings": settings, "files": {}, "shards": []}
+
+    def Save(self):
+        with open(self.path + '.tmp', "w") as manifestFile:
+            json.dump(self.manifest, manifestFile, indent=4)
+        os.replace(self.path + '.tmp', self.path)
+
+    def File(self, filename):
+        """Progress record of an input file: the offset exported up to, the number of games and whether the file
+        is finished."""
+        record = self.manifest["files"].get(filename)
+        if record == None:
+            record = self.manifest["files"][filename] = {"offset": 0, "games": 0, "done": False}
+        return record
+
+    def Shards(self):
+        return self.manifest["shards"]
+
+    def Done(self):
+        return all(record["done"] for record in self.manifest["files"].values())
+
+
+def _Remove(path):
+    if os.path.isdir(path):
+        shutil.rmtree(path)
+    elif os.path.exists(path):
+        os.remove(path)
+
+
+def ExportResumable(exporter, directory, outputDirectory, format='ndjson', shardGames=10000, workers=1,
+                    chunksize=64):
+    """Export every .pgn file in directory to shards in outputDirectory, resuming from its checkpoint if there
+    is one. The exporter's sampler, prefixMemory, gameFilter and positionCache are used for every shard and the
+    errors of every shard are added to its error report as well as to the shard's errors-NNNNN.ndjson in
+    outputDirectory. A file that is finished is not read again, even if it grows. Filter predicates must be
+    module level functions, since the checkpoint identifies them by name. Returns the Checkpoint."""
+    from .MoveExport import MoveExporter
+
+    os.makedirs(outputDirectory, exist_ok=True)
+    settings = {"format": format, "shardGames": shardGames, "sampler": _SamplerSettings(exporter.sampler),
+                "filter": exporter.gameFilter.Settings() if exporter.gameFilter != None else None}
+    checkpoint = Checkpoint(outputDirectory, settings)
+
+    pgnFiles = [os.path.join(directory, name) for name in sorted(os.listdir(directory))
+                if os.path.isfile(os.path.join(directory, name)) and pathlib.Path(name).suffix == '.pgn']
+
+    for pgnFile in pgnFiles:
+        record = checkpoint.File(os.path.relpath(pgnFile, directory))
+        if record["done"]:
+            continue
+        if os.path.getsize(pgnFile) < record["offset"]:
+            raise ValueError(pgnFile + " is shorter than the checkpoint offset, it was changed since the export "
+                             "started")
+
+        games = ReadGameOffsets(pgnFile, record["offset"], exporter.gameFilter)
+        while True:
+            shardNumber = len(checkpoint.Shards())
+            shardExporter = MoveExporter(exporter.sampler.Fork(shardNumber), exporter.prefixMemory,
+                                         errors=ErrorReport(), positionCache=exporter.positionCache)
+            progress = {"games": 0, "entries": 0, "end": record["offset"]}
+
+            def ShardGames():
+                # Games of this shard, keeping track of where the last one ends
+                for _, end, game in games:
+                    progress["games"] += 1
+                    progress["end"] = end
+                    yield game
+                    if progress["games"] >= shardGames:
+                        return
+
+            name = 'shard-' + str(shardNumber).zfill(5) + _extensions[format]
+            errorsName = 'errors-' + str(shardNumber).zfill(5) + '.ndjson'
+            temporary = os.path.join(outputDirectory, name + '.tmp')
+            _Remove(temporary)
+
+            def Entries():
+                for entry in shardExporter._Process(ShardGames(), workers, chunksize, True):
+                    progress["entries"] += 1
+                    yield entry
+
+            shardExporter._Write(Entries(), temporary, format)
+            if progress["games"] == 0:
+                _Remove(temporary)
+                break
+
+            target = os.path.join(outputDirectory, name)
+            _Remove(target)
+            os.replace(temporary, target)
+            errorsFile = os.path.join(outputDirectory, errorsName)
+            if shardExporter.errors:
+                shardExporter.errors.Write(errorsFile + '.tmp')
+                os.replace(errorsFile + '.tmp', errorsFile)
+            else:
+                _Remove(errorsFile)
+            exporter.errors.Extend(shardExporter.errors.records)
+
+            checkpoint.Shards().append({"name": name, "errorsFile": errorsName if shardExporter.errors else None,
+                                        "file": os.path.relpath(pgnFile, directory),
+                                        "start": record["offset"], "end": progress["end"],
+                                        "games": progress["games"], "entries": progress["entries"],
+                                        "errors": len(shardExporter.errors)})
+            record["offset"] = progress["end"]
+            record["games"] += progress["games"]
+            checkpoint.Save()
+
+            if progress["games"] < shardGames:
+                break
+
+        record["done"] = True
+        checkpoint.Save()
+
+    return checkpoint
@@ -0,0 +1,206 @@
+"""Columnar, memory-mapped dataset of exported positions.
+
+A dataset is a directory with a manifest.json and one sub-directory per shard. Each shard holds one .npy file
+per column plus strings.json, the table its tag ids index into. Shards are written once and never modified;
+appending writes new shards and then replaces the (small) manifest, so existing data is never rewritten.
+Columns are opened with numpy's mmap_mode so reads are zero-copy.
+
+Columns:
+    bitboards    (N, 12) uint64  piece bitboards, PNBRQK white then black, a1 is bit 0
+    whiteToMove  (N,)    bool
+    castle       (N,)    uint8   castling rights (see Board)
+    ep           (N,)    int8    en passant square, -1 if none
+    halfmoves    (N,)    uint16  halfmove clock
+    fullmoves    (N,)    uint16  fullmove number
+    ply          (N,)    uint16  ply of the sampled position (the exporter's "move")
+    gameLength   (N,)    uint16  number of plies in the game (the exporter's "totalMoves")
+    result       (N,)    int8    1 white won, -1 black won, 0 draw, -2 unknown
+    tags         (N, T)  int32   string table ids for the dataset's tag names, 0 is the empty string
+
+Requires numpy.
+"""
+import json
+import os
+import shutil
+import numpy as np
+from .board import Board
+from .writers import defaultTags
+
+_manifestName = 'manifest.json'
+_results = {'w': 1, 'b': -1, 'draw': 0, None: -2}
+_resultNames = {1: 'w', -1: 'b', 0: 'draw'}
+columnTypes = {'bitboards': np.uint64, 'whiteToMove': bool, 'castle': np.uint8, 'ep': np.int8,
+               'halfmoves': np.uint16, 'fullmoves': np.uint16, 'ply': np.uint16, 'gameLength': np.uint16, 'result': np.int8, 'tags': np.int32}
+
+
+def _ReadManifest(directory):
+    path = os.path.join(directory, _manifestName)
+    if not os.path.exists(path):
+        return None
+    with open(path, "r") as manifestFile:
+        return json.load(manifestFile)
+
+
+def _WriteManifest(directory, manifest):
+    path = os.path.join(directory, _manifestName)
+    with open(path + '.tmp', "w") as manifestFile:
+        json.dump(manifest, manifestFile, indent=4)
+    os.replace(path + '.tmp', path)
+
+
+class DatasetWriter:
+    """Appends entries (MoveExporter dictionaries) to a dataset, writing a new shard every shardSize entries.
+    Opening an existing dataset appends to it; tags must match the ones it was created with."""
+
+    def __init__(self, directory, tags=defaultTags, shardSize=100000):
+        os.makedirs(directory, exist_ok=True)
+        self._directory = directory
+        self._shardSize = shardSize
+        self._manifest = _ReadManifest(directory) or {"version": 1, "tags": list(tags), "shards": []}
+        if self._manifest["tags"] != list(tags):
+            raise ValueError("Dataset " + directory + " was created with tags " + str(self._manifest["tags"]))
+        self._tags = tuple(tags)
+        self._board = Board()
+        self._Reset()
+
+    def _Reset(self):
+        self._rows = {name: [] for name in columnTypes}
+        self._strings = {'': 0}
+
+    def _Intern(self, value):
+        stringId = self._strings.get(value)
+        if stringId == None:
+            stringId = len(self._strings)
+            self._strings[value] = stringId
+        return stringId
+
+    def Write(self, entry):
+        """Add an entry. Raises ValueError if its FEN is malformed."""
+        board = self._board
+        if not board.SetFEN(entry['FEN']):
+            raise ValueError("Malformed FEN " + repr(entry['FEN']) + " in entry for move " + str(entry.get('move')))
+        tags = entry.get('tags', {})
+
+        rows = self._rows
+        rows['bitboards'].append(board._bitboards.tolist())
+        rows['whiteToMove'].append(board._currentPlayer == 'w')
+        rows['castle'].append(board._castle)
+        rows['ep'].append(board._ep)
+        rows['halfmoves'].append(board._halfmoves)
+        rows['fullmoves'].append(board._fullmoves)
+        rows['ply'].append(entry['move'])
+        rows['gameLength'].append(entry['totalMoves'])
+        rows['result'].append(_results[entry.get('winner')])
+        rows['tags'].append([self._Intern(tags.get(tag, '')) for tag in self._tags])
+
+        if len(rows['ply']) >= self._shardSize:
+            self.Flush()
+
+    def Flush(self):
+        """Write the buffered entries as a new shard."""
+        count = len(self._rows['ply'])
+        if count == 0:
+            return
+
+        name = 'shard-' + format(len(self._manifest["shards"]), '05d')
+        temporary = os.path.join(self._directory, name + '.tmp')
+        os.makedirs(temporary, exist_ok=True)
+        for column, dtype in columnTypes.items():
+            values = np.array(self._rows[column], dtype=dtype)
+            if column == 'tags':
+                values = values.reshape(count, len(self._tags))
+            np.save(os.path.join(temporary, column + '.npy'), values)
+
+        with open(os.path.join(temporary, 'strings.json'), "w") as stringFile:
+            json.dump(list(self._strings), stringFile)
+
+        # The shard only becomes visible once it is complete. A directory with this name that is not in the
+        # manifest is left over from an interrupted run.
+        target = os.path.join(self._directory, name)
+        if os.path.exists(target):
+            shutil.rmtree(target)
+        os.replace(temporary, target)
+        self._manifest["shards"].append({"name": name, "rows": count})
+        _WriteManifest(self._directory, self._manifest)
+        self._Reset()
+
+    def Close(self):
+        self.Flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.Close()
+
+
+class Shard:
+    """One shard of a dataset. Columns are memory-mapped on first access."""
+
+    def __init__(self, directory, rows, tags):
+        self.directory = directory
+        self.rows = rows
+        self.tags = tags
+        self._columns = {}
+        self._strings = None
+
+    def __len__(self):
+        return self.rows
+
+    def Column(self, name):
+        if name not in self._columns:
+            self._columns[name] = np.load(os.path.join(self.directory, name + '.npy'), mmap_mode='r')
+        return self._columns[name]
+
+    def Strings(self):
+        if self._strings == None:
+            with open(os.path.join(self.directory, 'strings.json'), "r") as stringFile:
+                self._strings = json.load(stringFile)
+        return self._strings
+
+    def Tags(self, row):
+        """Tag dictionary for a row (empty tags are left out)."""
+        strings = self.Strings()
+        return {tag: strings[stringId] for tag, stringId in zip(self.tags, self.Column('tags')[row]) if stringId}
+
+    def Entry(self, row):
+        """Rebuild the MoveExporter dictionary for a row."""
+        board = Board()
+        board.SetBitboards(self.Column('bitboards')[row], 'w' if self.Column('whiteToMove')[row] else 'b',
+                           int(self.Column('castle')[row]), int(self.Column('ep')[row]),
+                           int(self.Column('halfmoves')[row]), int(self.Column('fullmoves')[row]))
+        entry = {"tags": self.Tags(row), "FEN": board.ExportFEN(),
+                 "totalMoves": int(self.Column('gameLength')[row]), "move": int(self.Column('ply')[row])}
+        result = int(self.Column('result')[row])
+        if result in _resultNames:
+            entry["winner"] = _resultNames[result]
+        return entry
+
+
+class Dataset:
+    """Read access to a dataset written by DatasetWriter."""
+
+    def __init__(self, directory):
+        manifest = _ReadManifest(directory)
+        if manifest == None:
+            raise ValueError(directory + " is not a dataset (no " + _manifestName + ")")
+        self.tags = manifest["tags"]
+        self.shards = [Shard(os.path.join(directory, shard["name"]), shard["rows"], self.tags)
+                       for shard in manifest["shards"]]
+
+    def __len__(self):
+        return sum(shard.rows for shard in self.shards)
+
+    def Column(self, name):
+        """Memory-mapped arrays of a column, one per shard."""
+        return [shard.Column(name) for shard in self.shards]
+
+    def Concatenate(self, name):
+        """A column for the whole dataset as one in-memory array (this copies the data)."""
+        return np.concatenate(self.Column(name)) if self.shards else np.empty(0, dtype=columnTypes[name])
+
+    def Entries(self):
+        """Generator over every row as a MoveExporter dictionary."""
+        for shard in self.shards:
+            for row in range(shard.rows):
+                yield shard.Entry(row)
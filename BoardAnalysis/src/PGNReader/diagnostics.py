@@ -0,0 +1,71 @@
+"""Logging and error reporting for PGNReader.
+
+Every module logs to a child of the 'PGNReader' logger. The package logger only has a NullHandler, so nothing
+is written and debug messages are not even formatted unless the application configures logging (or calls
+EnableLogging). Per-move and per-board messages are debug level.
+
+Problems with the input, such as moves that can not be resolved or games that raise, are also recorded in an
+ErrorReport so they can be written out as NDJSON and inspected or counted afterwards.
+"""
+import json
+import logging
+
+logger = logging.getLogger(__package__)
+logger.addHandler(logging.NullHandler())
+
+# Tags that identify a game in error reports and diagnostics
+gameTags = ('Event', 'Site', 'Date', 'Round', 'White', 'Black')
+
+
+def GameTags(tags):
+    """The identifying tags of a game."""
+    return {tag: tags[tag] for tag in gameTags if tag in tags}
+
+
+def EnableLogging(level=logging.INFO, stream=None):
+    """Send the package's log messages at level and above to stream (stderr by default). Returns the handler so
+    it can be removed again."""
+    handler = logging.StreamHandler(stream)
+    handler.setFormatter(logging.Formatter('%(asctime)s %(levelname)s %(name)s: %(message)s'))
+    logger.addHandler(handler)
+    logger.setLevel(level)
+    return handler
+
+
+class ErrorReport:
+    """Machine-readable list of input errors. Each record is a dictionary with the kind of error ('move' for a
+    move that could not be resolved, 'exception' for a game that raised, 'fen' for a bad FEN), the identifying
+    tags of the game, the ply and move where it happened (or None) and a message."""
+
+    def __init__(self):
+        self.records = []
+
+    def __len__(self):
+        return len(self.records)
+
+    def __iter__(self):
+        return iter(self.records)
+
+    def Add(self, kind, tags=None, ply=None, move=None, message=''):
+        self.records.append({"kind": kind, "game": GameTags(tags or {}), "ply": ply, "move": move,
+                             "message": message})
+
+    def Extend(self, records):
+        self.records.extend(records)
+
+    def Counts(self):
+        """Number of records of each kind."""
+        counts = {}
+        for record in self.records:
+            counts[record["kind"]] = counts.get(record["kind"], 0) + 1
+        return counts
+
+    def Write(self, filename, append=False):
+        """Write the records as NDJSON, after the ones already in the file if append."""
+        with open(filename, "a" if append else "w") as reportFile:
+            for record in self.records:
+                reportFile.write(json.dumps(record))
+                reportFile.write('\n')
+
+    def Clear(self):
+        self.records = []
@@ -0,0 +1,242 @@
+"""Vectorized positional features, the Python counterpart of BoardAnalysis Evaluate.EvaluatePosition.
+
+A batch of positions is held as an (N, 12) uint64 array of piece bitboards (PNBRQK white then black, a1 is bit
+0) plus an (N,) bool array that is True when white is to move. Every feature is computed with array
+operations over the whole batch; attack maps use Kogge-Stone style shifts and occluded fills. Only the
+checkmate test falls back to the move generator, and only for the positions that are in check.
+
+The columns match the C# code as it is, including a quirk of EvaluatePosition: it skips the turn for the
+opponent's center attack score and never undoes it. When that skip succeeds (the side to move is not in
+check) every later column (slidingEdgeScore, unprotectedScore, pieceScore, oppPieceScore, rookScore and
+checkmateScore) is computed for the opponent, so pieceScore is the opponent's material and oppPieceScore
+the side to move's.
+
+Requires numpy.
+"""
+import numpy as np
+from .board import Board
+from .movegen import GenerateMoves
+
+featureNames = ('centerScore', 'oppCenterScore', 'centerAttackScore', 'oppAttackScore', 'slidingEdgeScore',
+                'unprotectedScore', 'pieceScore', 'oppPieceScore', 'rookScore', 'checkmateScore', 'totalScore')
+
+_zero = np.uint64(0)
+_notAFile = np.uint64(0xfefefefefefefefe)
+_notHFile = np.uint64(0x7f7f7f7f7f7f7f7f)
+_notABFile = np.uint64(0xfcfcfcfcfcfcfcfc)
+_notGHFile = np.uint64(0x3f3f3f3f3f3f3f3f)
+_center = np.uint64(0x1818000000)
+_outerCenter = np.uint64(0x3c24243c0000)
+_edges = np.uint64(0xff818181818181ff)
+_centerSquares = [np.uint64(1 << square) for square in (27, 35, 28, 36)]  # d4, d5, e4, e5
+_pieceValues = (1, 8, 10, 15, 20)  # P N B R Q, same as Evaluate.ScoreBoard
+
+# (shift, left) pairs and the mask that removes wrapped squares for the eight directions
+_directions = {
+    'north': (8, True, None), 'south': (8, False, None),
+    'east': (1, True, _notAFile), 'west': (1, False, _notHFile),
+    'northEast': (9, True, _notAFile), 'northWest': (7, True, _notHFile),
+    'southEast': (7, False, _notAFile), 'southWest': (9, False, _notHFile),
+}
+_rookDirections = ('north', 'south', 'east', 'west')
+_bishopDirections = ('northEast', 'northWest', 'southEast', 'southWest')
+
+
+def PopCount(bitboards):
+    """Number of set bits of each element of a uint64 array."""
+    if hasattr(np, 'bitwise_count'):
+        return np.bitwise_count(bitboards).astype(np.int32)
+    bytesView = np.ascontiguousarray(bitboards).view(np.uint8).reshape(bitboards.shape + (8,))
+    return np.unpackbits(bytesView, axis=-1).sum(axis=-1, dtype=np.int32)
+
+
+def _Shift(bitboards, direction):
+    amount, left, mask = _directions[direction]
+    shifted = bitboards << np.uint64(amount) if left else bitboards >> np.uint64(amount)
+    return shifted if mask is None else shifted & mask
+
+
+def _SlidingAttacks(sliders, empty, directions):
+    attacks = np.zeros_like(sliders)
+    for direction in directions:
+        ray = sliders
+        for _ in range(7):
+            ray = _Shift(ray, direction)
+            attacks |= ray
+            ray &= empty
+    return attacks
+
+
+def AttackMaps(pieces, white, occupancy):
+    """Squares attacked by one side. pieces is the (N, 6) PNBRQK slice of that side and white says which side
+    it is (bool array or scalar), occupancy is the blocker set used for the sliding pieces."""
+    pawns, knights, bishops, rooks, queens, kings = (pieces[:, index] for index in range(6))
+    empty = ~occupancy
+
+    pawnAttacks = np.where(white,
+                           ((pawns << np.uint64(9)) & _notAFile) | ((pawns << np.uint64(7)) & _notHFile),
+                           ((pawns >> np.uint64(7)) & _notAFile) | ((pawns >> np.uint64(9)) & _notHFile))
+
+    knightAttacks = (((knights << np.uint64(17)) | (knights >> np.uint64(15))) & _notAFile) | \
+        (((knights << np.uint64(15)) | (knights >> np.uint64(17))) & _notHFile) | \
+        (((knights << np.uint64(10)) | (knights >> np.uint64(6))) & _notABFile) | \
+        (((knights << np.uint64(6)) | (knights >> np.uint64(10))) & _notGHFile)
+
+    kingAttacks = np.zeros_like(kings)
+    for direction in _directions:
+        kingAttacks |= _Shift(kings, direction)
+
+    return pawnAttacks | knightAttacks | kingAttacks | \
+        _SlidingAttacks(bishops | queens, empty, _bishopDirections) | \
+        _SlidingAttacks(rooks | queens, empty, _rookDirections)
+
+
+def EncodeFENs(fens):
+    """Encode FEN strings as an (N, 12) uint64 bitboard array and an (N,) bool white-to-move array."""
+    bitboards = np.empty((len(fens), 12), dtype=np.uint64)
+    whiteToMove = np.empty(len(fens), dtype=bool)
+    board = Board()
+    for index, fen in enumerate(fens):
+        board.SetFEN(fen)
+        bitboards[index] = np.frombuffer(board._bitboards, dtype=np.uint64)
+        whiteToMove[index] = board._currentPlayer == 'w'
+    return bitboards, whiteToMove
+
+
+def EncodePlanes(bitboards):
+    """Expand (N, 12) bitboards into an (N, 12, 64) uint8 array of 0/1 planes, square 0 (a1) first."""
+    bytesView = np.ascontiguousarray(bitboards, dtype='<u8').view(np.uint8).reshape(len(bitboards), 12, 8)
+    return np.unpackbits(bytesView, axis=-1, bitorder='little')
+
+
+def _Count(bitboards, mask):
+    return PopCount(bitboards & mask)
+
+
+def Evaluate(bitboards, whiteToMove):
+    """Compute the Evaluate.EvaluatePosition feature columns for a batch. Returns a dictionary of float32 arrays
+    keyed by the names in featureNames plus a nextTurn array of 'w'/'b'."""
+    bitboards = np.asarray(bitboards, dtype=np.uint64)
+    whiteToMove = np.asarray(whiteToMove, dtype=bool)
+    count = len(bitboards)
+
+    # Reorder so columns 0-5 are the side to move ("us") and 6-11 the opponent
+    swap = np.concatenate([np.arange(6, 12), np.arange(0, 6)])
+    ordered = np.where(whiteToMove[:, None], bitboards, bitboards[:, swap])
+    us, them = ordered[:, :6], ordered[:, 6:]
+
+    ourPieces = np.bitwise_or.reduce(us, axis=1)
+    theirPieces = np.bitwise_or.reduce(them, axis=1)
+    occupancy = ourPieces | theirPieces
+
+    # Like the C# move generator, the attack map of a side treats the other side's king as transparent
+    ourAttacks = AttackMaps(us, whiteToMove, occupancy & ~them[:, 5])
+    theirAttacks = AttackMaps(them, ~whiteToMove, occupancy & ~us[:, 5])
+
+    weInCheck = (us[:, 5] & theirAttacks) != _zero
+    theyInCheck = (them[:, 5] & ourAttacks) != _zero
+    # TrySkipTurn fails when the side to move is in check
+    canSkip = ~weInCheck
+    canSkipTwice = canSkip & ~theyInCheck
+
+    features = {}
+    centerScore = _Count(ourPieces, _center)*3 + _Count(ourPieces, _outerCenter)*2
+    features['centerScore'] = centerScore
+    features['oppCenterScore'] = np.where(canSkip, _Count(theirPieces, _center)*3 +
+                                          _Count(theirPieces, _outerCenter)*2, 0)
+
+    ourCenterAttacks = np.zeros(count, dtype=np.int32)
+    theirCenterAttacks = np.zeros(count, dtype=np.int32)
+    for square in _centerSquares:
+        ourCenterAttacks += (ourAttacks & square) != _zero
+        theirCenterAttacks += (theirAttacks & square) != _zero
+    features['centerAttackScore'] = np.where(canSkip, ourCenterAttacks, 0)
+    features['oppAttackScore'] = np.where(canSkipTwice, theirCenterAttacks, 0)
+
+    # The rest is for the side that is to move after EvaluatePosition's unmatched TrySkipTurn ("mover"): the
+    # opponent if the skip succeeded, otherwise the side to move
+    moverPieces = np.where(canSkip[:, None], them, us)
+    otherPieces = np.where(canSkip[:, None], us, them)
+    moverAttacks = np.where(canSkip, theirAttacks, ourAttacks)
+    otherAttacks = np.where(canSkip, ourAttacks, theirAttacks)
+    moverInCheck = np.where(canSkip, theyInCheck, weInCheck)
+    otherInCheck = np.where(canSkip, weInCheck, theyInCheck)
+    moverWhite = whiteToMove ^ canSkip
+
+    features['slidingEdgeScore'] = -_Count(moverPieces[:, 1] | moverPieces[:, 2] | moverPieces[:, 4], _edges)
+
+    # Attacked pieces, less the defended ones (defence only counts if the mover could pass the move)
+    attacked = np.bitwise_or.reduce(moverPieces, axis=1) & otherAttacks
+    features['unprotectedScore'] = PopCount(attacked) - np.where(moverInCheck, 0, PopCount(attacked & moverAttacks))
+
+    pieceScore = np.zeros(count, dtype=np.int32)
+    oppPieceScore = np.zeros(count, dtype=np.int32)
+    for index, value in enumerate(_pieceValues):
+        pieceScore += PopCount(moverPieces[:, index]) * value
+        oppPieceScore += PopCount(otherPieces[:, index]) * value
+    features['pieceScore'] = pieceScore
+    features['oppPieceScore'] = oppPieceScore
+
+    rookScore = _LinkedRooks(moverPieces[:, 3], occupancy)
+    features['rookScore'] = rookScore
+
+    checkmateScore = np.where(moverInCheck, -5, 0) + np.where(~moverInCheck & otherInCheck, 5, 0)
+    board = Board()
+    for index in np.flatnonzero(moverInCheck):
+        board.SetBitboards(bitboards[index], 'w' if moverWhite[index] else 'b')
+        if not GenerateMoves(board):
+            checkmateScore[index] += 100
+    features['checkmateScore'] = checkmateScore
+
+    features['totalScore'] = centerScore + pieceScore + rookScore + checkmateScore
+
+    result = {name: np.asarray(features[name], dtype=np.float32) for name in featureNames}
+    result['nextTurn'] = np.where(whiteToMove, 'w', 'b')
+    return result
+
+
+def _LinkedRooks(rooks, occupancy):
+    """Evaluate.LinkedRooks: 1 when the side has exactly two rooks on the same rank or file with nothing in
+    between. The C# loop steps by 8 from the square after the first rook when the rooks share a file, so it
+    tests the squares on the next file over; that is reproduced here so the columns match."""
+    score = np.zeros(len(rooks), dtype=np.int32)
+    twoRooks = PopCount(rooks) == 2
+    if not twoRooks.any():
+        return score
+
+    pairs = rooks[twoRooks]
+    # Index of the lowest and highest set bit
+    lowBit = pairs & (~pairs + np.uint64(1))
+    first = (PopCount(lowBit - np.uint64(1))).astype(np.int64)
+    second = (63 - _LeadingZeros(pairs)).astype(np.int64)
+
+    sameRow = (first >> 3) == (second >> 3)
+    sameColumn = (first & 7) == (second & 7)
+
+    squares = np.arange(64, dtype=np.int64)
+    start = first[:, None] + 1
+    step = np.where(sameRow, 1, 8)[:, None]
+    offset = squares[None, :] - start
+    onPath = (offset >= 0) & (squares[None, :] < second[:, None]) & (offset % step == 0)
+    pathMasks = np.bitwise_or.reduce(np.where(onPath, np.uint64(1) << squares.astype(np.uint64)[None, :],
+                                              _zero), axis=1)
+    unblocked = (pathMasks & occupancy[twoRooks]) == _zero
+
+    score[twoRooks] = ((sameRow | sameColumn) & unblocked).astype(np.int32)
+    return score
+
+
+def _LeadingZeros(bitboards):
+    result = np.zeros(bitboards.shape, dtype=np.int64)
+    value = bitboards.copy()
+    for shift in (32, 16, 8, 4, 2, 1):
+        top = value >> np.uint64(64 - shift)
+        empty = top == _zero
+        result += np.where(empty, shift, 0)
+        value = np.where(empty, value << np.uint64(shift), value)
+    return result
+
+
+def EvaluateFENs(fens):
+    """Encode and evaluate a list of FEN strings."""
+    return Evaluate(*EncodeFENs(fens))
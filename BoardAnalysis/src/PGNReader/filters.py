@@ -0,0 +1,167 @@
+"""Tag filters that are evaluated on the tag section of a game alone.
+
+ReadGames (and ReadGameOffsets) take a GameFilter and test it as soon as the tags of a game have been read.
+The movetext of a game that does not match is skipped without being collected or tokenized. GameIndex.Filter
+applies the same filter to the indexed tags without reading the PGN file at all.
+"""
+import re
+
+_ecoPattern = re.compile(r'^([A-E])(\d\d)$')
+
+
+def _Elo(tags, tag):
+    value = tags.get(tag, '')
+    return int(value) if value.isdigit() else None
+
+
+def _ECOValue(code):
+    """ECO code as a number (A00 is 0, E99 is 499), None if it is not a valid code."""
+    match = _ecoPattern.match(code)
+    if match == None:
+        return None
+    return (ord(match.group(1)) - ord('A'))*100 + int(match.group(2))
+
+
+def BaseTime(timeControl):
+    """Base time in seconds of a PGN TimeControl tag ('600+5' is 600, '40/7200:3600' is 7200), None if there is
+    none ('-', '?' or malformed)."""
+    period = timeControl.split(':')[0]
+    period = period.split('/')[-1].split('+')[0]
+    return int(period) if period.isdigit() else None
+
+
+def _PredicateName(function):
+    """Module and qualified name of a predicate, which identifies it in the settings of a checkpointed
+    export."""
+    name = getattr(function, '__qualname__', None)
+    if name == None or '<' in name:
+        raise ValueError("The filter predicate " + repr(function) + " has no stable name, use a module level "
+                         "function to resume a checkpointed export")
+    return function.__module__ + '.' + name
+
+
+class GameFilter:
+    """Filter on the tags of a game. Every option that is given must match; None means any value.
+
+        minElo, maxElo      rating range, games without a numeric rating do not match
+        eloMode             'both' (both players in range), 'either' or 'average'
+        results             iterable of Result tag values, e.g. ('1-0', '0-1')
+        timeControls        iterable of TimeControl values or a function given the value
+        minBaseTime,
+        maxBaseTime         range of the base time of the TimeControl in seconds
+        event               substring of the Event tag (case insensitive) or a function given the value
+        eco                 ECO code prefix ('B', 'B9'), range ('B20-B99') or an iterable of these
+        tags                dictionary of any other tag to a value or a function given the value ('' if missing)
+
+    matched and rejected count the games tested so far."""
+
+    def __init__(self, minElo=None, maxElo=None, eloMode='both', results=None, timeControls=None,
+                 minBaseTime=None, maxBaseTime=None, event=None, eco=None, tags=None):
+        if eloMode not in ('both', 'either', 'average'):
+            raise ValueError("Unknown eloMode " + str(eloMode) + ", expected both, either or average")
+        self.minElo = minElo
+        self.maxElo = maxElo
+        self.eloMode = eloMode
+        self.results = frozenset(results) if results != None else None
+        self.timeControls = timeControls if timeControls == None or callable(timeControls) \
+            else frozenset(timeControls)
+        self.minBaseTime = minBaseTime
+        self.maxBaseTime = maxBaseTime
+        self.event = event
+        # An iterable of codes is kept as a set, so the settings do not depend on its type or order
+        self.eco = eco if eco == None or isinstance(eco, str) else frozenset(eco)
+        self.tags = dict(tags or {})
+        self._ecoRanges = self._ECORanges(self.eco)
+        self.matched = 0
+        self.rejected = 0
+
+    @staticmethod
+    def _ECORanges(eco):
+        """List of (low, high) ECO numbers for the eco option."""
+        if eco == None:
+            return None
+        ranges = []
+        for code in ([eco] if isinstance(eco, str) else eco):
+            low, _, high = code.upper().partition('-')
+            high = high or low
+            # A prefix covers every code that starts with it
+            lowValue = _ECOValue(low.ljust(3, '0'))
+            highValue = _ECOValue(high.ljust(3, '9'))
+            if lowValue == None or highValue == None:
+                raise ValueError("Invalid ECO code or range " + code)
+            ranges.append((lowValue, highValue))
+        return ranges
+
+    def _InRange(self, elo):
+        return elo != None and (self.minElo == None or elo >= self.minElo) and \
+            (self.maxElo == None or elo <= self.maxElo)
+
+    def _MatchElo(self, tags):
+        whiteElo = _Elo(tags, 'WhiteElo')
+        blackElo = _Elo(tags, 'BlackElo')
+        if self.eloMode == 'both':
+            return self._InRange(whiteElo) and self._InRange(blackElo)
+        if self.eloMode == 'either':
+            return self._InRange(whiteElo) or self._InRange(blackElo)
+        if whiteElo == None or blackElo == None:
+            return False
+        return self._InRange((whiteElo + blackElo) / 2)
+
+    def _Test(self, tags):
+        if (self.minElo != None or self.maxElo != None) and not self._MatchElo(tags):
+            return False
+
+        if self.results != None and tags.get('Result', '*') not in self.results:
+            return False
+
+        if self.timeControls != None or self.minBaseTime != None or self.maxBaseTime != None:
+            timeControl = tags.get('TimeControl', '')
+            if self.timeControls != None and not (self.timeControls(timeControl) if callable(self.timeControls)
+                                                  else timeControl in self.timeControls):
+                return False
+            if self.minBaseTime != None or self.maxBaseTime != None:
+                baseTime = BaseTime(timeControl)
+                if baseTime == None or (self.minBaseTime != None and baseTime < self.minBaseTime) or \
+                        (self.maxBaseTime != None and baseTime > self.maxBaseTime):
+                    return False
+
+        if self.event != None:
+            event = tags.get('Event', '')
+            if not (self.event(event) if callable(self.event) else self.event.lower() in event.lower()):
+                return False
+
+        if self._ecoRanges != None:
+            eco = _ECOValue(tags.get('ECO', ''))
+            if eco == None or not any(low <= eco <= high for low, high in self._ecoRanges):
+                return False
+
+        for tag, wanted in self.tags.items():
+            value = tags.get(tag, '')
+            if not (wanted(value) if callable(wanted) else value == wanted):
+                return False
+
+        return True
+
+    def Match(self, tags):
+        """Whether a game with these tags passes the filter."""
+        if self._Test(tags):
+            self.matched += 1
+            return True
+        self.rejected += 1
+        return False
+
+    def Settings(self):
+        """The options as a json compatible dictionary. Functions are given by their module and name, so a lambda
+        or a nested function raises ValueError."""
+        def Value(value):
+            if callable(value):
+                return _PredicateName(value)
+            if isinstance(value, frozenset):
+                return sorted(value)
+            if isinstance(value, dict):
+                return {key: Value(item) for key, item in value.items()}
+            return value
+
+        return {name: Value(getattr(self, name)) for name in ('minElo', 'maxElo', 'eloMode', 'results',
+                                                               'timeControls', 'minBaseTime', 'maxBaseTime',
+                                                               'event', 'eco', 'tags')}
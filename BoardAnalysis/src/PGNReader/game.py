@@ -1,8 +1,30 @@
-import re
 import random
 import copy
-from .board import Board
+import logging
+from array import array
+from .board import Board, startFEN, PackMove
 from .search import Search
+from .pgn import ReadGames
+from .gameindex import GameIndex
+
+logger = logging.getLogger(__name__)
+
+
+def PlayMoves(board, moves, errors=None, tags=None, firstPly=0, search=None):
+    """Generator that plays SAN moves on board in place and yields (ply, (startSquare, endSquare, flag)) after
+    each one. moves are the game's moves from ply firstPly on. Stops at the first move that can not be resolved,
+    which is logged and added to errors (a diagnostics.ErrorReport) with the game's tags if errors is given."""
+    if search == None:
+        search = Search(board)
+    for ply, move in enumerate(moves, firstPly):
+        combined = search.GetMoveSquares(move)
+        if combined == None:
+            logger.warning("Could not resolve move %s at ply %d", move, ply)
+            if errors != None:
+                errors.Add('move', tags, ply, move, "move could not be resolved")
+            return
+        board.MakeMove(*combined)
+        yield ply, combined
 
 # TO DO: Move the player switching from Board into this class.
 class Game:
@@ -74,13 +96,22 @@ class Game:
 class Replay:
     """Class allows you to input a game and walk through the moves of the game."""
     
-    def __init__(self, fileName=None, analysis=False):
+    def __init__(self, fileName=None, analysis=False, lazy=False, errors=None):
+        """With lazy the moves are resolved as NextMove reaches them instead of when a game is loaded. Moves that
+        can not be resolved are added to errors (a diagnostics.ErrorReport) if one is given."""
         self.board = Board()
         self.search = Search(self.board)
         self._tags = {}
         self._moves = []
-        self._boardPositions = []
+        self._packedMoves = array('H')
+        self._startFEN = startFEN
+        self._undo = []
+        self._lazy = lazy
+        # PlayMoves generator that resolves the moves of a lazy game as they are requested
+        self._player = None
         self.currentMove = 0
+        self.errorPly = None
+        self.errors = errors
 
         if fileName != None:
             self.ReadFile(fileName)
@@ -90,102 +121,121 @@ class Replay:
         #if analysis:
         #    self._ai = AI(self.board)
 
-    def ReadFile(self, fileName):
-        gameFile = open(fileName,"r")
-        # For each line in the file
-        for line in gameFile:
-            self.ParseLine(line)
-        
-        gameFile.close
-
-        # The last item in the moves list should specify who won (i.e., 1-0, 0-1, 1/2-1/2). Remove that from the moves list
-        if len(self._moves) > 0 and (re.match('[0-9](/2)?-[0-9]',self._moves[len(self._moves)-1]) != None):
-            gameResult = self._moves[len(self._moves)-1]
-            if(gameResult == '1-0'):
-                self.winner = 'w'
-            elif (gameResult == '0-1'):
-                self.winner = 'b'
-            else:
-                self.winner = 'draw'
-
-            self._moves = self._moves[:-1]
-        else:
-            self.winner = None
-
-        print(self._moves)
-        if len(self._moves) > 0:
+    def ReadFile(self, fileName, gameFilter=None):
+        """Load the first game in fileName, or the first one that matches gameFilter (a filters.GameFilter)."""
+        for game in ReadGames(fileName, gameFilter):
+            self.LoadGame(game)
+            break
+
+    def ReadGame(self, source, number):
+        """Load game number (0 is the first) of a PGN file without reading the games before it. source is a
+        gameindex.GameIndex or a file name, in which case the file's index is used (and built if needed)."""
+        if isinstance(source, GameIndex):
+            self.LoadGame(source.Game(number))
+            return
+        with GameIndex(source) as index:
+            self.LoadGame(index.Game(number))
+
+    def LoadGame(self, game):
+        """Load a PGNGame (see pgn.ReadGames) and resolve its moves, unless lazy."""
+        self._tags = game.tags
+        self._moves = game.moves
+        self.winner = game.winner
+        self.currentMove = 0
+        self._packedMoves = array('H')
+        self._startFEN = game.tags.get('FEN', startFEN)
+        self._undo = []
+        self.errorPly = None
+        self.board.SetFEN(self._startFEN)
+
+        logger.debug("Moves: %s", self._moves)
+        self._player = PlayMoves(self.board, self._moves, self.errors, self._tags, search=self.search) \
+            if self._lazy else None
+        if len(self._moves) > 0 and not self._lazy:
             self.CreateBoardPositions()
-    
-    def ParseLine(self, line):
-        # Does this line have moves or is it a tag pair
-        if re.search('\[.*\]',line):
-            # Tag Pair
-            self.ProcessTagPair(line)
-        else:
-            self.ProcessMoveLine(line)
-            pass
-    
-    def ProcessTagPair(self, line):
-        # Remove the brackets
-        currentLine = line[1:][:len(line)-3]
-        split = re.search('\s',currentLine)
-        self._tags[currentLine[:split.span()[0]]] = currentLine[split.span()[1]:]
-
-    def ProcessMoveLine(self, line):
-        moves = re.split('\s',line)
-        
-        for move in moves:
-            match = re.search('[0-9]+\.',move)
-            if (match):
-                move = move[match.span()[1]:]
-
-            if (re.search('[0-9]+\.',move) == None) and (move != ''):
-                self._moves.append(move)
 
     def CreateBoardPositions(self):
-        self._boardPositions = []
-
-        self._boardPositions.append(self.board.ExportFEN('w'))
-        
-        counter = 0
-        for currMove in self._moves:
-            if counter % 2 == 0:
-                color = 'w'
-            else:
-                color = 'b'
-
-            self._boardPositions.append(self.ExecuteMove(currMove, color))
-            counter += 1
-        
-        print("Processed " + str(counter) + " moves.")
-        self.board.SetFEN(self._boardPositions[0])
-        
-    def ExecuteMove(self, move, player):
-
-        combined = self.search.GetMove(move,player)
-
-        if combined == None:
-            print("Error: " + move)
-            return self.board.ExportFEN(player)
-
-        start, end, special = combined
-
-        self.board.MovePiece(start,end,special)
-        return self.board.ExportFEN(player)
+        """Resolve every move of the game into packed moves, up to the first one that can not be resolved, and
+        go back to the start position."""
+        self.errorPly = None
+        self._packedMoves = array('H', [PackMove(*move) for _, move in
+                                        PlayMoves(self.board, self._moves, self.errors, self._tags,
+                                                  search=self.search)])
+        self._SetErrorPly()
+
+        logger.debug("Processed %d moves.", len(self._packedMoves))
+        self.board.SetFEN(self._startFEN)
+        self.currentMove = 0
+        self._undo = []
+
+    def BoardPositions(self):
+        """FEN for every ply (ply 0 is the start position) up to the last move that has been resolved, replayed
+        from the packed moves on a separate board."""
+        board = Board(self._startFEN)
+        positions = [board.ExportFEN()]
+        for packed in self._packedMoves:
+            board.MakePackedMove(packed)
+            positions.append(board.ExportFEN())
+        return positions
+
+    def PackedMoves(self):
+        """The moves resolved so far as an array('H') of packed moves."""
+        return self._packedMoves
+
+    def _SetErrorPly(self):
+        """After PlayMoves stopped, errorPly is the ply of the first move that was not resolved."""
+        if self.errorPly == None and len(self._packedMoves) < len(self._moves):
+            self.errorPly = len(self._packedMoves)
+
+    def ExecuteMove(self, move, player=None):
+        """Play a SAN move on the board and return the FEN after it. The board tracks the side to move, so
+        player is not needed, and after the first move that fails (errorPly) nothing is played."""
+        if self.errorPly == None:
+            played = PlayMoves(self.board, [move], self.errors, self._tags, self.currentMove, self.search)
+            if next(played, None) == None:
+                self.errorPly = self.currentMove
+        return self.board.ExportFEN()
 
     def NextMove(self,num=1):
+        debug = logger.isEnabledFor(logging.DEBUG)
         for _ in range(num):
-            print(self._moves[self.currentMove])
+            if debug:
+                logger.debug("Move %s", self._moves[self.currentMove])
+            if self.currentMove < len(self._packedMoves):
+                self.board.MakePackedMove(self._packedMoves[self.currentMove])
+                played = True
+            elif self._player != None:
+                # The board is at the last resolved position, so the lazy generator can play the next move
+                resolved = next(self._player, None)
+                played = resolved != None
+                if played:
+                    self._packedMoves.append(PackMove(*resolved[1]))
+                else:
+                    self._SetErrorPly()
+            else:
+                # The move could not be resolved when the game was loaded
+                played = False
+            # Remember whether there is a move on the board's undo stack for this ply
+            self._undo.append(played)
             self.currentMove += 1
 
-        self.board.SetFEN(self._boardPositions[self.currentMove])
-        print(self.board)
+        if debug:
+            logger.debug("Board:\n%s", self.board)
 
     def PreviousMove(self,num=1):
+        """Go back num moves, no further than the start of the game, and return the FEN."""
+        num = min(num, self.currentMove)
         self.currentMove -= num
-    
-        self.board.SetFEN(self._boardPositions[self.currentMove])
-        print(self.board)
+
+        for _ in range(num):
+            if self._undo.pop():
+                self.board.UnmakeMove()
+        logger.debug("Board:\n%s", self.board)
+        return self.board.ExportFEN()
+
+    def CurrentFEN(self):
+        """FEN for the current position."""
+        return self.board.ExportFEN()
 
     def MoveCount(self):
         return len(self._moves)
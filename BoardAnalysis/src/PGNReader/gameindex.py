@@ -0,0 +1,242 @@
+"""Byte-offset index of the games in a PGN file, for random access without rescanning the file.
+
+BuildIndex scans a PGN file once and writes a sidecar index (by default the PGN file name plus '.idx') with the
+byte offset and length of every game and the values of a few key tags. The scan only looks at tag lines, the
+movetext is skipped. GameIndex loads the index, memory-maps the PGN file and parses a game only when it is
+asked for, so game N or every game matching a tag filter can be read straight away.
+
+Index file layout (little endian):
+    header   b'PGNI', version (B), number of tags (B), then each tag name as length (B) + utf-8
+    source   size of the PGN file (Q) and its modification time (d), used to detect a stale index
+    strings  count (I), then each string as length (H) + utf-8; id 0 is the empty string
+    games    count (Q), then one record per game: offset (Q), length (I) and a string id (I) per tag
+"""
+import io
+import logging
+import mmap
+import os
+import struct
+from .pgn import ParseTags, ReadGames
+from .writers import defaultTags
+
+_magic = b'PGNI'
+_version = 1
+_sourceHeader = struct.Struct('<Qd')
+
+logger = logging.getLogger(__name__)
+
+
+def IndexFileName(pgnFile):
+    return pgnFile + '.idx'
+
+
+def _ScanGames(pgnFile):
+    """Generator of (offset, length, tags) for every game, with the same game boundaries as ReadGames."""
+    with open(pgnFile, "rb") as source:
+        position = 0
+        start = 0
+        tags = {}
+        inMovetext = False
+        inGame = False
+
+        for line in source:
+            stripped = line.lstrip()
+            if stripped.startswith(b'['):
+                if inMovetext:
+                    yield start, position - start, tags
+                    tags = {}
+                    inMovetext = False
+                    inGame = False
+                if not inGame:
+                    start = position
+                    inGame = True
+                ParseTags(stripped.decode('utf-8', 'replace'), tags)
+            elif stripped and not stripped.startswith(b'%'):
+                if not inGame:
+                    start = position
+                    inGame = True
+                inMovetext = True
+            position += len(line)
+
+        if inGame:
+            yield start, position - start, tags
+
+
+def BuildIndex(pgnFile, indexFile=None, tags=defaultTags):
+    """Scan pgnFile and write its index. Returns the index file name."""
+    indexFile = indexFile or IndexFileName(pgnFile)
+    tags = tuple(tags)
+    record = struct.Struct('<QI' + str(len(tags)) + 'I')
+    stat = os.stat(pgnFile)
+
+    strings = {'': 0}
+    records = []
+    for offset, length, gameTags in _ScanGames(pgnFile):
+        tagIds = []
+        for tag in tags:
+            value = gameTags.get(tag, '')
+            stringId = strings.get(value)
+            if stringId == None:
+                stringId = strings[value] = len(strings)
+            tagIds.append(stringId)
+        records.append(record.pack(offset, length, *tagIds))
+
+    header = _magic + bytes([_version, len(tags)])
+    for tag in tags:
+        encoded = tag.encode()
+        header += bytes([len(encoded)]) + encoded
+    header += _sourceHeader.pack(stat.st_size, stat.st_mtime)
+
+    with open(indexFile + '.tmp', "wb") as output:
+        output.write(header)
+        output.write(struct.pack('<I', len(strings)))
+        for value in strings:
+            encoded = value.encode()
+            output.write(struct.pack('<H', len(encoded)) + encoded)
+        output.write(struct.pack('<Q', len(records)))
+        output.write(b''.join(records))
+    os.replace(indexFile + '.tmp', indexFile)
+    return indexFile
+
+
+class GameIndex:
+    """Random access to the games of a PGN file through its index. If build is True (the default) a missing or
+    stale index (the PGN file changed size or modification time) is rebuilt, otherwise ValueError is
+    raised."""
+
+    def __init__(self, pgnFile, indexFile=None, build=True, tags=defaultTags):
+        self.pgnFile = pgnFile
+        self.indexFile = indexFile or IndexFileName(pgnFile)
+        if not self._Load():
+            if not build:
+                raise ValueError("No up to date index " + self.indexFile + " for " + pgnFile)
+            BuildIndex(pgnFile, self.indexFile, tags)
+            self._Load()
+
+        self._file = open(pgnFile, "rb")
+        # mmap can not map an empty file
+        self._data = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if self._sourceSize else b''
+
+    def _Load(self):
+        """Read the index file. Returns False if it is missing, stale or damaged (e.g. truncated), so it is
+        rebuilt."""
+        if not os.path.exists(self.indexFile):
+            return False
+        with open(self.indexFile, "rb") as indexFile:
+            data = indexFile.read()
+
+        if len(data) >= len(_magic) and data[:4] != _magic:
+            raise ValueError(self.indexFile + " is not a game index.")
+        try:
+            return self._Parse(data)
+        except (struct.error, IndexError, UnicodeDecodeError):
+            logger.warning("Damaged game index %s, it is rebuilt", self.indexFile)
+            return False
+
+    def _Parse(self, data):
+        if data[:4] != _magic or data[4] != _version:
+            return False
+        numTags = data[5]
+        position = 6
+        tags = []
+        for _ in range(numTags):
+            length = data[position]
+            tags.append(data[position+1:position+1+length].decode())
+            position += 1 + length
+
+        sourceSize, sourceTime = _sourceHeader.unpack_from(data, position)
+        position += _sourceHeader.size
+        stat = os.stat(self.pgnFile)
+        if sourceSize != stat.st_size or sourceTime != stat.st_mtime:
+            return False
+
+        numStrings, = struct.unpack_from('<I', data, position)
+        position += 4
+        strings = []
+        for _ in range(numStrings):
+            length, = struct.unpack_from('<H', data, position)
+            if position + 2 + length > len(data):
+                return False
+            strings.append(data[position+2:position+2+length].decode())
+            position += 2 + length
+
+        numGames, = struct.unpack_from('<Q', data, position)
+        position += 8
+        record = struct.Struct('<QI' + str(numTags) + 'I')
+        if len(data) != position + numGames*record.size:
+            # Truncated, or the record count does not match the file
+            return False
+
+        self.tags = tuple(tags)
+        self._strings = strings
+        self._record = record
+        self._records = memoryview(data)[position:]
+        self._numGames = numGames
+        self._sourceSize = sourceSize
+        return True
+
+    def __len__(self):
+        return self._numGames
+
+    def Offset(self, number):
+        """(offset, length) in bytes of game number (0 is the first game)."""
+        offset, length, *_ = self._record.unpack_from(self._records, number*self._record.size)
+        return offset, length
+
+    def Tags(self, number):
+        """The indexed tags of game number (empty tags are left out)."""
+        _, _, *tagIds = self._record.unpack_from(self._records, number*self._record.size)
+        return {tag: self._strings[stringId] for tag, stringId in zip(self.tags, tagIds) if stringId}
+
+    def Text(self, number):
+        """The PGN text of game number."""
+        offset, length = self.Offset(number)
+        return self._data[offset:offset + length].decode('utf-8', 'replace')
+
+    def Game(self, number):
+        """Parse game number into a PGNGame."""
+        return next(ReadGames(io.StringIO(self.Text(number))))
+
+    def Find(self, **filters):
+        """Numbers of the games whose indexed tags match every filter. A filter value is either the tag value
+        or a function that is given the value (the empty string if the game does not have the tag), e.g.
+        Find(ECO='B90', WhiteElo=lambda elo: elo.isdigit() and int(elo) >= 2500)."""
+        for tag in filters:
+            if tag not in self.tags:
+                raise ValueError(tag + " is not an indexed tag, the index has " + ", ".join(self.tags))
+
+        strings = self._strings
+        # Compare string ids so each distinct value is only tested once
+        columns = []
+        for tag, wanted in filters.items():
+            matches = set(stringId for stringId, value in enumerate(strings)
+                          if (wanted(value) if callable(wanted) else value == wanted))
+            columns.append((self.tags.index(tag), matches))
+
+        numbers = []
+        for number, (_, _, *tagIds) in enumerate(self._record.iter_unpack(self._records)):
+            if all(tagIds[column] in matches for column, matches in columns):
+                numbers.append(number)
+        return numbers
+
+    def Filter(self, gameFilter):
+        """Numbers of the games whose indexed tags match a filters.GameFilter. Tags that are not indexed are
+        treated as missing."""
+        return [number for number in range(len(self)) if gameFilter.Match(self.Tags(number))]
+
+    def Games(self, numbers=None):
+        """Generator of the PGNGames for the game numbers given (all games if None)."""
+        for number in (range(len(self)) if numbers == None else numbers):
+            yield self.Game(number)
+
+    def Close(self):
+        if isinstance(self._data, mmap.mmap):
+            self._data.close()
+        self._records.release()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.Close()
@@ -0,0 +1,187 @@
+"""Legal move generation. Moves are (startSquare, endSquare, flag) tuples that can be passed straight to
+Board.MakeMove. Checks, pins, castling through attacked squares, en passant and promotions are all handled, so
+every generated move is legal."""
+from .attacks import knightAttacks, kingAttacks, pawnAttacks, rookTables, rookMasks, bishopTables, bishopMasks, \
+    betweenSquares
+from .board import noFlag, enPassantFlag, castleFlag, pawnTwoUpFlag, promoteToQueenFlag, promoteToKnightFlag, \
+    promoteToRookFlag, promoteToBishopFlag, whiteKingCastle, whiteQueenCastle, blackKingCastle, blackQueenCastle
+
+_promotionFlags = (promoteToQueenFlag, promoteToKnightFlag, promoteToRookFlag, promoteToBishopFlag)
+_allSquares = (1 << 64) - 1
+_rank1 = 0xFF
+_rank8 = 0xFF << 56
+
+
+def _Squares(bitboard):
+    squares = []
+    while bitboard:
+        lowestBit = bitboard & -bitboard
+        squares.append(lowestBit.bit_length() - 1)
+        bitboard ^= lowestBit
+    return squares
+
+
+def Attackers(bitboards, square, white, occupancy):
+    """Bitboard of the pieces of one side (white=True for white) that attack square given occupancy."""
+    base = 0 if white else 6
+    queens = bitboards[base+4]
+    return (pawnAttacks[1 if white else 0][square] & bitboards[base]) | \
+        (knightAttacks[square] & bitboards[base+1]) | \
+        (kingAttacks[square] & bitboards[base+5]) | \
+        (bishopTables[square][occupancy & bishopMasks[square]] & (bitboards[base+2] | queens)) | \
+        (rookTables[square][occupancy & rookMasks[square]] & (bitboards[base+3] | queens))
+
+
+def InCheck(board, color=None):
+    """Whether the king of color (default: side to move) is attacked."""
+    white = (color or board._currentPlayer) == 'w'
+    bitboards = board._bitboards
+    king = bitboards[5 if white else 11]
+    if not king:
+        return False
+    return Attackers(bitboards, king.bit_length() - 1, not white, board.Occupancy()) != 0
+
+
+def GenerateMoves(board, color=None):
+    """List of legal moves for color (default: side to move)."""
+    white = (color or board._currentPlayer) == 'w'
+    bitboards = board._bitboards
+    mailbox = board._mailbox
+    moves = []
+    append = moves.append
+
+    base = 0 if white else 6
+    enemyBase = 6 - base
+    own = bitboards[base] | bitboards[base+1] | bitboards[base+2] | bitboards[base+3] | bitboards[base+4] | \
+        bitboards[base+5]
+    enemy = bitboards[enemyBase] | bitboards[enemyBase+1] | bitboards[enemyBase+2] | bitboards[enemyBase+3] | \
+        bitboards[enemyBase+4] | bitboards[enemyBase+5]
+    occupancy = own | enemy
+
+    kingBitboard = bitboards[base+5]
+    if not kingBitboard:
+        return moves
+    king = kingBitboard.bit_length() - 1
+
+    # King moves: the king can not stay on a line attacked by a slider, so remove it from the occupancy
+    occupancyWithoutKing = occupancy ^ kingBitboard
+    for target in _Squares(kingAttacks[king] & ~own):
+        if not Attackers(bitboards, target, not white, occupancyWithoutKing):
+            append((king, target, noFlag))
+
+    checkers = Attackers(bitboards, king, not white, occupancy)
+    if checkers & (checkers - 1):
+        # Double check, only the king can move
+        return moves
+
+    if checkers:
+        checker = checkers.bit_length() - 1
+        # Capture the checker or block the line between it and the king
+        checkMask = checkers | betweenSquares[king][checker]
+    else:
+        checkMask = _allSquares
+
+    # Pinned pieces can only move along the line between the king and the pinning piece
+    pinRays = {}
+    enemyRooks = bitboards[enemyBase+3] | bitboards[enemyBase+4]
+    enemyBishops = bitboards[enemyBase+2] | bitboards[enemyBase+4]
+    pinners = (rookTables[king][enemy & rookMasks[king]] & enemyRooks) | \
+        (bishopTables[king][enemy & bishopMasks[king]] & enemyBishops)
+    for pinner in _Squares(pinners):
+        between = betweenSquares[king][pinner]
+        blockers = between & own
+        if blockers and not (blockers & (blockers - 1)) and not (between & enemy):
+            pinRays[blockers.bit_length() - 1] = between | (1 << pinner)
+
+    targetMask = ~own & checkMask
+
+    # Knights (a pinned knight can never move)
+    for square in _Squares(bitboards[base+1]):
+        if square not in pinRays:
+            for target in _Squares(knightAttacks[square] & targetMask):
+                append((square, target, noFlag))
+
+    # Bishops, rooks and queens
+    for square in _Squares(bitboards[base+2] | bitboards[base+4]):
+        targets = bishopTables[square][occupancy & bishopMasks[square]] & targetMask
+        if square in pinRays:
+            targets &= pinRays[square]
+        for target in _Squares(targets):
+            append((square, target, noFlag))
+
+    for square in _Squares(bitboards[base+3] | bitboards[base+4]):
+        targets = rookTables[square][occupancy & rookMasks[square]] & targetMask
+        if square in pinRays:
+            targets &= pinRays[square]
+        for target in _Squares(targets):
+            append((square, target, noFlag))
+
+    # Pawns
+    forward = 8 if white else -8
+    startRank = 1 if white else 6
+    promotionRank = _rank8 if white else _rank1
+    pawnCaptures = pawnAttacks[0 if white else 1]
+    empty = ~occupancy
+    ep = board._ep
+    for square in _Squares(bitboards[base]):
+        allowed = checkMask & pinRays.get(square, _allSquares)
+
+        targets = 0
+        push = square + forward
+        if (empty >> push) & 1:
+            targets |= 1 << push
+            if (square >> 3) == startRank and (empty >> (push + forward)) & 1 and \
+                    (allowed >> (push + forward)) & 1:
+                append((square, push + forward, pawnTwoUpFlag))
+        targets |= pawnCaptures[square] & enemy
+        targets &= allowed
+
+        for target in _Squares(targets):
+            if (1 << target) & promotionRank:
+                for flag in _promotionFlags:
+                    append((square, target, flag))
+            else:
+                append((square, target, noFlag))
+
+        if ep >= 0 and (pawnCaptures[square] >> ep) & 1:
+            # Check en passant by removing both pawns, this also covers the rank pin where the king, both pawns
+            # and an enemy rook share a rank
+            captured = ep - forward
+            epOccupancy = (occupancy ^ (1 << square) ^ (1 << captured)) | (1 << ep)
+            enemyBitboards = list(bitboards)
+            enemyBitboards[enemyBase] ^= 1 << captured
+            if mailbox[captured] == enemyBase + 1 and \
+                    not Attackers(enemyBitboards, king, not white, epOccupancy):
+                append((square, ep, enPassantFlag))
+
+    # Castling
+    if not checkers:
+        castle = board._castle
+        kingSide, queenSide = (whiteKingCastle, whiteQueenCastle) if white else (blackKingCastle, blackQueenCastle)
+        if castle & kingSide and not (occupancy & (0b11 << (king + 1))) and \
+                mailbox[king + 3] == base + 4 and \
+                not Attackers(bitboards, king + 1, not white, occupancy) and \
+                not Attackers(bitboards, king + 2, not white, occupancy):
+            append((king, king + 2, castleFlag))
+        if castle & queenSide and not (occupancy & (0b111 << (king - 3))) and \
+                mailbox[king - 4] == base + 4 and \
+                not Attackers(bitboards, king - 1, not white, occupancy) and \
+                not Attackers(bitboards, king - 2, not white, occupancy):
+            append((king, king - 2, castleFlag))
+
+    return moves
+
+
+def Perft(board, depth, color=None):
+    """Number of leaf nodes of the legal move tree of the given depth."""
+    white = (color or board._currentPlayer) == 'w'
+    moves = GenerateMoves(board, 'w' if white else 'b')
+    if depth <= 1:
+        return len(moves) if depth == 1 else 1
+
+    nodes = 0
+    for startSquare, endSquare, flag in moves:
+        board.MakeMove(startSquare, endSquare, flag)
+        nodes += Perft(board, depth - 1)
+        board.UnmakeMove()
+    return nodes
@@ -0,0 +1,105 @@
+"""A corpus of games held in memory as packed moves.
+
+The SAN moves of every game are resolved once and stored as 16 bit packed moves (see board.PackMove) in one
+array('H') shared by all games, with the offset of each game's first move in a second array. A game of 80 plies
+takes 160 bytes instead of 80 move strings, and replaying it is one Board.MakePackedMove per ply without any SAN
+resolution, so a whole corpus can be kept in memory and replayed in a batch.
+"""
+from array import array
+from .board import Board, startFEN, PackMove, UnpackMove
+from .search import Search, MoveToSAN
+from .pgn import PGNGame
+from .game import PlayMoves
+
+
+class PackedGames:
+    """Games as packed moves in one contiguous buffer. The start FEN (None for the standard start position),
+    result and, unless tags is False, the tags of each game are kept alongside. A game with a move that can not
+    be resolved is stored up to that move and the move is added to errors (a diagnostics.ErrorReport) if one is
+    given."""
+
+    def __init__(self, games=None, tags=True, errors=None):
+        self.moves = array('H')
+        self.offsets = array('Q', [0])
+        self.starts = []
+        self.results = []
+        self.tags = [] if tags else None
+        self.errors = errors
+        self.board = Board()
+        self.search = Search(self.board)
+
+        if games != None:
+            self.AddGames(games)
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def Add(self, game):
+        """Resolve the moves of a PGNGame and add it. Returns the game number."""
+        board = self.board
+        start = game.tags.get('FEN')
+        board.SetFEN(start or startFEN)
+
+        moves = self.moves
+        for _, move in PlayMoves(board, game.moves, self.errors, game.tags, search=self.search):
+            moves.append(PackMove(*move))
+
+        self.offsets.append(len(moves))
+        self.starts.append(start)
+        self.results.append(game.result)
+        if self.tags != None:
+            self.tags.append(game.tags)
+        return len(self) - 1
+
+    def AddGames(self, games):
+        for game in games:
+            self.Add(game)
+
+    def Moves(self, number):
+        """The packed moves of game number as an array('H')."""
+        return self.moves[self.offsets[number]:self.offsets[number+1]]
+
+    def MoveCount(self, number):
+        return self.offsets[number+1] - self.offsets[number]
+
+    def Positions(self, number, plies=None):
+        """Generator of (ply, FEN) of game number for the sorted plies requested, every ply (0 is the start
+        position) if plies is None."""
+        board = self.board
+        board.SetFEN(self.starts[number] or startFEN)
+        start = self.offsets[number]
+        numMoves = self.offsets[number+1] - start
+        moves = self.moves
+
+        ply = 0
+        for wanted in (range(numMoves + 1) if plies == None else plies):
+            if wanted > numMoves:
+                break
+            while ply < wanted:
+                board.MakePackedMove(moves[start + ply])
+                ply += 1
+            yield ply, board.ExportFEN()
+
+    def Replay(self, number):
+        """List of FENs for every ply of game number."""
+        return [fen for _, fen in self.Positions(number)]
+
+    def Game(self, number):
+        """Game number as a PGNGame, with its SAN moves generated from the packed moves."""
+        board = self.board
+        board.SetFEN(self.starts[number] or startFEN)
+        moves = []
+        for packed in self.Moves(number):
+            move = UnpackMove(packed)
+            moves.append(MoveToSAN(board, move))
+            board.MakeMove(*move)
+
+        if self.tags != None:
+            tags = dict(self.tags[number])
+        else:
+            tags = {'FEN': self.starts[number]} if self.starts[number] else {}
+        return PGNGame(tags, moves, self.results[number])
+
+    def Memory(self):
+        """Bytes used by the move and offset buffers."""
+        return self.moves.itemsize*len(self.moves) + self.offsets.itemsize*len(self.offsets)
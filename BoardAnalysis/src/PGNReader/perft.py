@@ -0,0 +1,84 @@
+"""Perft benchmark suite for the legal move generator.
+
+The reference positions have published node counts and check correctness. The positions in
+Chess-Challenge/resources/Fens.txt give a throughput baseline. Run with:
+
+    python -m PGNReader.perft [--depth N] [--fens FILE] [--limit N]
+"""
+import argparse
+import os
+import time
+from .board import Board
+from .movegen import Perft
+
+defaultFenFile = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', '..', 'Chess-Challenge',
+                              'resources', 'Fens.txt')
+
+# Positions from https://www.chessprogramming.org/Perft_Results with node counts by depth (starting at 1)
+referencePositions = [
+    ('rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1', [20, 400, 8902, 197281]),
+    ('r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1', [48, 2039, 97862]),
+    ('8/2p5/3p4/KP5r/1R3p1k/8/4P1P1/8 w - - 0 1', [14, 191, 2812, 43238]),
+    ('r3k2r/Pppp1ppp/1b3nbN/nP6/BBP1P3/q4N2/Pp1P2PP/R2Q1RK1 w kq - 0 1', [6, 264, 9467]),
+    ('rnbq1k1r/pp1Pbppp/2p5/8/2B5/8/PPP1NnPP/RNBQK2R w KQ - 1 8', [44, 1486, 62379]),
+    ('r4rk1/1pp1qppp/p1np1n2/2b1p1B1/2B1P1b1/P1NP1N2/1PP1QPPP/R4RK1 w - - 0 10', [46, 2079, 89890]),
+]
+
+
+def CheckReference(maxDepth=3):
+    """Run the reference positions up to maxDepth. Returns a list of (fen, depth, nodes, expected) for every
+    mismatch, so an empty list means the move generator is correct on all of them."""
+    failures = []
+    for fen, expected in referencePositions:
+        board = Board(fen)
+        for depth, nodes in enumerate(expected[:maxDepth], 1):
+            result = Perft(board, depth)
+            if result != nodes:
+                failures.append((fen, depth, result, nodes))
+    return failures
+
+
+def ReadFens(filename=defaultFenFile):
+    with open(filename, "r", encoding="utf-8-sig") as fenFile:
+        return [line.strip() for line in fenFile if line.strip()]
+
+
+def RunSuite(fens, depth=2):
+    """Perft every position to depth. Returns a dictionary with the per-position node counts, the total nodes,
+    the elapsed time and nodes per second."""
+    results = []
+    totalNodes = 0
+    start = time.perf_counter()
+    for fen in fens:
+        nodes = Perft(Board(fen), depth)
+        results.append((fen, nodes))
+        totalNodes += nodes
+    elapsed = time.perf_counter() - start
+
+    return {"depth": depth, "positions": len(fens), "nodes": totalNodes, "seconds": elapsed,
+            "nps": totalNodes / elapsed if elapsed > 0 else 0.0, "results": results}
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(description="Perft correctness and throughput suite.")
+    parser.add_argument("--depth", type=int, default=2, help="perft depth for the Fens.txt positions")
+    parser.add_argument("--fens", default=defaultFenFile, help="file with one FEN per line")
+    parser.add_argument("--limit", type=int, default=None, help="only use the first LIMIT positions")
+    parser.add_argument("--reference-depth", type=int, default=3, help="depth for the reference positions")
+    options = parser.parse_args(args)
+
+    failures = CheckReference(options.reference_depth)
+    for fen, depth, nodes, expected in failures:
+        print("FAIL " + fen + " depth " + str(depth) + ": " + str(nodes) + " expected " + str(expected))
+    print("Reference positions: " + ("OK" if not failures else str(len(failures)) + " failures"))
+
+    summary = RunSuite(ReadFens(options.fens)[:options.limit], options.depth)
+    print("Positions: " + str(summary["positions"]) + "  depth: " + str(summary["depth"]) + "  nodes: " +
+          str(summary["nodes"]) + "  time: " + format(summary["seconds"], ".2f") + "s  nps: " +
+          format(summary["nps"], ".0f"))
+
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,146 @@
+"""Streaming PGN reader. ReadGames walks a (possibly multi-gigabyte) PGN file and yields one game at a time, so
+memory use is bounded by the size of a single game and no intermediate files are written."""
+import re
+
+_tagPattern = re.compile(r'\[\s*(\w+)\s+"((?:[^"\\]|\\.)*)"\s*\]')
+_commentPattern = re.compile(r'\{[^}]*\}|;[^\n]*')
+_variationPattern = re.compile(r'\([^()]*\)')
+_tokenPattern = re.compile(r'[^\s.]+')
+_moveNumberPattern = re.compile(r'\d+\.+')
+_results = ('1-0', '0-1', '1/2-1/2', '*')
+
+
+class PGNGame:
+    """A single parsed game: the tag pairs, the SAN moves and the game termination marker."""
+
+    __slots__ = ('tags', 'moves', 'result')
+
+    def __init__(self, tags=None, moves=None, result=None):
+        self.tags = tags if tags != None else {}
+        self.moves = moves if moves != None else []
+        self.result = result
+
+    @property
+    def winner(self):
+        """'w', 'b', 'draw', or None if the game has no result."""
+        if self.result == '1-0':
+            return 'w'
+        elif self.result == '0-1':
+            return 'b'
+        elif self.result == '1/2-1/2':
+            return 'draw'
+        return None
+
+    def __repr__(self):
+        return 'PGNGame(' + str(len(self.tags)) + ' tags, ' + str(len(self.moves)) + ' moves, ' + str(self.result) + ')'
+
+
+def ParseTags(line, tags):
+    """Add the tag pair(s) on line to the tags dictionary."""
+    for name, value in _tagPattern.findall(line):
+        tags[name] = value.replace('\\"', '"').replace('\\\\', '\\')
+
+
+def ParseMovetext(movetext):
+    """Split movetext into a list of SAN moves and the result marker. Comments, variations, NAGs and move
+    numbers are dropped."""
+    movetext = _commentPattern.sub(' ', movetext)
+    # Strip variations from the innermost outward so nested variations are handled
+    while '(' in movetext:
+        stripped = _variationPattern.sub(' ', movetext)
+        if stripped == movetext:
+            # Unbalanced parenthesis, drop everything after it
+            stripped = movetext[:movetext.index('(')]
+        movetext = stripped
+    # The e.p. after an en passant capture would otherwise be split at its dots into two moves
+    if 'e.p.' in movetext:
+        movetext = movetext.replace('e.p.', ' ')
+
+    moves = []
+    result = None
+    for token in _tokenPattern.findall(_moveNumberPattern.sub(' ', movetext)):
+        if token in _results:
+            result = token
+        elif token[0] != '$':
+            moves.append(token)
+
+    return moves, result
+
+
+def ReadGames(source, gameFilter=None):
+    """Generator that yields a PGNGame for each game in source. Source is either a file name or an open text
+    file. gameFilter (a filters.GameFilter) is tested on the tags of each game and the movetext of the games
+    that do not match is skipped without being parsed."""
+    if isinstance(source, str):
+        with open(source, "r", encoding="utf-8", errors="replace") as pgnFile:
+            yield from ReadGames(pgnFile, gameFilter)
+        return
+
+    tags = {}
+    movetext = []
+    skip = False
+
+    for line in source:
+        stripped = line.lstrip()
+        if stripped.startswith('['):
+            if movetext or skip:
+                # A tag after movetext starts the next game
+                if not skip:
+                    yield _FinishGame(tags, movetext)
+                tags = {}
+                movetext = []
+                skip = False
+            ParseTags(stripped, tags)
+        elif stripped and not stripped.startswith('%') and not skip:
+            if not movetext and gameFilter != None and not gameFilter.Match(tags):
+                skip = True
+                continue
+            movetext.append(line)
+
+    if (tags or movetext) and not skip and (movetext or gameFilter == None or gameFilter.Match(tags)):
+        yield _FinishGame(tags, movetext)
+
+
+def ReadGameOffsets(filename, offset=0, gameFilter=None):
+    """Generator like ReadGames for a file name that yields (start, end, PGNGame) with the byte offsets of the
+    game in the file. Reading starts at offset, which must be the start of a game (e.g. the end of the last
+    game read), so an interrupted read can be resumed. Games that do not match gameFilter are skipped."""
+    with open(filename, "rb") as pgnFile:
+        pgnFile.seek(offset)
+        position = offset
+        start = offset
+        tags = {}
+        movetext = []
+        skip = False
+
+        for rawLine in pgnFile:
+            line = rawLine.decode('utf-8', 'replace')
+            stripped = line.lstrip()
+            if stripped.startswith('['):
+                if movetext or skip:
+                    if not skip:
+                        yield start, position, _FinishGame(tags, movetext)
+                    tags = {}
+                    movetext = []
+                    skip = False
+                if not tags:
+                    start = position
+                ParseTags(stripped, tags)
+            elif stripped and not stripped.startswith('%') and not skip:
+                if not tags and not movetext:
+                    start = position
+                if not movetext and gameFilter != None and not gameFilter.Match(tags):
+                    skip = True
+                else:
+                    movetext.append(line)
+            position += len(rawLine)
+
+        if (tags or movetext) and not skip and (movetext or gameFilter == None or gameFilter.Match(tags)):
+            yield start, position, _FinishGame(tags, movetext)
+
+
+def _FinishGame(tags, movetext):
+    moves, result = ParseMovetext(''.join(movetext))
+    if result == None:
+        result = tags.get('Result')
+    return PGNGame(tags, moves, result)
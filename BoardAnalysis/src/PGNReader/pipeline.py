@@ -0,0 +1,262 @@
+"""Continuous ingest pipeline: read PGN games, replay and sample them on a pool of worker processes and write the
+entries, all in one asyncio event loop.
+
+    reader --(chunk queue)--> workers --(result queue)--> writer
+
+The reader cuts the games into chunks of chunksize games. Both queues are bounded, so a slow stage makes the
+stages before it wait instead of buffering, and the reader also waits while 2*queueSize + workers chunks have
+been read but not written. Memory stays capped at that many chunks even when an ordered writer holds chunks
+back behind a slow one. Blocking file reads and writes run in threads and the replay runs in a
+ProcessPoolExecutor, so the event loop is only used to move chunks between the stages.
+
+Sources are PGN files or directories of PGN files. With follow=True the directories are polled for new files
+until Stop() is called, so a rolling feed of PGN files is ingested as it arrives.
+"""
+import asyncio
+import itertools
+import logging
+import os
+import pathlib
+import time
+from concurrent.futures import ProcessPoolExecutor
+from .pgn import ReadGames
+from .sampling import Sampler
+from .writers import OpenWriter
+from .MoveExport import _ProcessChunk, _CacheLocation
+from .diagnostics import ErrorReport
+
+logger = logging.getLogger(__name__)
+
+
+class StageStats:
+    """Throughput counters for one stage. busy is the time spent working, the rest of the stage's time was
+    spent waiting on its queues, so the stage with the highest busy fraction is the bottleneck. busy is summed
+    over the parallel tasks of the stage and the fraction is per task."""
+
+    def __init__(self, name, unit, parallel=1):
+        self.name = name
+        self.unit = unit
+        self.parallel = parallel
+        self.items = 0
+        self.chunks = 0
+        self.busy = 0.0
+
+    def Summary(self, elapsed):
+        return {"stage": self.name, "unit": self.unit, "items": self.items, "chunks": self.chunks,
+                "rate": self.items / elapsed if elapsed > 0 else 0.0, "busy": self.busy,
+                "busyFraction": self.busy / (elapsed*self.parallel) if elapsed > 0 else 0.0}
+
+
+class Pipeline:
+    """Reader, worker and writer stages connected by bounded queues. format is ndjson, binary or columnar (see
+    writers.OpenWriter), the other options are the MoveExporter ones. reportInterval (seconds) logs the
+    throughput report at info level. Games that could not be replayed are collected in errors and written to
+    the errorReport file (NDJSON) at the end. gameFilter (a filters.GameFilter) is applied by the reader."""
+
+    def __init__(self, sources, outfile, format='ndjson', sampler=None, workers=None, chunksize=64,
+                 queueSize=None, prefixMemory=0, ordered=False, follow=False, pollInterval=1.0,
+                 reportInterval=None, errorReport=None, gameFilter=None, positionCache=None):
+        if isinstance(sources, str):
+            sources = [sources]
+        self.sources = list(sources)
+        self.outfile = outfile
+        self.format = format
+        self.sampler = sampler if sampler != None else Sampler()
+        self.workers = workers or os.cpu_count() or 1
+        self.chunksize = chunksize
+        self.queueSize = queueSize or 2*self.workers
+        self.prefixMemory = prefixMemory
+        self.ordered = ordered
+        self.follow = follow
+        self.pollInterval = pollInterval
+        self.reportInterval = reportInterval
+        self.errorReport = errorReport
+        self.gameFilter = gameFilter
+        self.positionCache = positionCache
+        self.errors = ErrorReport()
+        self.stats = {"reader": StageStats("reader", "games"), "workers": StageStats("workers", "games", self.workers),
+                      "writer": StageStats("writer", "entries")}
+        self._stop = None
+        self._loop = None
+        self._start = None
+        self._sizes = {}
+        self._window = None
+
+    def Stop(self):
+        """Ask a following pipeline to finish the files it has found and exit. Safe to call from another
+        thread."""
+        if self._stop != None:
+            self._loop.call_soon_threadsafe(self._stop.set)
+
+    def _PGNFiles(self, seen):
+        """PGN files in the sources that have not been seen. In follow mode a file is only taken once its size
+        is the same on two polls, so files that are still being written are left for later."""
+        files = []
+        for source in self.sources:
+            if os.path.isdir(source):
+                candidates = [os.path.join(source, name) for name in sorted(os.listdir(source))
+                              if pathlib.Path(name).suffix == '.pgn']
+            else:
+                candidates = [source]
+
+            for candidate in candidates:
+                if candidate in seen or not os.path.isfile(candidate):
+                    continue
+                if self.follow:
+                    size = os.path.getsize(candidate)
+                    if self._sizes.get(candidate) != size:
+                        self._sizes[candidate] = size
+                        continue
+                seen.add(candidate)
+                files.append(candidate)
+        return files
+
+    async def _Reader(self, chunkQueue):
+        loop = asyncio.get_running_loop()
+        stats = self.stats["reader"]
+        seen = set()
+        chunkIndex = 0
+
+        while True:
+            # Chunks run on across files, like the chained games of MoveExporter.LoadGames, so the chunks and
+            # their sampler forks are the same as LoadGames for the same files
+            games = itertools.chain.from_iterable(ReadGames(pgnFile, self.gameFilter)
+                                                  for pgnFile in self._PGNFiles(seen))
+            while True:
+                started = time.perf_counter()
+                chunk = await loop.run_in_executor(None, list, itertools.islice(games, self.chunksize))
+                stats.busy += time.perf_counter() - started
+                if not chunk:
+                    break
+                stats.items += len(chunk)
+                stats.chunks += 1
+                # Waits here while the workers or the writer are behind
+                await self._window.acquire()
+                await chunkQueue.put((chunkIndex, chunk))
+                chunkIndex += 1
+
+            if not self.follow or self._stop.is_set():
+                break
+            try:
+                await asyncio.wait_for(self._stop.wait(), self.pollInterval)
+            except asyncio.TimeoutError:
+                pass
+
+        for _ in range(self.workers):
+            await chunkQueue.put(None)
+
+    async def _Worker(self, pool, chunkQueue, resultQueue):
+        loop = asyncio.get_running_loop()
+        stats = self.stats["workers"]
+        while True:
+            item = await chunkQueue.get()
+            if item == None:
+                break
+            chunkIndex, chunk = item
+
+            started = time.perf_counter()
+            entries, errors = await loop.run_in_executor(pool, _ProcessChunk, chunk, self.sampler.Fork(chunkIndex),
+                                                         self.prefixMemory, _CacheLocation(self.positionCache))
+            self.errors.Extend(errors)
+            stats.busy += time.perf_counter() - started
+            stats.items += len(chunk)
+            stats.chunks += 1
+            await resultQueue.put((chunkIndex, entries))
+
+        await resultQueue.put(None)
+
+    @staticmethod
+    def _WriteEntries(writer, entries):
+        for entry in entries:
+            writer.Write(entry)
+
+    async def _Writer(self, resultQueue):
+        loop = asyncio.get_running_loop()
+        stats = self.stats["writer"]
+        finishedWorkers = 0
+        # Chunks that finished ahead of an earlier chunk, only used when ordered
+        waiting = {}
+        nextChunk = 0
+
+        with OpenWriter(self.outfile, self.format) as writer:
+            while finishedWorkers < self.workers:
+                item = await resultQueue.get()
+                if item == None:
+                    finishedWorkers += 1
+                    continue
+
+                if self.ordered:
+                    waiting[item[0]] = item[1]
+                    ready = []
+                    chunks = 0
+                    while nextChunk in waiting:
+                        ready.extend(waiting.pop(nextChunk))
+                        nextChunk += 1
+                        chunks += 1
+                    if not chunks:
+                        continue
+                    entries = ready
+                else:
+                    entries = item[1]
+                    chunks = 1
+
+                started = time.perf_counter()
+                await loop.run_in_executor(None, self._WriteEntries, writer, entries)
+                stats.busy += time.perf_counter() - started
+                stats.items += len(entries)
+                stats.chunks += chunks
+                for _ in range(chunks):
+                    self._window.release()
+
+    async def _Report(self):
+        while True:
+            await asyncio.sleep(self.reportInterval)
+            logger.info(self.FormatReport())
+
+    def Report(self):
+        """Per-stage throughput so far."""
+        elapsed = time.perf_counter() - self._start if self._start != None else 0.0
+        return {"elapsed": elapsed, "stages": [stats.Summary(elapsed) for stats in self.stats.values()],
+                "errors": self.errors.Counts()}
+
+    def FormatReport(self):
+        report = self.Report()
+        return "  ".join(stage["stage"] + ": " + str(stage["items"]) + " " + stage["unit"] + " (" +
+                         format(stage["rate"], '.1f') + "/s, busy " + format(100*stage["busyFraction"], '.0f') +
+                         "%)" for stage in report["stages"])
+
+    async def Run(self):
+        """Run the pipeline until every source has been read (or Stop is called when following). Returns the
+        final Report."""
+        self._stop = asyncio.Event()
+        self._loop = asyncio.get_running_loop()
+        self._start = time.perf_counter()
+        chunkQueue = asyncio.Queue(self.queueSize)
+        resultQueue = asyncio.Queue(self.queueSize)
+        # Chunks that have been read but not written. This also bounds the chunks the writer holds back in
+        # ordered mode while it waits for a slow chunk.
+        self._window = asyncio.Semaphore(2*self.queueSize + self.workers)
+
+        with ProcessPoolExecutor(max_workers=self.workers) as pool:
+            tasks = [asyncio.ensure_future(self._Reader(chunkQueue)),
+                     asyncio.ensure_future(self._Writer(resultQueue))]
+            tasks += [asyncio.ensure_future(self._Worker(pool, chunkQueue, resultQueue))
+                      for _ in range(self.workers)]
+            reporter = asyncio.ensure_future(self._Report()) if self.reportInterval else None
+            try:
+                # The first failure stops every stage
+                await asyncio.gather(*tasks)
+            finally:
+                for task in tasks + [reporter]:
+                    if task != None:
+                        task.cancel()
+
+        if self.errorReport != None:
+            self.errors.Write(self.errorReport)
+        return self.Report()
+
+
+def RunPipeline(sources, outfile, **options):
+    """Run a Pipeline to completion from synchronous code and return its report. See Pipeline for the
+    options."""
+    return asyncio.run(Pipeline(sources, outfile, **options).Run())
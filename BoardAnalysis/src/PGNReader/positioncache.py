@@ -0,0 +1,181 @@
+"""Persistent cache of the replayed positions of each game, for repeated runs over the same games.
+
+A game is keyed by a hash of its start position and SAN moves, so the same game in another file (or with other
+tags, comments or clock annotations) shares the entry. The entry holds every position of the game packed with
+Board.Pack (ply 0 first), so any set of plies can be sampled from it without resolving a single SAN move.
+Games with a move that can not be resolved are cached up to that move together with its ply.
+
+The cache is an sqlite3 database. maxBytes bounds the packed position data it holds; when it is exceeded the
+least recently used games are evicted. New entries and lookups are buffered and written in one transaction per
+Commit (automatic every commitGames new games), so several processes can share one cache file.
+"""
+import hashlib
+import logging
+import sqlite3
+from .board import Board, startFEN
+from .search import Search
+from .game import PlayMoves
+
+logger = logging.getLogger(__name__)
+
+_version = 1
+_evictBatch = 256
+
+
+def GameKey(game):
+    """Hash of the start position and moves of a PGNGame."""
+    text = game.tags.get('FEN', startFEN) + '\n' + ' '.join(game.moves)
+    return hashlib.blake2b(text.encode(), digest_size=16).digest()
+
+
+class PositionCache:
+    """Packed positions of games by GameKey, bounded to maxBytes of position data with LRU eviction."""
+
+    def __init__(self, filename, maxBytes=1 << 30, commitGames=256):
+        self.filename = filename
+        self.maxBytes = maxBytes
+        self.commitGames = commitGames
+        self.board = Board()
+        self.search = Search(self.board)
+        # Lookups that found the game and games that had to be replayed
+        self.hits = 0
+        self.misses = 0
+        self._added = {}
+        self._used = {}
+
+        self._connection = sqlite3.connect(filename, timeout=60, isolation_level=None)
+        self._connection.execute('PRAGMA journal_mode=WAL')
+        self._connection.execute('CREATE TABLE IF NOT EXISTS games (key BLOB PRIMARY KEY, positions BLOB NOT NULL, '
+                                 'errorPly INTEGER, used INTEGER NOT NULL)')
+        self._connection.execute('CREATE INDEX IF NOT EXISTS gamesUsed ON games (used)')
+        self._connection.execute('CREATE TABLE IF NOT EXISTS info (name TEXT PRIMARY KEY, value INTEGER NOT NULL)')
+        if self._Info('version', _version) != _version:
+            raise ValueError(filename + " is a position cache of another version, delete it to rebuild it")
+
+    def _Info(self, name, default=0):
+        row = self._connection.execute('SELECT value FROM info WHERE name = ?', (name,)).fetchone()
+        if row == None:
+            self._connection.execute('INSERT OR IGNORE INTO info VALUES (?, ?)', (name, default))
+            return default
+        return row[0]
+
+    def _SetInfo(self, name, value):
+        self._connection.execute('INSERT OR REPLACE INTO info VALUES (?, ?)', (name, value))
+
+    def __len__(self):
+        return self._connection.execute('SELECT COUNT(*) FROM games').fetchone()[0] + len(self._added)
+
+    def Size(self):
+        """Bytes of packed position data in the cache (committed entries only)."""
+        return self._Info('bytes')
+
+    def Get(self, key):
+        """(positions, errorPly) for a GameKey, None if the game is not cached."""
+        entry = self._added.get(key)
+        if entry != None:
+            return entry
+        row = self._connection.execute('SELECT positions, errorPly FROM games WHERE key = ?', (key,)).fetchone()
+        if row == None:
+            return None
+        # Keep the lookups in order so the last one used is the most recent
+        self._used.pop(key, None)
+        self._used[key] = None
+        return row
+
+    def Put(self, key, positions, errorPly=None):
+        self._added[key] = (positions, errorPly)
+        if len(self._added) >= self.commitGames:
+            self.Commit()
+
+    def Positions(self, game, errors=None):
+        """(positions, errorPly) of a PGNGame: the packed positions from ply 0 up to the last one that could be
+        reached, packedSize bytes each, and the ply of the move that could not be resolved (None if there is
+        none). Games that are not cached are replayed and added. The move that could not be resolved is added
+        to errors (a diagnostics.ErrorReport) if one is given, whether or not the game was cached."""
+        key = GameKey(game)
+        entry = self.Get(key)
+        if entry == None:
+            self.misses += 1
+            entry = self._Replay(game)
+            self.Put(key, *entry)
+        else:
+            self.hits += 1
+
+        errorPly = entry[1]
+        if errorPly != None and errors != None:
+            errors.Add('move', game.tags, errorPly, game.moves[errorPly], "move could not be resolved")
+        return entry
+
+    def _Replay(self, game):
+        board = self.board
+        board.SetFEN(game.tags.get('FEN', startFEN))
+        positions = [board.Pack()]
+        # The error is added by Positions, which also reports it for cached games
+        for _ in PlayMoves(board, game.moves, search=self.search):
+            positions.append(board.Pack())
+        errorPly = len(positions) - 1 if len(positions) <= len(game.moves) else None
+        return b''.join(positions), errorPly
+
+    def Commit(self):
+        """Write the new games and the lookups since the last commit and evict the least recently used games
+        until the cache fits in maxBytes."""
+        if not self._added and not self._used:
+            return
+        connection = self._connection
+        connection.execute('BEGIN IMMEDIATE')
+        try:
+            clock = self._Info('clock')
+            size = self._Info('bytes')
+            for key in self._used:
+                clock += 1
+                connection.execute('UPDATE games SET used = ? WHERE key = ?', (clock, key))
+            for key, (positions, errorPly) in self._added.items():
+                clock += 1
+                row = connection.execute('SELECT length(positions) FROM games WHERE key = ?', (key,)).fetchone()
+                if row != None:
+                    # Another process added the game since it was looked up
+                    size -= row[0]
+                connection.execute('INSERT OR REPLACE INTO games VALUES (?, ?, ?, ?)',
+                                   (key, positions, errorPly, clock))
+                size += len(positions)
+
+            while size > self.maxBytes:
+                rows = connection.execute('SELECT key, length(positions) FROM games ORDER BY used LIMIT ?',
+                                          (_evictBatch,)).fetchall()
+                if not rows:
+                    break
+                evicted = []
+                for key, length in rows:
+                    if size <= self.maxBytes:
+                        break
+                    evicted.append((key,))
+                    size -= length
+                connection.executemany('DELETE FROM games WHERE key = ?', evicted)
+
+            self._SetInfo('clock', clock)
+            self._SetInfo('bytes', size)
+            connection.execute('COMMIT')
+        except BaseException:
+            connection.execute('ROLLBACK')
+            raise
+        self._added = {}
+        self._used = {}
+
+    def Clear(self):
+        self._added = {}
+        self._used = {}
+        self._connection.execute('DELETE FROM games')
+        self._SetInfo('bytes', 0)
+
+    def Close(self):
+        self.Commit()
+        if self.hits or self.misses:
+            logger.info("Position cache %s: %d hits, %d misses, %d bytes", self.filename, self.hits, self.misses,
+                        self.Size())
+        self._connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.Close()
@@ -0,0 +1,70 @@
+"""On-disk index from Zobrist key to the games and plies that reached the position. Backed by sqlite3 so it can
+hold a large corpus and be queried without loading it into memory."""
+import sqlite3
+from .board import Board, startFEN
+from .game import PlayMoves
+
+
+def _Signed(key):
+    """sqlite integers are signed 64-bit."""
+    return key - (1 << 64) if key >= (1 << 63) else key
+
+
+def _Unsigned(key):
+    return key + (1 << 64) if key < 0 else key
+
+
+class PositionIndex:
+    """Maps positions to (game, ply) pairs. game is any string that identifies the game, e.g. the Site tag or
+    file name plus game number."""
+
+    def __init__(self, filename):
+        self._connection = sqlite3.connect(filename)
+        self._connection.execute('CREATE TABLE IF NOT EXISTS positions (key INTEGER NOT NULL, game TEXT NOT NULL, '
+                                 'ply INTEGER NOT NULL)')
+        self._connection.execute('CREATE INDEX IF NOT EXISTS positionKeys ON positions (key)')
+
+    def Add(self, key, game, ply):
+        self._connection.execute('INSERT INTO positions VALUES (?, ?, ?)', (_Signed(key), game, ply))
+
+    def AddGame(self, game, pgnGame):
+        """Replay a PGNGame and add every position in it (ply 0 is the start position). Stops at the first move
+        that can not be resolved. Returns the number of positions added."""
+        board = Board(pgnGame.tags.get('FEN', startFEN))
+
+        rows = [(_Signed(board.ZobristKey()), game, 0)]
+        for ply, _ in PlayMoves(board, pgnGame.moves):
+            rows.append((_Signed(board.ZobristKey()), game, ply+1))
+
+        self._connection.executemany('INSERT INTO positions VALUES (?, ?, ?)', rows)
+        return len(rows)
+
+    def Games(self, key):
+        """List of (game, ply) for every occurrence of the position with Zobrist key."""
+        cursor = self._connection.execute('SELECT game, ply FROM positions WHERE key = ?', (_Signed(key),))
+        return cursor.fetchall()
+
+    def GamesForFEN(self, fen):
+        return self.Games(Board(fen).ZobristKey())
+
+    def Contains(self, key):
+        cursor = self._connection.execute('SELECT 1 FROM positions WHERE key = ? LIMIT 1', (_Signed(key),))
+        return cursor.fetchone() != None
+
+    def UniquePositions(self):
+        """Generator over the distinct Zobrist keys in the index."""
+        for (key,) in self._connection.execute('SELECT DISTINCT key FROM positions'):
+            yield _Unsigned(key)
+
+    def Commit(self):
+        self._connection.commit()
+
+    def Close(self):
+        self._connection.commit()
+        self._connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.Close()
@@ -0,0 +1,176 @@
+"""Opening-prefix trie so games that share their first moves share the replay work.
+
+Each node is reached by a sequence of SAN moves from a start position and holds the FEN after those moves.
+BatchReplayer looks up the deepest cached prefix of a game, sets the board from its FEN and only plays the
+remaining moves, adding nodes for new plies up to maxDepth as it goes.
+
+The trie is bounded by an estimate of the memory its nodes use. Nodes are kept in least recently used order
+and a lookup touches the path from the leaf up to the root, so a parent is always more recently used than its
+children and eviction only ever removes leaves.
+"""
+import collections
+import sys
+from .board import Board, startFEN
+from .search import Search
+from .game import PlayMoves
+
+
+class _Node:
+    __slots__ = ('fen', 'move', 'parent', 'children', 'size')
+
+    def __init__(self, fen, move=None, parent=None):
+        self.fen = fen
+        self.move = move
+        self.parent = parent
+        self.children = {}
+        self.size = _nodeOverhead + sys.getsizeof(fen)
+
+
+# Node, children dictionary, the entries for it in its parent and in the LRU order, and the move string (which
+# is usually shared with the game's move list, so this is an upper bound)
+_nodeOverhead = sys.getsizeof(_Node.__new__(_Node)) + sys.getsizeof({}) + 200
+
+
+class PrefixTrie:
+    """Move-prefix trie of positions with memory-bounded LRU eviction. maxMemory is in bytes, maxDepth is the
+    number of plies from the start position that are cached."""
+
+    def __init__(self, maxMemory=64*1024*1024, maxDepth=20):
+        self.maxMemory = maxMemory
+        self.maxDepth = maxDepth
+        self.memory = 0
+        self._roots = {}
+        self._order = collections.OrderedDict()
+
+    def __len__(self):
+        return len(self._order)
+
+    def Path(self, start, moves):
+        """List of the cached nodes for the start position followed by moves, the root first. Empty if start
+        is not cached. The nodes are marked as recently used."""
+        node = self._roots.get(start)
+        if node == None:
+            return []
+
+        path = [node]
+        for move in moves[:self.maxDepth]:
+            node = node.children.get(move)
+            if node == None:
+                break
+            path.append(node)
+
+        for node in reversed(path):
+            self._order.move_to_end(node)
+        return path
+
+    def Root(self, start, fen):
+        """The root node for a start position, created with the board's FEN for it if needed. start is the FEN
+        as it appears in the game."""
+        node = self._roots.get(start)
+        if node == None:
+            # Roots keep the key they are stored under in move
+            node = self._roots[start] = self._Add(_Node(fen, start))
+        return node
+
+    def Add(self, parent, move, fen):
+        """Add the position after playing move from parent and return its node."""
+        node = parent.children.get(move)
+        if node == None:
+            node = parent.children[move] = self._Add(_Node(fen, move, parent))
+        return node
+
+    def _Add(self, node):
+        self._order[node] = None
+        self.memory += node.size
+        # Keep the ancestors more recently used than the new leaf
+        parent = node.parent
+        while parent != None:
+            self._order.move_to_end(parent)
+            parent = parent.parent
+        self._Evict(node)
+        return node
+
+    def _Evict(self, keep):
+        """Drop least recently used leaves until the trie fits in maxMemory. keep (the node just added) and
+        its ancestors are never evicted."""
+        while self.memory > self.maxMemory and len(self._order) > 1:
+            node = next(iter(self._order))
+            if node is keep:
+                break
+            del self._order[node]
+            self.memory -= node.size
+            if node.parent == None:
+                del self._roots[node.move]
+            else:
+                del node.parent.children[node.move]
+                node.parent = None
+
+    def Clear(self):
+        self._roots = {}
+        self._order.clear()
+        self.memory = 0
+
+
+class BatchReplayer:
+    """Replays PGNGames, resuming each one from the deepest prefix of its moves that is cached in the trie.
+    Reuse one replayer for a batch of games so they share the trie. Moves that can not be resolved are added to
+    errors (a diagnostics.ErrorReport) if one is given."""
+
+    def __init__(self, trie=None, errors=None):
+        self.trie = trie if trie != None else PrefixTrie()
+        self.errors = errors
+        self.board = Board()
+        self.search = Search(self.board)
+        self.errorPly = None
+        # Number of games replayed and plies that did not need to be played because they were cached
+        self.games = 0
+        self.pliesSkipped = 0
+
+    def Positions(self, game, plies=None):
+        """Generator of (ply, FEN) for the sorted plies requested, every ply (0 is the start position) if plies
+        is None. Stops at the first move that can not be resolved and sets errorPly to its ply."""
+        trie = self.trie
+        board = self.board
+        moves = game.moves
+        start = game.tags.get('FEN', startFEN)
+        wanted = iter(range(len(moves) + 1) if plies == None else plies)
+        nextPly = next(wanted, None)
+        self.errorPly = None
+        self.games += 1
+
+        path = trie.Path(start, moves)
+        if not path:
+            board.SetFEN(start)
+            path = [trie.Root(start, board.ExportFEN())]
+        self.pliesSkipped += len(path) - 1
+
+        # Positions that are already cached
+        for ply, node in enumerate(path):
+            while nextPly == ply:
+                yield ply, node.fen
+                nextPly = next(wanted, None)
+        if nextPly == None:
+            return
+
+        ply = len(path) - 1
+        node = path[-1]
+        board.SetFEN(node.fen)
+
+        for played, _ in PlayMoves(board, moves[ply:], self.errors, game.tags, ply, self.search):
+            if played < trie.maxDepth:
+                node = trie.Add(node, moves[played], board.ExportFEN())
+            ply = played + 1
+
+            while nextPly == ply:
+                yield ply, node.fen if ply <= trie.maxDepth else board.ExportFEN()
+                nextPly = next(wanted, None)
+            if nextPly == None:
+                return
+
+        if ply < len(moves):
+            self.errorPly = ply
+
+    def Replay(self, game):
+        """List of FENs for every ply of a game, the same as Replay's board positions for a game that can be
+        fully resolved."""
+        return [fen for _, fen in self.Positions(game)]
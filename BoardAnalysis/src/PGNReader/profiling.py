@@ -0,0 +1,236 @@
+"""Opt-in timing of the PGNReader stages.
+
+Nothing is measured until Enable() is called. Enable replaces the instrumented functions and methods with
+timing wrappers (everywhere they were imported in the package) and Disable puts the originals back, so there
+is no cost when profiling is off. Counters are kept per process; profile with workers=1 to include the replay
+work of MoveExporter.
+
+    profiling.Enable(cprofile=True)
+    MoveExporter().LoadPGN('games.pgn', 'out.ndjson', format='ndjson')
+    profiling.Disable()
+    print(profiling.FormatSummary())
+    profiling.DumpStats('export.pstats')
+
+Timer(name) can be used to time any other block of code under the same counters.
+"""
+import cProfile
+import functools
+import heapq
+import inspect
+import itertools
+import sys
+import time
+from .diagnostics import GameTags
+
+# Stage, owner module or class (by import path) and attribute of every instrumented function
+_targets = [
+    ('io', 'pgn', 'ReadGames'),
+    ('tokenize', 'pgn', 'ParseMovetext'),
+    ('tokenize', 'pgn', 'ParseTags'),
+    ('san', 'search.Search', 'GetMoveSquares'),
+    ('san', 'search.Search', 'GetMove'),
+    ('move', 'board.Board', 'MakeMove'),
+    ('move', 'board.Board', 'MovePiece'),
+    ('fen', 'board.Board', 'ExportFEN'),
+    ('fen', 'board.Board', 'SetFEN'),
+    ('io', 'writers.NDJSONWriter', 'Write'),
+    ('io', 'writers.BinaryWriter', 'Write'),
+    ('io', 'dataset.DatasetWriter', 'Write'),
+    ('game', 'MoveExport.MoveExporter', 'SampleGame'),
+]
+
+# Number of slowest games kept for the summary
+slowGames = 10
+
+_stats = {}
+_slowest = []
+# Tie breaker for games that took the same time, so heapq never compares the tags
+_gameCounter = itertools.count()
+_patched = []
+_profile = None
+_active = set()
+
+
+class _Stat:
+    __slots__ = ('stage', 'calls', 'total', 'maximum')
+
+    def __init__(self, stage):
+        self.stage = stage
+        self.calls = 0
+        self.total = 0.0
+        self.maximum = 0.0
+
+    def Add(self, seconds):
+        self.calls += 1
+        self.total += seconds
+        if seconds > self.maximum:
+            self.maximum = seconds
+
+
+def _GetStat(name, stage):
+    stat = _stats.get(name)
+    if stat == None:
+        stat = _stats[name] = _Stat(stage)
+    return stat
+
+
+class Timer:
+    """Context manager that adds the time spent in the block to the counter name."""
+
+    def __init__(self, name, stage='other'):
+        self._stat = _GetStat(name, stage)
+
+    def __enter__(self):
+        self._started = time.perf_counter()
+        return self
+
+    def __exit__(self, *args):
+        self._stat.Add(time.perf_counter() - self._started)
+
+
+def _RecordGame(seconds, game):
+    """Keep the slowest games, game is the PGNGame argument of SampleGame."""
+    item = (seconds, next(_gameCounter), GameTags(game.tags), len(game.moves))
+    if len(_slowest) < slowGames:
+        heapq.heappush(_slowest, item)
+    elif seconds > _slowest[0][0]:
+        heapq.heapreplace(_slowest, item)
+
+
+def _Wrap(function, name, stage):
+    """Timing wrapper. Only the outermost call of a recursive function is timed."""
+    stat = _GetStat(name, stage)
+    perfCounter = time.perf_counter
+
+    if inspect.isgeneratorfunction(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            if name in _active:
+                yield from function(*args, **kwargs)
+                return
+            generator = function(*args, **kwargs)
+            while True:
+                _active.add(name)
+                started = perfCounter()
+                try:
+                    item = next(generator)
+                except StopIteration:
+                    return
+                finally:
+                    stat.Add(perfCounter() - started)
+                    _active.discard(name)
+                yield item
+        return wrapper
+
+    @functools.wraps(function)
+    def wrapper(*args, **kwargs):
+        if name in _active:
+            return function(*args, **kwargs)
+        _active.add(name)
+        started = perfCounter()
+        try:
+            return function(*args, **kwargs)
+        finally:
+            seconds = perfCounter() - started
+            stat.Add(seconds)
+            _active.discard(name)
+            if stage == 'game':
+                _RecordGame(seconds, args[1])
+    return wrapper
+
+
+def _Resolve(path):
+    """Module or class for a path relative to the package, None if it can not be imported (e.g. dataset
+    without numpy)."""
+    moduleName, _, className = path.partition('.')
+    try:
+        module = __import__(__package__ + '.' + moduleName, fromlist=['_'])
+    except ImportError:
+        return None
+    return getattr(module, className) if className else module
+
+
+def Enable(cprofile=False):
+    """Start timing. With cprofile a cProfile.Profile runs as well, see DumpStats."""
+    global _profile
+    if _patched:
+        return
+
+    for stage, path, attribute in _targets:
+        owner = _Resolve(path)
+        if owner == None:
+            continue
+        original = owner.__dict__[attribute]
+        name = path.rpartition('.')[2] + '.' + attribute
+        wrapper = _Wrap(original, name, stage)
+
+        owners = [owner]
+        if inspect.ismodule(owner):
+            # Functions are also replaced in the modules that imported them by name
+            owners += [module for moduleName, module in list(sys.modules.items())
+                       if moduleName.startswith(__package__ + '.') and module is not owner and
+                       getattr(module, attribute, None) is original]
+        for target in owners:
+            setattr(target, attribute, wrapper)
+            _patched.append((target, attribute, original))
+
+    if cprofile:
+        _profile = cProfile.Profile()
+        _profile.enable()
+
+
+def Disable():
+    """Stop timing and restore the original functions. The counters are kept until Reset."""
+    if _profile != None:
+        _profile.disable()
+    while _patched:
+        target, attribute, original = _patched.pop()
+        setattr(target, attribute, original)
+
+
+def Enabled():
+    return bool(_patched)
+
+
+def Reset():
+    global _profile
+    _stats.clear()
+    _slowest.clear()
+    _profile = None
+
+
+def Summary():
+    """Dictionary with the counters (name: calls, total, mean and max seconds, stage), the total time per
+    stage and the slowest games."""
+    counters = {name: {"stage": stat.stage, "calls": stat.calls, "total": stat.total,
+                       "mean": stat.total / stat.calls if stat.calls else 0.0, "max": stat.maximum}
+                for name, stat in _stats.items() if stat.calls}
+    stages = {}
+    for counter in counters.values():
+        stages[counter["stage"]] = stages.get(counter["stage"], 0.0) + counter["total"]
+    slowest = [{"seconds": seconds, "tags": tags, "moves": moves}
+               for seconds, _, tags, moves in sorted(_slowest, reverse=True)]
+    return {"counters": counters, "stages": stages, "slowestGames": slowest}
+
+
+def FormatSummary():
+    """Summary as a table, slowest counters first. Nested counters (e.g. MakeMove inside SampleGame) are
+    included in the time of the outer one."""
+    summary = Summary()
+    lines = [format('counter', '28') + format('calls', '>10') + format('total s', '>10') + format('mean us', '>10') +
+             format('max ms', '>10')]
+    for name, counter in sorted(summary["counters"].items(), key=lambda item: -item[1]["total"]):
+        lines.append(format(counter["stage"] + ' ' + name, '28') + format(counter["calls"], '>10') +
+                     format(counter["total"], '>10.3f') + format(1e6*counter["mean"], '>10.1f') +
+                     format(1e3*counter["max"], '>10.2f'))
+    for game in summary["slowestGames"]:
+        lines.append('slow game ' + format(game["seconds"], '.3f') + 's ' + str(game["moves"]) + ' plies ' +
+                     str(game["tags"]))
+    return '\n'.join(lines)
+
+
+def DumpStats(filename):
+    """Write the cProfile data collected since Enable(cprofile=True) to filename, readable with pstats."""
+    if _profile == None:
+        raise ValueError("cProfile was not enabled, call Enable(cprofile=True)")
+    _profile.dump_stats(filename)
@@ -0,0 +1,71 @@
+"""Strategies for choosing which plies of a game to export. A Sampler returns a sorted list of ply numbers so a
+single replay of the game can stop at every sampled position in turn.
+
+Strategies:
+    uniform      count distinct plies chosen uniformly from [minPly, numMoves-1]
+    nth          every Nth ply starting at minPly (count is ignored)
+    phase        count plies spread evenly over the opening, middlegame and endgame thirds of the game
+    skipOpening  count plies chosen uniformly after the first openingPlies plies
+"""
+import random
+
+
+class Sampler:
+    """Chooses plies with a seedable random number generator. Two samplers with the same seed and options
+    choose the same plies for the same sequence of games."""
+
+    def __init__(self, strategy='uniform', count=1, seed=None, minPly=2, every=10, openingPlies=20):
+        if strategy not in strategies:
+            raise ValueError("Unknown sampling strategy " + str(strategy) + ", expected one of " +
+                             ", ".join(strategies))
+        self.strategy = strategy
+        self.count = count
+        self.seed = seed
+        self.minPly = minPly
+        self.every = every
+        self.openingPlies = openingPlies
+        self.rng = random.Random(seed)
+
+    def Fork(self, index):
+        """A sampler with the same options and a seed derived from this one, used to give each chunk of games
+        processed in parallel its own reproducible random stream."""
+        seed = None if self.seed == None else self.seed * 1000003 + index
+        return Sampler(self.strategy, self.count, seed, self.minPly, self.every, self.openingPlies)
+
+    def Plies(self, numMoves):
+        """Sorted plies to sample from a game with numMoves plies. Empty if the game is too short."""
+        if (numMoves - 1) <= self.minPly:
+            return []
+        return strategies[self.strategy](self, numMoves)
+
+    def _Uniform(self, low, high):
+        population = range(low, high + 1)
+        if len(population) <= 0:
+            return []
+        return sorted(self.rng.sample(population, min(self.count, len(population))))
+
+    def _UniformStrategy(self, numMoves):
+        return self._Uniform(self.minPly, numMoves - 1)
+
+    def _NthStrategy(self, numMoves):
+        return list(range(self.minPly, numMoves, self.every))
+
+    def _PhaseStrategy(self, numMoves):
+        low, high = self.minPly, numMoves - 1
+        span = high - low + 1
+        plies = set()
+        for phase in range(3):
+            phaseLow = low + span*phase // 3
+            phaseHigh = low + span*(phase + 1) // 3 - 1
+            # Spread count over the phases, earlier phases get the remainder
+            phaseCount = self.count // 3 + (1 if phase < self.count % 3 else 0)
+            if phaseCount and phaseHigh >= phaseLow:
+                plies.update(self.rng.sample(range(phaseLow, phaseHigh + 1), min(phaseCount, phaseHigh-phaseLow+1)))
+        return sorted(plies)
+
+    def _SkipOpeningStrategy(self, numMoves):
+        return self._Uniform(max(self.minPly, self.openingPlies), numMoves - 1)
+
+
+strategies = {'uniform': Sampler._UniformStrategy, 'nth': Sampler._NthStrategy, 'phase': Sampler._PhaseStrategy,
+              'skipOpening': Sampler._SkipOpeningStrategy}
@@ -1,5 +1,85 @@
 import re
-#from move import *
+import functools
+import logging
+from .attacks import knightAttacks, kingAttacks, pawnAttacks, PawnAttacks, BishopAttacks, RookAttacks, QueenAttacks, Squares
+from .board import squareIndex, squarePosition, squareNames, pieceCodes, allFiles, noFlag, castleFlag, enPassantFlag, pawnTwoUpFlag, \
+    promoteToQueenFlag, promotionFlags, whiteKingCastle, whiteQueenCastle, blackKingCastle, \
+    blackQueenCastle
+from .movegen import GenerateMoves, Attackers, InCheck
+
+logger = logging.getLogger(__name__)
+
+promotionPieces = {flag: piece for piece, flag in promotionFlags.items()}
+
+# [RNBQK]?[a-h]?[1-8]?[x]?[a-h][1-8][=]?[RNBQ]?[+#] or castling, optionally followed by annotations
+sanPattern = re.compile(r'^(?:(O-O-O|0-0-0)|(O-O|0-0)|([RNBQK])?([a-h])?([1-8])?x?([a-h][1-8])(?:=?([RNBQ]))?)'
+                        r'(?:e\.p\.|ep)?[+#]*[!?]*$')
+
+pieceOffsets = {'P': 0, 'N': 1, 'B': 2, 'R': 3, 'Q': 4, 'K': 5}
+fileMasks = [0x0101010101010101 << file for file in range(8)]
+rankMasks = [0xFF << (8*rank) for rank in range(8)]
+
+
+@functools.lru_cache(maxsize=8192)
+def ParseSAN(move):
+    """Tokenize a SAN move. Returns (pieceType, startFile, startRank, destination, flag) where startFile and
+    startRank are 0-7 or None, destination is a square index and flag is the promotion flag (or noFlag). For
+    castling pieceType is 'O' and destination is the king offset (2 or -2). Returns None for malformed moves.
+    The result only depends on the string, so it is cached."""
+    match = sanPattern.match(move)
+    if match == None:
+        return None
+
+    queenSide, kingSide, pieceType, startFile, startRank, destination, promotion = match.groups()
+    if queenSide:
+        return 'O', None, None, -2, castleFlag
+    if kingSide:
+        return 'O', None, None, 2, castleFlag
+
+    return (pieceType or 'P',
+            allFiles.index(startFile) if startFile else None,
+            int(startRank) - 1 if startRank else None,
+            squareIndex[(destination[0], int(destination[1]))],
+            promotionFlags[promotion] if promotion else noFlag)
+
+
+def MoveToSAN(board, move, legalMoves=None):
+    """SAN for a legal (startSquare, endSquare, flag) move of the side to move, the inverse of ParseSAN.
+    legalMoves (GenerateMoves for the position) is used for disambiguation and is generated if not given."""
+    startSquare, endSquare, flag = move
+    mailbox = board._mailbox
+    code = mailbox[startSquare]
+    piece = pieceCodes[code].upper()
+
+    if flag == castleFlag:
+        san = 'O-O' if endSquare > startSquare else 'O-O-O'
+    elif piece == 'P':
+        san = squareNames[startSquare][0] + 'x' if (mailbox[endSquare] or flag == enPassantFlag) else ''
+        san += squareNames[endSquare]
+        if flag >= promoteToQueenFlag:
+            san += '=' + promotionPieces[flag]
+    else:
+        if legalMoves == None:
+            legalMoves = GenerateMoves(board)
+        # Other pieces of the same type that can reach the destination
+        others = [other for other, end, _ in legalMoves
+                  if end == endSquare and other != startSquare and mailbox[other] == code]
+        disambiguation = ''
+        if others:
+            if all((other & 7) != (startSquare & 7) for other in others):
+                disambiguation = squareNames[startSquare][0]
+            elif all((other >> 3) != (startSquare >> 3) for other in others):
+                disambiguation = squareNames[startSquare][1]
+            else:
+                disambiguation = squareNames[startSquare]
+        san = piece + disambiguation + ('x' if mailbox[endSquare] else '') + squareNames[endSquare]
+
+    board.MakeMove(startSquare, endSquare, flag)
+    if InCheck(board):
+        san += '+' if GenerateMoves(board) else '#'
+    board.UnmakeMove()
+    return san
+
 
 class Search:
     """Class to search for legal moves. Each method takes a position tuple with file and rank and returns a list of potential moves."""
@@ -8,127 +88,96 @@ class Search:
     def __init__(self,board):
         self._board = board
 
-    def _ValidRange(self,file,rank):
-        if file in range(8) and rank in range(1,9):
-            return True
-
-        return False
-
-    def _GeneralSearch(self,position,searchDirection):
-        possibleMoves = []
-
-        color = self._board.GetColor(position)
+    def _Moves(self, square, targets):
+        """Convert a bitboard of target squares into a list of position tuples, dropping squares occupied by
+        the moving side."""
+        if self._board._mailbox[square] < 7:
+            targets &= ~self._board.Occupancy('w')
+        else:
+            targets &= ~self._board.Occupancy('b')
 
-        file = self.allFiles.index(position[0])
-        rank = position[1]
-
-        for file_direction, rank_direction in searchDirection:
-            currentFile = file+file_direction
-            currentRank = rank+rank_direction
-            while currentRank > 0 and currentRank <=8 and \
-                currentFile >= 0 and currentFile < 8 and \
-                self._board.GetPiece((self.allFiles[currentFile],currentRank))== None:
-                
-                possibleMoves.append((self.allFiles[currentFile],currentRank))
-                currentFile += file_direction
-                currentRank += rank_direction
-            
-            if self._ValidRange(currentFile, currentRank) and self._board.GetColor((self.allFiles[currentFile],currentRank))!=color:
-                possibleMoves.append((self.allFiles[currentFile],currentRank))
-        
-        return possibleMoves
+        return [squarePosition[target] for target in Squares(targets)]
 
     def SearchPawn(self,position,captureOnly=False):
         """Pawn has three possible: move 1 space, move 2 spaces (if in starting position), and capture (left, right, en passant)."""
         possibleMoves = []
 
-        file = self.allFiles.index(position[0])
-        rank = position[1]
-
+        square = squareIndex[position]
         color = self._board.GetColor(position)
+        mailbox = self._board._mailbox
+
         if color == 'b':
-            direction = -1
+            direction = -8
+            startRank = 6
         else:
-            direction = 1
-
-        testRank = rank+direction
+            direction = 8
+            startRank = 1
 
         if not captureOnly:
             # Pawn can move 1 forward unless another piece is in front
-
-            if self._board.GetPiece((file,testRank)) == None:
-                possibleMoves.append((self.allFiles[file],testRank))
+            testSquare = square + direction
+            if 0 <= testSquare < 64 and mailbox[testSquare] == 0:
+                possibleMoves.append(squarePosition[testSquare])
 
                 # If in starting position, can you move one more?
-                if ((color == 'b') and (rank == 7)) or ((color == 'w') and (rank == 2)):
-                    if self._board.GetPiece((file,testRank+(1*direction))) == None:
-                        possibleMoves.append((self.allFiles[file],testRank+1*direction))
+                if (square >> 3) == startRank and mailbox[testSquare + direction] == 0:
+                    possibleMoves.append(squarePosition[testSquare + direction])
 
         # Capture left and right
-        if file - 1 >= 0:
-            leftPiece = self._board.GetPiece((self.allFiles[file-1],testRank))
-            if (leftPiece != None) and (self._board.GetPiece((self.allFiles[file-1],testRank)) != color):
-                possibleMoves.append((self.allFiles[file-1],testRank))
-
-        if file + 1 < 8:
-            rightPiece = self._board.GetPiece((self.allFiles[file+1],testRank))
-            if (rightPiece != None) and (self._board.GetPiece((self.allFiles[file+1],testRank)) != color):
-                possibleMoves.append((self.allFiles[file+1],testRank))
+        opponent = 'b' if color == 'w' else 'w'
+        captures = PawnAttacks(square, color) & self._board.Occupancy(opponent)
+        possibleMoves += [squarePosition[target] for target in Squares(captures)]
 
         return possibleMoves
 
     def SearchBishop(self, position):
-        return self._GeneralSearch(position,[(1,1),(-1,-1),(1,-1),(-1,1)])
+        square = squareIndex[position]
+        return self._Moves(square, BishopAttacks(square, self._board.Occupancy()))
 
     def SearchRook(self,position):
-        return self._GeneralSearch(position,[(1,0),(-1,0),(0,-1),(0,1)])
+        square = squareIndex[position]
+        return self._Moves(square, RookAttacks(square, self._board.Occupancy()))
 
     def SearchQueen(self,position):
-        return self._GeneralSearch(position,[(1,0),(-1,0),(0,-1),(0,1), (1,1),(-1,-1),(1,-1),(-1,1)])
+        square = squareIndex[position]
+        return self._Moves(square, QueenAttacks(square, self._board.Occupancy()))
 
     def SearchKnight(self, position):
-        possibleMoves = []
-        color = self._board.GetColor(position)
-
-        file = self.allFiles.index(position[0])
-        rank = position[1]
-
-        direction = [(-2,-1),(-2,1),(-1,2),(1,2),(2,1),(2,-1),(-1,-2),(1,-2)]
-
-        for file_dir, rank_dir in direction:
-            currFile = file+file_dir
-            currRank = rank+rank_dir
-
-            if self._ValidRange(currFile,currRank):
-                currentPiece = self._board.GetPiece((self.allFiles[currFile],currRank))
-
-                if currentPiece == None or self._board.GetColor((self.allFiles[currFile],currRank)) != color:
-                    possibleMoves.append((self.allFiles[currFile],currRank))
-
-        return possibleMoves
+        square = squareIndex[position]
+        return self._Moves(square, knightAttacks[square])
 
     def SearchKing(self, position):
-            possibleMoves = []
-            color = self._board.GetColor(position)
-
-            file = self.allFiles.index(position[0])
-            rank = position[1]
-
-            direction = [(-1,-1),(-1,1),(1,-1),(1,1),(1,0),(-1,0),(0,1),(0,-1)]
-
-            for file_dir, rank_dir in direction:
-                currFile = file+file_dir
-                currRank = rank+rank_dir
-
-                if self._ValidRange(currFile,currRank):
-                    currentPiece = self._board.GetPiece((self.allFiles[currFile],currRank))
-
-                    if currentPiece == None or self._board.GetColor((self.allFiles[currFile],currRank)) != color:
-                        possibleMoves.append((self.allFiles[currFile],currRank))
-
-            # TO DO: Can't move into a check
+            square = squareIndex[position]
+            white = self._board._mailbox[square] < 7
+
+            # Can't move into a check. The king is removed from the occupancy so it can't hide behind itself.
+            occupancy = self._board.Occupancy() ^ (1 << square)
+            targets = 0
+            for target in Squares(kingAttacks[square]):
+                if not Attackers(self._board._bitboards, target, not white, occupancy):
+                    targets |= 1 << target
+
+            return self._Moves(square, targets)
+
+    def Attackers(self, square, color):
+        """Bitboard of the pieces of color that attack square. Uses reverse lookups from the target square, e.g.,
+        a knight on any square a knight move away from square attacks it."""
+        board = self._board
+        occupancy = board.Occupancy()
+        if color == 'w':
+            pawn, knight, bishop, rook, queen, king = 'P', 'N', 'B', 'R', 'Q', 'K'
+            # A white pawn attacks square if a black pawn on square would attack the pawn
+            pawns = PawnAttacks(square, 'b')
+        else:
+            pawn, knight, bishop, rook, queen, king = 'p', 'n', 'b', 'r', 'q', 'k'
+            pawns = PawnAttacks(square, 'w')
 
-            return possibleMoves
+        queens = board.PieceBitboard(queen)
+        return (pawns & board.PieceBitboard(pawn)) | \
+            (knightAttacks[square] & board.PieceBitboard(knight)) | \
+            (kingAttacks[square] & board.PieceBitboard(king)) | \
+            (BishopAttacks(square, occupancy) & (board.PieceBitboard(bishop) | queens)) | \
+            (RookAttacks(square, occupancy) & (board.PieceBitboard(rook) | queens))
 
     def Check(self, position, color):
         """Checks whether a given set of positions is in danger of a check."""
@@ -137,32 +186,23 @@ class Search:
         else:
             opponent = 'w'
 
-        # Get all opponent pieces
-        opponentPieces = self._board.GetAllPieces(opponent)
-
-        # Get potential capture moves for all opponent pieces
-        for piece in opponentPieces:
-            possibleMoves = []
-            pieceType = str.upper(self._board.GetPiece(piece))
-
-            if pieceType == 'P':
-                possibleMoves += self.SearchPawn(piece,captureOnly=True)
-            elif pieceType == 'R':
-                possibleMoves += self.SearchRook(piece)
-            elif pieceType == 'N':
-                possibleMoves += self.SearchNight(piece)
-            elif pieceType == 'B':
-                possibleMoves += self.SearchBishop(piece)
-            elif pieceType == 'Q':
-                possibleMoves += self.SearchQueen(piece)
-            elif pieceType == 'K':
-                possibleMoves += self.SearchKing(piece)
-
-            # Determine whether position is in any of those capture moves
-            if position in possibleMoves:
-                return True
-            
-        return False
+        return self.Attackers(squareIndex[position], opponent) != 0
+
+    def LegalMoves(self, color=None):
+        """All legal moves for color as (start, end, special) tuples that can be passed to Board.MovePiece."""
+        legalMoves = []
+        for startSquare, endSquare, flag in GenerateMoves(self._board, color):
+            if flag == castleFlag:
+                special = 'castle'
+            elif flag == enPassantFlag:
+                special = 'ep'
+            elif flag >= promoteToQueenFlag:
+                special = 'promotion ' + promotionPieces[flag]
+            else:
+                special = None
+            legalMoves.append((squarePosition[startSquare], squarePosition[endSquare], special))
+
+        return legalMoves
 
     def SearchPiece(self,pieceType,position):
         if pieceType == 'P':
@@ -178,82 +218,121 @@ class Search:
         elif pieceType == 'K':
             return self.SearchKing(position)
 
-    def GetMove(self,move, color):
-        """Converts algebraic move into start and end tuples."""
-        # Castle?
-        if move == 'O-O':
-            if color == 'w':
-                return ('e',1),('g',1),'castle'
-            else:
-                return ('e',8),('g',8),'castle'
-        elif move == 'O-O-O':
-            if color == 'w':
-                return ('e',1),('c',1),'castle'
-            else:
-                return ('e',8),('c',8),'castle'
-            
-
-        # Process the string: Figure out what we know
-        # [RNBQK]?[a-h][1-8]?[x]?[a-h]?[1-8][=]?[RNBQK]?[+#]
-
-        # Is the string in the proper format
-        test = re.search('([RNBQK])?([a-h])?([1-8])?([x])?([a-h])[1-8]([=])?([RNBQK])?(ep)*([+#])*',move)
-        if test == None:
-            print("Move is in improper format")
+    def GetMoveSquares(self, move, color=None):
+        """Resolves an algebraic move into (startSquare, endSquare, flag) for Board.MakeMove, or None if the move
+        is malformed or no piece of color (default: the side to move) can make it."""
+        parsed = ParseSAN(move)
+        if parsed == None:
+            logger.debug("Move %r is in improper format", move)
             return None
 
-        pieceType = re.findall('^[RNBQK]',move)
-        file = re.findall('[a-h]',move)
-        rank = re.findall('[1-8]', move)
-        capture = re.findall('[x]',move)
-        promotion = re.findall('(?<!^)[RNBQK]',move)
-        decorator = re.findall('[+#]',move)
+        board = self._board
+        if color == None:
+            color = board.SideToMove()
+        white = color == 'w'
+        base = 0 if white else 6
+        pieceType, startFile, startRank, destination, flag = parsed
+        bitboards = board._bitboards
+        occupancy = board.Occupancy()
+
+        if pieceType == 'O':
+            # The king and rook are on their start squares with the right kept, the squares between them are
+            # empty and the king does not castle out of, through or into check
+            kingSquare = 4 if white else 60
+            if destination > 0:
+                right = whiteKingCastle if white else blackKingCastle
+                rookStart, between = kingSquare + 3, 0b11 << (kingSquare + 1)
+            else:
+                right = whiteQueenCastle if white else blackQueenCastle
+                rookStart, between = kingSquare - 4, 0b111 << (kingSquare - 3)
+            mailbox = board._mailbox
+            if not board._castle & right or mailbox[kingSquare] != base + 6 or mailbox[rookStart] != base + 4 or \
+                    occupancy & between:
+                return None
+            step = destination // 2
+            for square in (kingSquare, kingSquare + step, kingSquare + destination):
+                if Attackers(bitboards, square, not white, occupancy):
+                    return None
+            return kingSquare, kingSquare + destination, castleFlag
+
+        own = board.Occupancy(color)
+        if (own >> destination) & 1:
+            return None
+        # Only a pawn reaching the last rank promotes, and it has to
+        if (flag >= promoteToQueenFlag) != (pieceType == 'P' and (destination >> 3) == (7 if white else 0)):
+            return None
+        pieces = bitboards[base + pieceOffsets[pieceType]]
 
-        if len(pieceType) == 0:
-            pieceType = 'P'
+        # Reverse lookup: the squares a piece of this type could have come from are the squares it would attack
+        # from the destination
+        if pieceType == 'P':
+            forward = 8 if white else -8
+            if startFile == None:
+                # Push onto an empty square, the pawn is one square back or two squares back from its fourth rank
+                origin = destination - forward
+                if (occupancy >> destination) & 1:
+                    candidates = 0
+                elif not 0 <= origin - forward < 64:
+                    candidates = pieces & (1 << origin) if 0 <= origin < 64 else 0
+                elif (pieces >> origin) & 1:
+                    candidates = 1 << origin
+                elif not (occupancy >> origin) & 1 and (destination >> 3) == (3 if white else 4):
+                    candidates = pieces & (1 << (origin - forward))
+                    flag = pawnTwoUpFlag
+                else:
+                    candidates = 0
+            elif (occupancy >> destination) & 1:
+                # Capture of an enemy piece, own pieces were ruled out above
+                candidates = pawnAttacks[1 if white else 0][destination] & pieces
+            elif destination == board._ep:
+                candidates = pawnAttacks[1 if white else 0][destination] & pieces
+                flag = enPassantFlag
+            else:
+                candidates = 0
+        elif pieceType == 'N':
+            candidates = knightAttacks[destination] & pieces
+        elif pieceType == 'B':
+            candidates = BishopAttacks(destination, occupancy) & pieces
+        elif pieceType == 'R':
+            candidates = RookAttacks(destination, occupancy) & pieces
+        elif pieceType == 'Q':
+            candidates = QueenAttacks(destination, occupancy) & pieces
         else:
-            pieceType = pieceType[0]
-
-        if len(promotion) > 0:
-            special = 'promotion ' + promotion[0]
-
-        if len(file) == 1:
-            # we only have a destination file
-            startFile = None
-            destinationFile = file[0]
-        elif len(file) == 2:
-            startFile = file[0]
-            destinationFile = file[1]
-        
-        if len(rank) == 1:
-            startRank = None
-            destinationRank = int(rank[0])
-        elif len(file) == 2:
-            startRank = int(rank[0])
-            destinationRank = int(rank[1])
-
-        # If we have the start position and end postion, then we can quit
-        if (startRank != None) and (startFile != None):
-            return (startFile,startRank), (destinationFile,destinationRank), special
-
-        # Find the starting position
-        allPieces = self._board.GetAllPieces(color)
-
-        # Do we know the start file?
-        searchPieces = []
+            candidates = kingAttacks[destination] & pieces
+
         if startFile != None:
-            for current in allPieces:
-                if (current[0] == startFile) and str.upper(self._board.GetPiece(current)) == pieceType:
-                    searchPieces.append(current)
-        else:
-            for current in allPieces:
-                if str.upper(self._board.GetPiece(current)) == pieceType:
-                    searchPieces.append(current)
+            candidates &= fileMasks[startFile]
+        if startRank != None:
+            candidates &= rankMasks[startRank]
+
+        if candidates & (candidates - 1):
+            # More than one candidate, SAN only disambiguates between legal moves so drop the pinned ones
+            for square in Squares(candidates):
+                board.MakeMove(square, destination, flag)
+                illegal = InCheck(board, color)
+                board.UnmakeMove()
+                if illegal:
+                    candidates ^= 1 << square
+
+        if not candidates:
+            return None
 
-        for currentPiece in searchPieces:
-            possibleMoves = self.SearchPiece(pieceType,currentPiece)
+        return (candidates & -candidates).bit_length() - 1, destination, flag
 
-            if (destinationFile,destinationRank) in possibleMoves:
-                return currentPiece, (destinationFile,destinationRank), None
+    def GetMove(self,move, color=None):
+        """Converts algebraic move into start and end tuples."""
+        combined = self.GetMoveSquares(move, color)
+        if combined == None:
+            return None
 
-        return None
+        startSquare, endSquare, flag = combined
+        if flag == castleFlag:
+            special = 'castle'
+        elif flag == enPassantFlag:
+            special = 'ep'
+        elif flag >= promoteToQueenFlag:
+            special = 'promotion ' + promotionPieces[flag]
+        else:
+            special = None
+
+        return squarePosition[startSquare], squarePosition[endSquare], special
@@ -0,0 +1,152 @@
+"""Streaming writers and readers for exported positions. Each entry is written as soon as it is produced and read
+back one record at a time, so memory use does not grow with the size of the dataset.
+
+Two formats are supported:
+ - NDJSON: one json object per line, the same objects MoveExporter puts in its json list.
+ - Binary: a header followed by records. Position records are fixed width and hold the packed board (see
+   Board.Pack), the move counts, the winner and one interned string id per tag. String records define the
+   interned strings the first time they are used.
+"""
+import json
+import struct
+from .board import Board, packedSize
+
+defaultTags = ('Event', 'Site', 'White', 'Black', 'Result', 'WhiteElo', 'BlackElo', 'TimeControl', 'ECO',
+               'Termination')
+
+_magic = b'PGNR'
+_version = 1
+_stringRecord = b'S'
+_positionRecord = b'P'
+_stringHeader = struct.Struct('<IH')
+_winnerCodes = {None: 0, 'w': 1, 'b': 2, 'draw': 3}
+_winnerNames = [None, 'w', 'b', 'draw']
+
+
+class NDJSONWriter:
+    """Writes one json entry per line."""
+
+    def __init__(self, filename):
+        self._file = open(filename, "w")
+
+    def Write(self, entry):
+        self._file.write(json.dumps(entry))
+        self._file.write('\n')
+
+    def Close(self):
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.Close()
+
+
+def ReadNDJSON(filename):
+    """Generator that yields the entries of an NDJSON file."""
+    with open(filename, "r") as inputFile:
+        for line in inputFile:
+            if line.strip():
+                yield json.loads(line)
+
+
+class BinaryWriter:
+    """Writes entries as fixed width binary records. Only the tags listed in tags are kept."""
+
+    def __init__(self, filename, tags=defaultTags):
+        self._file = open(filename, "wb")
+        self._tags = tuple(tags)
+        self._strings = {'': 0}
+        self._board = Board()
+        self._record = struct.Struct('<c' + str(packedSize) + 'sHHB' + str(len(self._tags)) + 'I')
+
+        header = _magic + bytes([_version, len(self._tags)])
+        for tag in self._tags:
+            encoded = tag.encode()
+            header += bytes([len(encoded)]) + encoded
+        self._file.write(header)
+
+    def _Intern(self, value):
+        """Return the id for value, writing a string record the first time it is seen."""
+        stringId = self._strings.get(value)
+        if stringId == None:
+            stringId = len(self._strings)
+            self._strings[value] = stringId
+            encoded = value.encode()
+            self._file.write(_stringRecord + _stringHeader.pack(stringId, len(encoded)) + encoded)
+        return stringId
+
+    def Write(self, entry):
+        """Write an entry. Raises ValueError if its FEN is malformed."""
+        if not self._board.SetFEN(entry['FEN']):
+            raise ValueError("Malformed FEN " + repr(entry['FEN']) + " in entry for move " + str(entry.get('move')))
+        tags = entry.get('tags', {})
+        tagIds = [self._Intern(tags.get(tag, '')) for tag in self._tags]
+
+        self._file.write(self._record.pack(_positionRecord, self._board.Pack(), entry['totalMoves'], entry['move'],
+                                           _winnerCodes[entry.get('winner')], *tagIds))
+
+    def Close(self):
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.Close()
+
+
+def ReadBinary(filename):
+    """Generator that yields the entries of a binary file as dictionaries in the NDJSON layout."""
+    with open(filename, "rb") as inputFile:
+        if inputFile.read(4) != _magic:
+            raise ValueError(filename + " is not a binary position file.")
+        version, numTags = inputFile.read(2)
+        if version != _version:
+            raise ValueError("Unsupported binary position file version " + str(version))
+
+        tags = []
+        for _ in range(numTags):
+            length = inputFile.read(1)[0]
+            tags.append(inputFile.read(length).decode())
+
+        record = struct.Struct('<' + str(packedSize) + 'sHHB' + str(numTags) + 'I')
+        strings = ['']
+        board = Board()
+
+        while True:
+            recordType = inputFile.read(1)
+            if recordType == b'':
+                break
+            elif recordType == _stringRecord:
+                stringId, length = _stringHeader.unpack(inputFile.read(_stringHeader.size))
+                strings.append(inputFile.read(length).decode())
+            elif recordType == _positionRecord:
+                packed, totalMoves, move, winner, *tagIds = record.unpack(inputFile.read(record.size))
+                board.Unpack(packed)
+
+                entry = {"tags": {tag: strings[stringId] for tag, stringId in zip(tags, tagIds) if stringId != 0},
+                         "FEN": board.ExportFEN(),
+                         "totalMoves": totalMoves,
+                         "move": move}
+                if winner != 0:
+                    entry["winner"] = _winnerNames[winner]
+                yield entry
+            else:
+                raise ValueError("Corrupt binary position file " + filename)
+
+
+writerTypes = {'ndjson': NDJSONWriter, 'binary': BinaryWriter}
+
+
+def OpenWriter(outfile, format):
+    """Streaming writer of entries for format, one of writerTypes or columnar (a dataset.DatasetWriter)."""
+    if format == 'columnar':
+        # numpy is only needed for this format
+        from .dataset import DatasetWriter
+        return DatasetWriter(outfile)
+    if format not in writerTypes:
+        raise ValueError("Unknown streaming format " + str(format) + ", expected columnar or one of " +
+                         ", ".join(writerTypes))
+    return writerTypes[format](outfile)
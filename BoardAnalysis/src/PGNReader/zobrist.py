@@ -0,0 +1,29 @@
+"""Zobrist keys, the same scheme as the C# Framework/Chess/Board/Zobrist.cs. The keys come from a fixed seed so a
+position hashes to the same 64-bit value in every process and every run, which lets the keys be stored on disk."""
+import random
+
+_seed = 29426028
+_random = random.Random(_seed)
+
+# pieceKeys[code][square], code 0 (empty) is all zeros so it can be XORed unconditionally
+pieceKeys = [[0]*64] + [[_random.getrandbits(64) for _ in range(64)] for _ in range(12)]
+castleKeys = [_random.getrandbits(64) for _ in range(16)]
+epFileKeys = [_random.getrandbits(64) for _ in range(8)]
+sideKey = _random.getrandbits(64)
+
+
+def ComputeKey(mailbox, blackToMove, castle, ep):
+    """Full Zobrist key for a position. Board keeps its key up to date incrementally, this is used when a
+    position is set from scratch."""
+    key = 0
+    for square, code in enumerate(mailbox):
+        if code:
+            key ^= pieceKeys[code][square]
+
+    key ^= castleKeys[castle]
+    if ep >= 0:
+        key ^= epFileKeys[ep & 7]
+    if blackToMove:
+        key ^= sideKey
+
+    return key
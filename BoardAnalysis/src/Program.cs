@@ -7,8 +7,34 @@ namespace BoardAnalysis.Application
 {
 	public class Program
 	{
+		public static void ScoreGame(Evaluate evaluate, GameInfo currentGame)
+		{
+			evaluate.LoadFEN(currentGame.FEN);
+			GameInfo currentScore = evaluate.EvaluatePosition();
+
+			currentGame.centerScore = currentScore.centerScore;
+			currentGame.oppCenterScore = currentScore.oppCenterScore;
+			currentGame.centerAttackScore = currentScore.centerAttackScore;
+			currentGame.oppAttackScore = currentScore.oppAttackScore;
+			currentGame.slidingEdgeScore = currentScore.slidingEdgeScore;
+			currentGame.pieceScore = currentScore.pieceScore;
+			currentGame.oppPieceScore = currentScore.oppPieceScore;
+			currentGame.rookScore = currentScore.rookScore;
+			currentGame.unprotectedScore = currentScore.unprotectedScore;
+			currentGame.checkmateScore = currentScore.checkmateScore;
+			currentGame.totalScore = currentScore.centerScore + currentScore.pieceScore + currentScore.rookScore + currentScore.checkmateScore;
+			currentGame.nextTurn = currentScore.nextTurn;
+		}
+
 		public static void ReadFile(string filename)
 		{
+			string extension = Path.GetExtension(filename);
+			if (extension == ".ndjson" || extension == ".jsonl")
+			{
+				ReadNDJSONFile(filename, Path.ChangeExtension(filename, ".scored" + extension));
+				return;
+			}
+
 			List<GameInfo> source = new List<GameInfo>();
 
 			using (StreamReader r = new StreamReader(filename))
@@ -21,22 +47,7 @@ namespace BoardAnalysis.Application
 
 			for(int index=0; index<source.Count(); ++index)
 			{
-				GameInfo currentGame = source[index];
-				evaluate.LoadFEN(currentGame.FEN);
-				GameInfo currentScore = evaluate.EvaluatePosition();
-
-				source[index].centerScore = currentScore.centerScore;
-				source[index].oppCenterScore = currentScore.oppCenterScore;
-				source[index].centerAttackScore = currentScore.centerAttackScore;
-				source[index].oppAttackScore = currentScore.oppAttackScore;
-                source[index].slidingEdgeScore = currentScore.slidingEdgeScore;
-                source[index].pieceScore = currentScore.pieceScore;
-				source[index].oppPieceScore = currentScore.oppPieceScore;
-                source[index].rookScore = currentScore.rookScore;
-				source[index].unprotectedScore = currentScore.unprotectedScore;
-				source[index].checkmateScore = currentScore.checkmateScore;
-				source[index].totalScore = currentScore.centerScore + currentScore.pieceScore + currentScore.rookScore + currentScore.checkmateScore;
-				source[index].nextTurn = currentScore.nextTurn;
+				ScoreGame(evaluate, source[index]);
 			}
 
 			string jsonString = JsonSerializer.Serialize<List<GameInfo>>(source);
@@ -47,6 +58,30 @@ namespace BoardAnalysis.Application
 			}
 		}
 
+		// Newline delimited json: each line is read, scored and written before the next one is read,
+		// so memory use does not depend on the number of positions.
+		public static void ReadNDJSONFile(string filename, string outfile)
+		{
+			Evaluate evaluate = new Evaluate();
+
+			using (StreamReader r = new StreamReader(filename))
+			using (StreamWriter outputFile = new StreamWriter(outfile))
+			{
+				string? line;
+				while ((line = r.ReadLine()) != null)
+				{
+					if (string.IsNullOrWhiteSpace(line))
+					{
+						continue;
+					}
+
+					GameInfo currentGame = JsonSerializer.Deserialize<GameInfo>(line);
+					ScoreGame(evaluate, currentGame);
+					outputFile.WriteLine(JsonSerializer.Serialize<GameInfo>(currentGame));
+				}
+			}
+		}
+
         public static void Main(string[] args)
         {
 			string jsonFile;
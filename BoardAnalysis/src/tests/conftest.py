@@ -0,0 +1,43 @@
+import os
+import sys
+import pytest
+
+# The tests import PGNReader from the source tree
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Small games covering mate, castling, en passant and promotion, with the FEN after the last move
+sampleGames = [
+    ({'Event': 'Scholar', 'White': 'A', 'Black': 'B', 'Result': '1-0', 'WhiteElo': '1500', 'BlackElo': '1400',
+      'TimeControl': '600+5', 'ECO': 'C20'},
+     '1. e4 e5 2. Bc4 Nc6 3. Qh5 Nf6 4. Qxf7# 1-0',
+     'r1bqkb1r/pppp1Qpp/2n2n2/4p3/2B1P3/8/PPPP1PPP/RNB1K1NR b KQkq - 0 4'),
+    ({'Event': 'Castles', 'White': 'C', 'Black': 'D', 'Result': '1/2-1/2', 'WhiteElo': '2200', 'BlackElo': '2150',
+      'TimeControl': '180+2', 'ECO': 'B02'},
+     '1. e4 Nf6 2. e5 d5 3. exd6 exd6 4. Nf3 Be7 5. Bc4 O-O 6. O-O Nc6 7. d4 Bg4 8. h3 Bxf3 9. Qxf3 Nxd4 '
+     '10. Qd3 c5 1/2-1/2',
+     'r2q1rk1/pp2bppp/3p1n2/2p5/2Bn4/3Q3P/PPP2PP1/RNB2RK1 w - c6 0 11'),
+    ({'Event': 'Promotion', 'White': 'E', 'Black': 'F', 'Result': '0-1', 'WhiteElo': '1800', 'BlackElo': '1900',
+      'TimeControl': '600+5', 'ECO': 'B01'},
+     '1. e4 d5 2. exd5 c6 3. dxc6 Qb6 4. cxb7 Nf6 5. bxa8=Q Qb4 6. Qxb8 Qxb2 7. Bxb2 0-1',
+     '1Qb1kb1r/p3pppp/5n2/8/8/8/PBPP1PPP/RN1QKBNR b KQk - 0 7'),
+]
+
+# A game whose fifth move (ply 4) can not be resolved
+brokenGame = ({'Event': 'Broken', 'White': 'G', 'Black': 'H', 'Result': '*'}, '1. e4 e5 2. Nf3 Nc6 3. Ke3 Nf6 4. d3 Be7 *')
+
+
+def PGNText(games):
+    """PGN text for (tags, movetext) pairs."""
+    text = ''
+    for tags, movetext, *_ in games:
+        text += ''.join('[' + tag + ' "' + value + '"]\n' for tag, value in tags.items())
+        text += '\n' + movetext + '\n\n'
+    return text
+
+
+@pytest.fixture
+def pgnFile(tmp_path):
+    """PGN file with the sample games followed by the broken game."""
+    path = tmp_path / 'games.pgn'
+    path.write_text(PGNText(sampleGames + [brokenGame]))
+    return str(path)
@@ -0,0 +1,31 @@
+import random
+from PGNReader.attacks import RookAttacks, BishopAttacks, QueenAttacks, PawnAttacks, Squares, knightAttacks, \
+    kingAttacks, betweenSquares, rookDirections, bishopDirections, _RayAttacks
+
+
+def test_SlidingAttacks():
+    # The table lookups give the same attacks as walking the rays
+    rng = random.Random(3)
+    for square in range(64):
+        for _ in range(40):
+            occupancy = rng.getrandbits(64) & rng.getrandbits(64)
+            assert RookAttacks(square, occupancy) == _RayAttacks(square, rookDirections, occupancy)
+            assert BishopAttacks(square, occupancy) == _RayAttacks(square, bishopDirections, occupancy)
+            assert QueenAttacks(square, occupancy) == RookAttacks(square, occupancy) | \
+                BishopAttacks(square, occupancy)
+
+
+def test_StepAttacks():
+    assert list(Squares(knightAttacks[0])) == [10, 17]
+    assert len(list(Squares(knightAttacks[27]))) == 8
+    assert list(Squares(kingAttacks[7])) == [6, 14, 15]
+    assert list(Squares(PawnAttacks(12, 'w'))) == [19, 21]
+    assert list(Squares(PawnAttacks(12, 'b'))) == [3, 5]
+    assert PawnAttacks(8, 'w') == 1 << 17
+
+
+def test_BetweenSquares():
+    assert list(Squares(betweenSquares[0][63])) == [9, 18, 27, 36, 45, 54]
+    assert list(Squares(betweenSquares[4][0])) == [1, 2, 3]
+    assert betweenSquares[0][17] == 0
+    assert betweenSquares[0][1] == 0
@@ -0,0 +1,40 @@
+import random
+from PGNReader.benchmark import RandomGame, WriteCorpus, Compare, RunBenchmarks
+from PGNReader.game import Replay
+from PGNReader.pgn import ReadGames
+
+
+def test_RandomGame():
+    # Random games are reproducible
+    moves, result = RandomGame(random.Random(4), 60)
+    assert (moves, result) == RandomGame(random.Random(4), 60)
+    assert len(moves) <= 60
+    assert result in ('1-0', '0-1', '1/2-1/2', '*')
+
+
+def test_WriteCorpus(tmp_path):
+    fileNames = WriteCorpus(str(tmp_path), games=10, seed=2, files=3, maxPlies=40)
+    assert len(fileNames) == 3
+    games = [game for fileName in fileNames for game in ReadGames(fileName)]
+    assert len(games) == 10
+    for game in games:
+        replay = Replay()
+        replay.LoadGame(game)
+        assert replay.errorPly == None
+
+
+def test_RunBenchmarks(tmp_path):
+    WriteCorpus(str(tmp_path), games=4, seed=3, files=2, maxPlies=20)
+    results = RunBenchmarks(str(tmp_path), repeat=1)
+    assert set(results) == {'setFEN', 'setFENCached', 'exportFEN', 'getMove', 'replay', 'loadGames'}
+    assert results['replay']['count'] == 4
+    assert all(result['rate'] >= 0 for result in results.values())
+
+
+def test_Compare():
+    baseline = {"benchmarks": {"a": {"rate": 100.0}, "b": {"rate": 100.0}, "c": {"rate": 0.0}}}
+    results = {"benchmarks": {"a": {"rate": 95.0}, "b": {"rate": 50.0}, "c": {"rate": 10.0}, "d": {"rate": 1.0}}}
+    rows, regressions = Compare(results, baseline, 0.1)
+    assert [row[0] for row in rows] == ['a', 'b']
+    assert rows[1][3] == -0.5
+    assert regressions == ['b']
@@ -0,0 +1,133 @@
+import pytest
+from PGNReader.board import Board, startFEN, packedSize, castleFlag, enPassantFlag, pawnTwoUpFlag, \
+    promoteToQueenFlag
+from PGNReader.movegen import GenerateMoves
+from PGNReader.zobrist import ComputeKey
+from PGNReader.perft import referencePositions
+
+fens = [fen for fen, _ in referencePositions] + [
+    '8/8/8/3pP3/8/8/8/4K2k w - d6 0 3',
+    'r3k2r/8/8/8/8/8/8/R3K2R b Kq - 5 40',
+    '7k/1P6/8/8/8/8/6p1/K7 w - - 0 60',
+]
+
+
+def _Key(board):
+    return ComputeKey(board._mailbox, board.SideToMove() == 'b', board._castle, board._ep)
+
+
+@pytest.mark.parametrize('fen', fens)
+def test_FENRoundTrip(fen):
+    assert Board(fen).ExportFEN() == fen
+
+
+def test_Pieces():
+    board = Board()
+    assert board.ExportFEN() == startFEN
+    assert board.GetPiece(('e', 1)) == 'K'
+    assert board.GetPiece(('d', 8)) == 'q'
+    assert board.GetPiece(('e', 4)) == None
+    assert board.GetPiece(('i', 4)) == None
+    assert board.GetColor(('g', 8)) == 'b'
+    assert board.GetColor(('a', 2)) == 'w'
+    assert board.GetColor(('a', 3)) == None
+    assert board.PieceBitboard('P') == 0xff00
+    assert board.PieceBitboard('k') == 1 << 60
+    assert board.Occupancy('w') == 0xffff
+    assert board.Occupancy('b') == 0xffff << 48
+    assert board.Occupancy() == board.Occupancy('w') | board.Occupancy('b')
+    assert sorted(board.GetAllPieces('w')) == sorted((file, rank) for file in 'abcdefgh' for rank in (1, 2))
+
+
+def test_MovePiece():
+    board = Board()
+    board.MovePiece(('e', 2), ('e', 4))
+    board.MovePiece(('g', 8), ('f', 6))
+    assert board.ExportFEN() == 'rnbqkb1r/pppppppp/5n2/8/4P3/8/PPPP1PPP/RNBQKBNR w KQkq - 1 2'
+
+
+@pytest.mark.parametrize('fen', fens)
+def test_PackUnpack(fen):
+    board = Board(fen)
+    data = board.Pack()
+    assert len(data) == packedSize
+
+    unpacked = Board()
+    unpacked.Unpack(data)
+    assert unpacked.ExportFEN() == fen
+
+
+@pytest.mark.parametrize('fen', fens)
+def test_MakeUnmake(fen):
+    board = Board(fen)
+    for move in GenerateMoves(board):
+        board.MakeMove(*move)
+        for reply in GenerateMoves(board):
+            board.MakeMove(*reply)
+            board.UnmakeMove()
+        board.UnmakeMove()
+        assert board.ExportFEN() == fen
+
+
+def test_MakeMoveFlags():
+    board = Board('r3k2r/8/8/3pP3/8/8/1p4P1/R3K2R w KQkq d6 0 20')
+    board.MakeMove(36, 43, enPassantFlag)
+    assert board.ExportFEN() == 'r3k2r/8/3P4/8/8/8/1p4P1/R3K2R b KQkq - 0 20'
+    board.MakeMove(9, 0, promoteToQueenFlag)
+    assert board.ExportFEN() == 'r3k2r/8/3P4/8/8/8/6P1/q3K2R w Kkq - 0 21'
+    board.MakeMove(4, 6, castleFlag)
+    assert board.ExportFEN() == 'r3k2r/8/3P4/8/8/8/6P1/q4RK1 b kq - 1 21'
+    board.UnmakeMove()
+    board.MakeMove(14, 30, pawnTwoUpFlag)
+    assert board.ExportFEN() == 'r3k2r/8/3P4/8/6P1/8/8/q3K2R b Kkq g3 0 21'
+    for _ in range(3):
+        board.UnmakeMove()
+    assert board.ExportFEN() == 'r3k2r/8/8/3pP3/8/8/1p4P1/R3K2R w KQkq d6 0 20'
+
+
+@pytest.mark.parametrize('fen', fens)
+def test_ZobristKey(fen):
+    # The incremental key is the one computed from scratch after every move and take back
+    board = Board(fen)
+    key = board.ZobristKey()
+    assert key == _Key(board)
+    for move in GenerateMoves(board):
+        board.MakeMove(*move)
+        assert board.ZobristKey() == _Key(board), move
+        for reply in GenerateMoves(board):
+            board.MakeMove(*reply)
+            assert board.ZobristKey() == _Key(board), (move, reply)
+            board.UnmakeMove()
+        board.UnmakeMove()
+        assert board.ZobristKey() == key
+
+
+def test_ZobristTransposition():
+    first = Board()
+    for move in ((6, 21), (57, 42), (1, 18), (62, 45)):
+        first.MakeMove(*move)
+    second = Board()
+    for move in ((1, 18), (62, 45), (6, 21), (57, 42)):
+        second.MakeMove(*move)
+    assert first.ExportFEN() == second.ExportFEN()
+    assert first.ZobristKey() == second.ZobristKey()
+    assert first.ZobristKey() != Board().ZobristKey()
+    # The side to move, castling rights and en passant file are part of the key
+    assert Board(startFEN.replace(' w ', ' b ')).ZobristKey() != Board().ZobristKey()
+    assert Board(startFEN.replace('KQkq', 'KQk')).ZobristKey() != Board().ZobristKey()
+
+
+@pytest.mark.parametrize('move', [(28, 36, 0), (4, 6, castleFlag), (4, 2, castleFlag), (12, 14, castleFlag),
+                                  (6, 8, castleFlag)])
+def test_MakeMoveInvalid(move):
+    # Moves from an empty square or castling without a rook on h1 or a1 raise before anything is changed
+    fen = '4k3/8/8/8/8/8/4P3/1N2K1R1 w - - 0 1'
+    board = Board(fen)
+    key = board.ZobristKey()
+    with pytest.raises(ValueError):
+        board.MakeMove(*move)
+    assert board.ExportFEN() == fen
+    assert board.ZobristKey() == key
+    assert list(board._bitboards) == list(Board(fen)._bitboards)
+    with pytest.raises(IndexError):
+        board.UnmakeMove()
@@ -0,0 +1,113 @@
+import json
+import os
+import pytest
+from conftest import sampleGames, brokenGame, PGNText
+from PGNReader import checkpoint
+from PGNReader.filters import GameFilter
+from PGNReader.MoveExport import MoveExporter
+from PGNReader.sampling import Sampler
+
+
+def LongGame(timeControl):
+    """Module level predicate for the resumed filter."""
+    return timeControl != '180+2'
+
+
+@pytest.fixture
+def pgnDirectory(tmp_path):
+    directory = tmp_path / 'pgn'
+    directory.mkdir()
+    (directory / 'a.pgn').write_text(PGNText(sampleGames + [brokenGame] + sampleGames))
+    (directory / 'b.pgn').write_text(PGNText([brokenGame] + sampleGames))
+    (directory / 'notes.txt').write_text('not a pgn file')
+    return str(directory)
+
+
+def _Exporter(gameFilter=None):
+    return MoveExporter(Sampler('uniform', count=2, seed=7), gameFilter=gameFilter)
+
+
+def _Output(directory):
+    """Contents of the shard and error files of an export."""
+    output = {}
+    for name in sorted(os.listdir(directory)):
+        if name.startswith('shard-') or name.startswith('errors-'):
+            with open(os.path.join(directory, name), "r") as outputFile:
+                output[name] = outputFile.read()
+    return output
+
+
+def test_Export(tmp_path, pgnDirectory):
+    exporter = _Exporter()
+    result = checkpoint.ExportResumable(exporter, pgnDirectory, str(tmp_path / 'out'), shardGames=3)
+    assert result.Done()
+    assert [shard["games"] for shard in result.Shards()] == [3, 3, 1, 3, 1]
+    assert sum(shard["errors"] for shard in result.Shards()) == 2
+    assert len(exporter.errors) == 2
+
+    output = _Output(str(tmp_path / 'out'))
+    assert sorted(output) == ['errors-00001.ndjson', 'errors-00003.ndjson'] + \
+        ['shard-0000' + str(number) + '.ndjson' for number in range(5)]
+    entries = [json.loads(line) for name, text in output.items() if name.startswith('shard-')
+               for line in text.splitlines()]
+    assert sum(shard["entries"] for shard in result.Shards()) == len(entries)
+
+    # Running it again finds everything done
+    again = _Exporter()
+    checkpoint.ExportResumable(again, pgnDirectory, str(tmp_path / 'out'), shardGames=3)
+    assert len(again.errors) == 0
+    assert _Output(str(tmp_path / 'out')) == output
+
+
+@pytest.mark.parametrize('crashAfter', [0, 1, 3, 5])
+def test_Resume(tmp_path, pgnDirectory, monkeypatch, crashAfter):
+    gameFilter = GameFilter(timeControls=LongGame)
+    checkpoint.ExportResumable(_Exporter(gameFilter), pgnDirectory, str(tmp_path / 'full'), shardGames=2)
+
+    # Crash after crashAfter manifest updates, once the next shard and its errors have been written
+    save = checkpoint.Checkpoint.Save
+    calls = []
+
+    def CrashingSave(self):
+        if len(calls) == crashAfter:
+            raise KeyboardInterrupt
+        calls.append(True)
+        save(self)
+
+    monkeypatch.setattr(checkpoint.Checkpoint, 'Save', CrashingSave)
+    with pytest.raises(KeyboardInterrupt):
+        checkpoint.ExportResumable(_Exporter(GameFilter(timeControls=LongGame)), pgnDirectory,
+                                   str(tmp_path / 'resumed'), shardGames=2)
+    monkeypatch.setattr(checkpoint.Checkpoint, 'Save', save)
+
+    result = checkpoint.ExportResumable(_Exporter(GameFilter(timeControls=LongGame)), pgnDirectory,
+                                        str(tmp_path / 'resumed'), shardGames=2)
+    assert result.Done()
+    assert _Output(str(tmp_path / 'resumed')) == _Output(str(tmp_path / 'full'))
+
+
+def test_ResumeECO(tmp_path, pgnDirectory):
+    # The tuple of codes comes back from the manifest as a list, which is the same settings
+    first = checkpoint.ExportResumable(_Exporter(GameFilter(eco=('B', 'C20'))), pgnDirectory, str(tmp_path / 'out'),
+                                       shardGames=3)
+    output = _Output(str(tmp_path / 'out'))
+    again = checkpoint.ExportResumable(_Exporter(GameFilter(eco=('B', 'C20'))), pgnDirectory, str(tmp_path / 'out'),
+                                       shardGames=3)
+    assert again.Done()
+    assert again.Shards() == first.Shards()
+    assert _Output(str(tmp_path / 'out')) == output
+
+
+def test_DifferentSettings(tmp_path, pgnDirectory):
+    checkpoint.ExportResumable(_Exporter(), pgnDirectory, str(tmp_path / 'out'), shardGames=3)
+    with pytest.raises(ValueError):
+        checkpoint.ExportResumable(_Exporter(), pgnDirectory, str(tmp_path / 'out'), shardGames=4)
+    with pytest.raises(ValueError):
+        checkpoint.ExportResumable(_Exporter(GameFilter(minElo=2000)), pgnDirectory, str(tmp_path / 'out'),
+                                   shardGames=3)
+
+
+def test_UnnamedPredicate(tmp_path, pgnDirectory):
+    with pytest.raises(ValueError):
+        checkpoint.ExportResumable(_Exporter(GameFilter(event=lambda event: True)), pgnDirectory,
+                                   str(tmp_path / 'out'))
@@ -0,0 +1,66 @@
+import os
+import pytest
+
+np = pytest.importorskip('numpy')
+from PGNReader.dataset import DatasetWriter, Dataset
+from PGNReader.MoveExport import MoveExporter
+from PGNReader.sampling import Sampler
+from PGNReader.writers import defaultTags
+
+
+@pytest.fixture
+def entries(pgnFile):
+    return list(MoveExporter(Sampler('nth', minPly=0, every=3)).ProcessFile(pgnFile))
+
+
+def test_Dataset(tmp_path, entries):
+    path = str(tmp_path / 'dataset')
+    with DatasetWriter(path, shardSize=7) as writer:
+        for entry in entries[:10]:
+            writer.Write(entry)
+    # Opening it again appends shards
+    with DatasetWriter(path, shardSize=7) as writer:
+        for entry in entries[10:]:
+            writer.Write(entry)
+
+    dataset = Dataset(path)
+    assert len(dataset) == len(entries)
+    assert [shard.rows for shard in dataset.shards][:3] == [7, 3, 7]
+    assert list(dataset.Entries()) == entries
+    assert dataset.Concatenate('ply').tolist() == [entry['move'] for entry in entries]
+    assert dataset.Concatenate('gameLength').tolist() == [entry['totalMoves'] for entry in entries]
+    assert dataset.Concatenate('bitboards').shape == (len(entries), 12)
+    assert dataset.Concatenate('tags').shape == (len(entries), len(defaultTags))
+    # Columns are memory-mapped
+    assert all(isinstance(column, np.memmap) for column in dataset.Column('castle'))
+
+
+def test_Interrupted(tmp_path, entries):
+    # A shard directory that is not in the manifest is left over from an interrupted run and is replaced
+    path = str(tmp_path / 'dataset')
+    os.makedirs(os.path.join(path, 'shard-00000'))
+    with DatasetWriter(path) as writer:
+        for entry in entries:
+            writer.Write(entry)
+    assert list(Dataset(path).Entries()) == entries
+
+
+def test_Errors(tmp_path, entries):
+    path = str(tmp_path / 'dataset')
+    with DatasetWriter(path) as writer:
+        writer.Write(entries[0])
+        # The entry is rejected instead of being written with the previous entry's position
+        with pytest.raises(ValueError):
+            writer.Write(dict(entries[0], FEN='rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP w KQkq - 0 1'))
+    assert len(Dataset(path)) == 1
+
+    with pytest.raises(ValueError):
+        DatasetWriter(path, tags=('White',))
+    with pytest.raises(ValueError):
+        Dataset(str(tmp_path))
+
+
+def test_LoadPGN(tmp_path, pgnFile, entries):
+    outfile = str(tmp_path / 'out')
+    MoveExporter(Sampler('nth', minPly=0, every=3)).LoadPGN(pgnFile, outfile, format='columnar')
+    assert list(Dataset(outfile).Entries()) == entries
@@ -0,0 +1,84 @@
+import io
+import logging
+from conftest import sampleGames
+from PGNReader.diagnostics import ErrorReport, EnableLogging, GameTags
+from PGNReader.game import Replay
+from PGNReader.MoveExport import MoveExporter
+from PGNReader.pgn import PGNGame, ReadGames
+from PGNReader.sampling import Sampler
+from PGNReader.writers import ReadNDJSON
+
+
+def test_ErrorReport(tmp_path):
+    errors = ErrorReport()
+    errors.Add('move', {'Event': 'E', 'Site': 'S', 'ECO': 'A00'}, 4, 'Ke3', "move could not be resolved")
+    errors.Add('exception', message="game.pgn: ValueError()")
+    assert len(errors) == 2
+    assert errors.records[0] == {"kind": 'move', "game": {'Event': 'E', 'Site': 'S'}, "ply": 4, "move": 'Ke3',
+                                 "message": "move could not be resolved"}
+    assert errors.records[1] == {"kind": 'exception', "game": {}, "ply": None, "move": None,
+                                 "message": "game.pgn: ValueError()"}
+    assert errors.Counts() == {'move': 1, 'exception': 1}
+
+    path = str(tmp_path / 'errors.ndjson')
+    errors.Write(path)
+    errors.Write(path, append=True)
+    assert list(ReadNDJSON(path)) == 2*errors.records
+
+    other = ErrorReport()
+    other.Extend(errors.records)
+    assert list(other) == errors.records
+    other.Clear()
+    assert not other
+
+
+def test_GameTags():
+    assert GameTags({'Event': 'E', 'Round': '3', 'WhiteElo': '2000'}) == {'Event': 'E', 'Round': '3'}
+
+
+def test_ReplayErrors(pgnFile, caplog):
+    errors = ErrorReport()
+    replay = Replay(errors=errors)
+    with caplog.at_level(logging.WARNING, logger='PGNReader'):
+        replay.LoadGame(list(ReadGames(pgnFile))[-1])
+    assert replay.errorPly == 4
+    assert len(replay.BoardPositions()) == 5
+    assert [(record["kind"], record["game"]["Event"], record["ply"], record["move"]) for record in errors] == \
+        [('move', 'Broken', 4, 'Ke3')]
+    assert [record.getMessage() for record in caplog.records] == ["Could not resolve move Ke3 at ply 4"]
+
+
+def test_ExporterErrors(pgnFile, capsys):
+    exporter = MoveExporter(Sampler('nth', minPly=0, every=1))
+    entries = list(exporter.ProcessFile(pgnFile))
+    assert [entry['move'] for entry in entries if entry['tags']['Event'] == 'Broken'] == [0, 1, 2, 3, 4]
+    # A game that raises is reported and skipped
+    badGame = PGNGame({'Event': 'Bad'})
+    badGame.moves = None
+    assert exporter._SafeProcess(badGame) == []
+    assert exporter.errors.Counts() == {'move': 1, 'exception': 1}
+    assert exporter.errors.records[-1]["game"] == {'Event': 'Bad'}
+    # Nothing is printed
+    assert capsys.readouterr() == ('', '')
+
+
+def test_EnableLogging(pgnFile):
+    stream = io.StringIO()
+    handler = EnableLogging(logging.DEBUG, stream)
+    try:
+        Replay().LoadGame(list(ReadGames(pgnFile))[-1])
+    finally:
+        logging.getLogger('PGNReader').removeHandler(handler)
+        logging.getLogger('PGNReader').setLevel(logging.NOTSET)
+    output = stream.getvalue()
+    assert 'WARNING PGNReader.game: Could not resolve move Ke3 at ply 4' in output
+    assert 'DEBUG' in output
+
+
+def test_Quiet(pgnFile, capsys):
+    # Without logging configured the package writes nothing
+    for game in ReadGames(pgnFile):
+        replay = Replay()
+        replay.LoadGame(game)
+        replay.NextMove(min(3, replay.MoveCount()))
+    assert capsys.readouterr() == ('', '')
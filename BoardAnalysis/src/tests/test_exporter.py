@@ -0,0 +1,55 @@
+import json
+import pytest
+from conftest import sampleGames, brokenGame, PGNText
+from PGNReader.MoveExport import MoveExporter
+from PGNReader.pgn import ReadGames
+from PGNReader.sampling import Sampler
+
+
+@pytest.fixture
+def games(tmp_path):
+    path = tmp_path / 'games.pgn'
+    path.write_text(PGNText(3*sampleGames + [brokenGame]))
+    return list(ReadGames(str(path)))
+
+
+def _Exporter():
+    return MoveExporter(Sampler('uniform', count=3, seed=11))
+
+
+def _Key(entry):
+    return json.dumps(entry, sort_keys=True)
+
+
+def test_Ordered(games):
+    serial = _Exporter()
+    expected = list(serial._Process(games, 1, 2, True))
+    pool = _Exporter()
+    assert list(pool.ProcessGames(games, workers=2, chunksize=2)) == expected
+    # The errors of the games replayed by the workers are collected
+    assert pool.errors.records == serial.errors.records
+    assert [record["move"] for record in pool.errors] == ['Ke3']
+
+
+def test_Unordered(games):
+    expected = list(_Exporter()._Process(games, 1, 1, True))
+    entries = list(_Exporter().ProcessGames(games, workers=3, chunksize=1, ordered=False))
+    assert sorted(map(_Key, entries)) == sorted(map(_Key, expected))
+
+
+def test_LoadGames(tmp_path, games):
+    directory = tmp_path / 'pgn'
+    directory.mkdir()
+    (directory / 'a.pgn').write_text(PGNText(sampleGames))
+    (directory / 'b.pgn').write_text(PGNText([brokenGame] + sampleGames))
+    (directory / 'c.txt').write_text(PGNText(sampleGames))
+
+    serial = str(tmp_path / 'serial.json')
+    _Exporter().LoadGames(str(directory), serial, workers=1, chunksize=2)
+    pool = str(tmp_path / 'pool.json')
+    _Exporter().LoadGames(str(directory), pool, workers=2, chunksize=2)
+    with open(serial, "r") as serialFile, open(pool, "r") as poolFile:
+        entries = json.load(serialFile)
+        assert json.load(poolFile) == entries
+    # Only the .pgn files are read
+    assert sum(entry['tags']['Event'] != 'Broken' for entry in entries) == 3*2*len(sampleGames)
@@ -0,0 +1,36 @@
+import pytest
+
+np = pytest.importorskip('numpy')
+from PGNReader.features import EvaluateFENs, featureNames
+
+# Output of the C# Evaluate.EvaluatePosition for each FEN: centerScore, oppCenterScore, centerAttackScore,
+# oppAttackScore, slidingEdgeScore, unprotectedScore, pieceScore, oppPieceScore, rookScore, checkmateScore,
+# nextTurn
+evaluatePositionOutputs = [
+    ('rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1', (0, 0, 0, 0, -5, 0, 94, 94, 0, 0), 'w'),
+    ('r3k2r/8/8/8/8/8/8/R3K2R w KQkq - 0 1', (0, 0, 0, 0, 0, 2, 30, 30, 0, 0), 'w'),
+    ('rnbqkbnr/pppp1p1p/8/6p1/4P3/2Pp4/PP1N1PPP/R1BQKBNR w KQkq - 0 5', (5, 2, 3, 0, -5, 1, 94, 93, 0, 0), 'w'),
+    ('rnbqkbnr/pppp1p1p/8/6p1/3pP3/2P5/PP1N1PPP/R1BQKBNR b KQkq - 0 4', (3, 5, 0, 3, -4, 0, 93, 94, 0, 0), 'b'),
+    # Side to move in check, the turn can not be skipped
+    ('rnbq2nr/pp4bp/2p1k3/4ppp1/P1PNP2P/1P1p4/R4PP1/2B1KBNR b K - 1 16', (11, 0, 0, 0, -4, 5, 94, 73, 0, -5), 'b'),
+    ('r1bqkbn1/n1p1p2r/p1Bp2p1/1p3pNp/P5P1/2NP4/1PPBPP1P/R2QK2R b KQq - 2 10', (4, 0, 0, 0, -5, 6, 94, 94, 0, -5),
+     'b'),
+    # Checkmate
+    ('kb6/2R4p/8/1PP3P1/5p2/N4B1N/1p4K1/8 b - - 1 61', (2, 0, 0, 0, -1, 3, 13, 44, 0, 95), 'b'),
+    # Linked rooks
+    ('4N1r1/4k1b1/npr4p/p1P1P2p/5QBP/2PK2P1/P7/4R2R b - - 4 34', (2, 11, 1, 3, -1, 2, 74, 52, 1, 0), 'b'),
+]
+
+
+def test_EvaluatePositionParity():
+    result = EvaluateFENs([fen for fen, _, _ in evaluatePositionOutputs])
+    for index, (fen, expected, nextTurn) in enumerate(evaluatePositionOutputs):
+        actual = tuple(int(result[name][index]) for name in featureNames[:10])
+        assert actual == expected, fen
+        assert result['nextTurn'][index] == nextTurn
+
+
+def test_TotalScore():
+    result = EvaluateFENs([fen for fen, _, _ in evaluatePositionOutputs])
+    expected = result['centerScore'] + result['pieceScore'] + result['rookScore'] + result['checkmateScore']
+    assert (result['totalScore'] == expected).all()
@@ -0,0 +1,55 @@
+import pytest
+from PGNReader import board as boardModule
+from PGNReader.board import Board, DecodeFEN, EncodeFEN, SetFENCacheSize, startFEN, castleFlag
+from PGNReader.perft import referencePositions
+
+fens = [fen for fen, _ in referencePositions] + ['8/8/8/3pP3/8/8/8/4K2k w - d6 0 3',
+                                                 'r3k2r/8/8/8/8/8/8/R3K2R b Kq - 5 40']
+
+
+@pytest.mark.parametrize('fen', fens)
+def test_RoundTrip(fen):
+    mailbox, bitboards, currentPlayer, castle, ep, halfmoves, fullmoves, _ = DecodeFEN(fen)
+    assert EncodeFEN(mailbox, currentPlayer, castle, ep, halfmoves, fullmoves) == fen
+    assert len(mailbox) == 64 and len(bitboards) == 12
+    assert Board(fen).ExportFEN() == fen
+
+
+def test_Fields():
+    mailbox, bitboards, currentPlayer, castle, ep, halfmoves, fullmoves, _ = \
+        DecodeFEN('r3k2r/8/8/3pP3/8/8/8/R3K2R w Kq d6 3 21')
+    assert (currentPlayer, castle, ep, halfmoves, fullmoves) == ('w', 1 | 8, 43, 3, 21)
+    assert mailbox[0] == 4 and mailbox[60] == 12 and mailbox[36] == 1
+    # Missing move counters default to 0 and 1
+    assert DecodeFEN('4k3/8/8/8/8/8/8/4K3 b - -')[5:7] == (0, 1)
+
+
+@pytest.mark.parametrize('fen', ['', 'not a fen', 'rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP w KQkq - 0 1',
+                                 'rnbqkbnr/pppppppp/9/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1',
+                                 'rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR x KQkq - 0 1',
+                                 'rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq z9 0 1'])
+def test_Malformed(fen):
+    assert DecodeFEN(fen) == None
+    board = Board()
+    assert board.SetFEN(fen) == False
+    assert board.ExportFEN() == startFEN
+
+
+def test_Cache():
+    cacheSize = boardModule.fenCacheSize
+    try:
+        SetFENCacheSize(2)
+        board = Board()
+        for fen in fens:
+            board.SetFEN(fen)
+        assert boardModule.CachedDecodeFEN.cache_info().currsize == 2
+        # A cached decode does not share its mailbox with the board
+        board.SetFEN(fens[-1])
+        board.MakeMove(60, 58, castleFlag)
+        assert Board(fens[-1]).ExportFEN() == fens[-1]
+
+        SetFENCacheSize(0)
+        assert boardModule.CachedDecodeFEN is DecodeFEN
+        assert Board(fens[0]).ExportFEN() == fens[0]
+    finally:
+        SetFENCacheSize(cacheSize)
@@ -0,0 +1,75 @@
+import pytest
+from conftest import sampleGames
+from PGNReader.filters import GameFilter, BaseTime
+from PGNReader.gameindex import GameIndex
+from PGNReader.pgn import ReadGames, ReadGameOffsets
+
+
+def FastTimeControl(timeControl):
+    """Module level predicate, which has a stable name in the filter settings."""
+    return timeControl.startswith('180')
+
+
+def _Events(pgnFile, gameFilter):
+    return [game.tags['Event'] for game in ReadGames(pgnFile, gameFilter)]
+
+
+def test_BaseTime():
+    assert BaseTime('600+5') == 600
+    assert BaseTime('40/7200:3600') == 7200
+    assert BaseTime('-') == None
+    assert BaseTime('?') == None
+
+
+@pytest.mark.parametrize('options,events', [
+    ({}, ['Scholar', 'Castles', 'Promotion', 'Broken']),
+    ({'minElo': 1450}, ['Castles', 'Promotion']),
+    ({'minElo': 1450, 'eloMode': 'either'}, ['Scholar', 'Castles', 'Promotion']),
+    ({'minElo': 1450, 'maxElo': 2000, 'eloMode': 'average'}, ['Scholar', 'Promotion']),
+    ({'results': ('1-0', '0-1')}, ['Scholar', 'Promotion']),
+    ({'timeControls': ['180+2']}, ['Castles']),
+    ({'timeControls': FastTimeControl}, ['Castles']),
+    ({'minBaseTime': 300}, ['Scholar', 'Promotion']),
+    ({'event': 'prom'}, ['Promotion']),
+    ({'eco': 'B'}, ['Castles', 'Promotion']),
+    ({'eco': 'C00-C99'}, ['Scholar']),
+    ({'eco': ['B01', 'C2']}, ['Scholar', 'Promotion']),
+    ({'tags': {'White': 'E'}}, ['Promotion']),
+    ({'tags': {'Black': lambda name: name in 'BDH'}}, ['Scholar', 'Castles', 'Broken']),
+])
+def test_GameFilter(pgnFile, options, events):
+    gameFilter = GameFilter(**options)
+    assert _Events(pgnFile, gameFilter) == events
+    assert gameFilter.matched == len(events)
+    assert gameFilter.rejected == len(sampleGames) + 1 - len(events)
+    assert [game.tags['Event'] for _, _, game in ReadGameOffsets(pgnFile, 0, GameFilter(**options))] == events
+    with GameIndex(pgnFile) as index:
+        assert [index.Tags(number)['Event'] for number in index.Filter(GameFilter(**options))] == events
+
+
+def test_GameFilterInvalid():
+    with pytest.raises(ValueError):
+        GameFilter(eloMode='median')
+    with pytest.raises(ValueError):
+        GameFilter(eco='Z00')
+
+
+def test_Settings():
+    settings = GameFilter(minElo=2000, results=['1-0', '0-1'], timeControls=FastTimeControl,
+                          tags={'Site': 'x'}).Settings()
+    assert settings['minElo'] == 2000
+    assert settings['results'] == ['0-1', '1-0']
+    assert settings['timeControls'] == FastTimeControl.__module__ + '.FastTimeControl'
+    assert settings == GameFilter(minElo=2000, results=['0-1', '1-0'], timeControls=FastTimeControl,
+                                  tags={'Site': 'x'}).Settings()
+    # Any iterable of ECO codes gives the same json settings
+    assert GameFilter(eco=('C20', 'B')).Settings()['eco'] == ['B', 'C20']
+    assert GameFilter(eco=iter(['B', 'C20'])).Settings() == GameFilter(eco=['C20', 'B']).Settings()
+    assert GameFilter(eco='B').Settings()['eco'] == 'B'
+
+    def Nested(value):
+        return True
+
+    for predicate in (lambda value: True, Nested):
+        with pytest.raises(ValueError):
+            GameFilter(event=predicate).Settings()
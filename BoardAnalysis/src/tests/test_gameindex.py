@@ -0,0 +1,54 @@
+import pytest
+from conftest import sampleGames
+from PGNReader.game import Replay
+from PGNReader.gameindex import GameIndex, BuildIndex, IndexFileName
+from PGNReader.pgn import ReadGames
+
+
+def test_GameIndex(pgnFile):
+    games = list(ReadGames(pgnFile))
+    with GameIndex(pgnFile) as index:
+        assert len(index) == len(games)
+        assert [game.moves for game in index.Games()] == [game.moves for game in games]
+        assert index.Tags(1)['Event'] == 'Castles'
+        assert index.Find(ECO='B02') == [1]
+        assert index.Find(WhiteElo=lambda elo: elo.isdigit() and int(elo) >= 1800) == [1, 2]
+        with pytest.raises(ValueError):
+            index.Find(Opening='Sicilian')
+
+
+@pytest.mark.parametrize('length', [0, 3, 10, 40, -1])
+def test_GameIndexDamaged(pgnFile, length):
+    # A truncated index (or one with bytes left over) is rebuilt instead of failing or giving wrong games
+    indexFile = BuildIndex(pgnFile)
+    with open(indexFile, "rb") as inputFile:
+        data = inputFile.read()
+    with open(indexFile, "wb") as outputFile:
+        outputFile.write(data[:length] if length >= 0 else data + b'\0')
+
+    with GameIndex(pgnFile) as index:
+        assert len(index) == len(sampleGames) + 1
+        assert index.Game(2).moves == list(ReadGames(pgnFile))[2].moves
+    with open(indexFile, "rb") as inputFile:
+        assert inputFile.read() == data
+
+
+def test_GameIndexNotIndex(pgnFile):
+    with open(IndexFileName(pgnFile), "wb") as outputFile:
+        outputFile.write(b'something else')
+    with pytest.raises(ValueError):
+        GameIndex(pgnFile)
+
+
+def test_GameIndexNoBuild(pgnFile):
+    with pytest.raises(ValueError):
+        GameIndex(pgnFile, build=False)
+
+
+def test_ReadGame(pgnFile):
+    replay = Replay()
+    replay.ReadGame(pgnFile, 2)
+    assert replay.BoardPositions()[-1] == sampleGames[2][2]
+    with GameIndex(pgnFile) as index:
+        replay.ReadGame(index, 0)
+    assert replay.BoardPositions()[-1] == sampleGames[0][2]
@@ -0,0 +1,67 @@
+import pytest
+from conftest import sampleGames, PGNText
+from PGNReader.board import Board, PackMove, UnpackMove, nullMove, promoteToBishopFlag
+from PGNReader.diagnostics import ErrorReport
+from PGNReader.game import Replay
+from PGNReader.movegen import GenerateMoves
+from PGNReader.packedgames import PackedGames
+from PGNReader.pgn import ReadGames
+from test_board import fens
+
+
+@pytest.mark.parametrize('fen', fens)
+def test_PackMove(fen):
+    board = Board(fen)
+    for move in GenerateMoves(board):
+        packed = PackMove(*move)
+        assert 0 <= packed < 1 << 16
+        assert packed != nullMove
+        assert UnpackMove(packed) == move
+
+        board.MakePackedMove(packed)
+        after = board.ExportFEN()
+        board.UnmakeMove()
+        board.MakeMove(*move)
+        assert board.ExportFEN() == after
+        board.UnmakeMove()
+
+    assert UnpackMove(PackMove(63, 56, promoteToBishopFlag)) == (63, 56, promoteToBishopFlag)
+
+
+def test_PackedGames(pgnFile):
+    errors = ErrorReport()
+    games = list(ReadGames(pgnFile))
+    packed = PackedGames(games, errors=errors)
+    assert len(packed) == len(games)
+    assert len(errors) == 1
+
+    for number, (_, _, finalFEN) in enumerate(sampleGames):
+        replay = Replay()
+        replay.LoadGame(games[number])
+        assert packed.Replay(number) == replay.BoardPositions()
+        assert packed.Replay(number)[-1] == finalFEN
+        assert packed.Moves(number) == replay.PackedMoves()
+        assert list(packed.Positions(number, [2, 4, 1000])) == [(2, replay.BoardPositions()[2]),
+                                                                (4, replay.BoardPositions()[4])]
+        # The SAN generated from the packed moves is the game's own, apart from check marks that PGN leaves out
+        game = packed.Game(number)
+        assert [move.rstrip('+') for move in game.moves] == [move.rstrip('+') for move in games[number].moves]
+        assert game.tags == games[number].tags
+
+    # The broken game keeps the moves before the one that could not be resolved
+    assert packed.MoveCount(len(sampleGames)) == 4
+    assert packed.Memory() == 2*len(packed.moves) + 8*len(packed.offsets)
+
+
+def test_PackedGamesStartFEN(tmp_path):
+    start = '4k3/8/8/8/8/8/4P3/4K3 w - - 0 1'
+    path = tmp_path / 'fen.pgn'
+    path.write_text(PGNText([({'FEN': start, 'SetUp': '1'}, '1. e4 Kd7 2. e5 *')]))
+    packed = PackedGames(ReadGames(str(path)), tags=False)
+    assert packed.Replay(0)[0] == start
+    assert packed.Replay(0)[-1] == '8/3k4/8/4P3/8/8/8/4K3 b - - 0 2'
+    assert packed.Game(0).tags == {'FEN': start}
+    board = Board(start)
+    for move in packed.Moves(0):
+        board.MakeMove(*UnpackMove(move))
+    assert board.ExportFEN() == packed.Replay(0)[-1]
@@ -0,0 +1,25 @@
+from PGNReader.board import Board
+from PGNReader.movegen import GenerateMoves, Perft
+from PGNReader.perft import CheckReference, RunSuite, referencePositions
+
+
+def test_CheckReference():
+    assert CheckReference(3) == []
+
+
+def test_RunSuite():
+    fens = [fen for fen, _ in referencePositions]
+    result = RunSuite(fens, 2)
+    assert result["positions"] == len(fens)
+    assert result["nodes"] == sum(expected[1] for _, expected in referencePositions)
+    assert [nodes for _, nodes in result["results"]] == [expected[1] for _, expected in referencePositions]
+
+
+def test_PerftLeavesBoard():
+    fen = referencePositions[1][0]
+    board = Board(fen)
+    key = board.ZobristKey()
+    Perft(board, 2)
+    assert board.ExportFEN() == fen
+    assert board.ZobristKey() == key
+    assert len(GenerateMoves(board)) == referencePositions[1][1][0]
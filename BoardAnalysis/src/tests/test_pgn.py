@@ -0,0 +1,74 @@
+import io
+from conftest import sampleGames
+from PGNReader.game import Replay
+from PGNReader.pgn import ReadGames, ReadGameOffsets, ParseMovetext, ParseTags
+
+
+def test_ReadGames(pgnFile):
+    games = list(ReadGames(pgnFile))
+    assert len(games) == len(sampleGames) + 1
+    assert games[0].tags['Event'] == 'Scholar'
+    assert games[0].moves == ['e4', 'e5', 'Bc4', 'Nc6', 'Qh5', 'Nf6', 'Qxf7#']
+    assert games[0].result == '1-0'
+    assert games[0].winner == 'w'
+    assert games[1].winner == 'draw'
+    assert games[2].winner == 'b'
+    assert games[3].winner == None
+
+    with open(pgnFile, "r") as pgnText:
+        assert [game.moves for game in ReadGames(pgnText)] == [game.moves for game in games]
+
+
+def test_ReadGameOffsets(pgnFile):
+    games = list(ReadGames(pgnFile))
+    offsets = list(ReadGameOffsets(pgnFile))
+    assert [game.moves for _, _, game in offsets] == [game.moves for game in games]
+    assert offsets[0][0] == 0
+    assert all(offsets[number][1] == offsets[number + 1][0] for number in range(len(offsets) - 1))
+    # Reading from the end of a game continues with the next one
+    assert [game.moves for _, _, game in ReadGameOffsets(pgnFile, offsets[0][1])] == \
+        [game.moves for game in games[1:]]
+
+
+def test_ParseMovetext():
+    moves, result = ParseMovetext('1. e4 {best by test} e5 2. Nf3 $1 (2. f4 exf4 (2... d5)) 2... Nc6; comment\n'
+                                  '3. Bb5 a6 0-1')
+    assert moves == ['e4', 'e5', 'Nf3', 'Nc6', 'Bb5', 'a6']
+    assert result == '0-1'
+    assert ParseMovetext('1. d4 (1. e4') == (['d4'], None)
+
+
+def test_EnPassantMarker(tmp_path):
+    # e.p. is dropped whether or not it is separated from the capture
+    text = '1. e4 Nf6 2. e5 d5 3. exd6 e.p. cxd6 4. d4 Nc6 5. d5 e5 6. dxe6e.p. *'
+    assert ParseMovetext(text) == (['e4', 'Nf6', 'e5', 'd5', 'exd6', 'cxd6', 'd4', 'Nc6', 'd5', 'e5', 'dxe6'], '*')
+
+    path = tmp_path / 'ep.pgn'
+    path.write_text('[Event "En passant"]\n\n' + text + '\n')
+    replay = Replay(str(path))
+    assert replay.errorPly == None
+    assert replay.BoardPositions()[-1] == 'r1bqkb1r/pp3ppp/2npPn2/8/8/8/PPP2PPP/RNBQKBNR b KQkq - 0 6'
+
+
+def test_ReadGamesEncoding(tmp_path):
+    # Bytes that are not UTF-8 are replaced instead of stopping the read, whatever the locale's encoding
+    path = tmp_path / 'latin1.pgn'
+    path.write_bytes('[Event "Caf\u00e9"]\n[White "G\u00f6del"]\n\n1. e4 e5 *\n'.encode('latin-1') +
+                     '[Event "Z\u00fcrich"]\n\n1. d4 *\n'.encode('utf-8'))
+    games = list(ReadGames(str(path)))
+    assert [game.tags['Event'] for game in games] == ['Caf\ufffd', 'Z\u00fcrich']
+    assert games[0].tags['White'] == 'G\ufffddel'
+    assert [game.moves for game in games] == [['e4', 'e5'], ['d4']]
+
+
+def test_ParseTags():
+    tags = {}
+    ParseTags('[Event "A \\"quoted\\" name"] [Site "x"]', tags)
+    assert tags == {'Event': 'A "quoted" name', 'Site': 'x'}
+
+
+def test_GamesWithoutTags():
+    text = '1. e4 e5 *\n\n[Event "Second"]\n\n1. d4 d5 1/2-1/2\n'
+    games = list(ReadGames(io.StringIO(text)))
+    assert [(game.tags, game.moves, game.result) for game in games] == \
+        [({}, ['e4', 'e5'], '*'), ({'Event': 'Second'}, ['d4', 'd5'], '1/2-1/2')]
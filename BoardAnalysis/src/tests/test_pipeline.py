@@ -0,0 +1,88 @@
+import asyncio
+import json
+import threading
+import time
+import pytest
+from conftest import sampleGames, brokenGame, PGNText
+from PGNReader.MoveExport import MoveExporter
+from PGNReader.pipeline import Pipeline, RunPipeline
+from PGNReader.sampling import Sampler
+from PGNReader.writers import ReadNDJSON
+
+
+@pytest.fixture
+def pgnDirectory(tmp_path):
+    directory = tmp_path / 'pgn'
+    directory.mkdir()
+    (directory / 'a.pgn').write_text(PGNText(2*sampleGames + [brokenGame]))
+    (directory / 'b.pgn').write_text(PGNText(sampleGames))
+    return directory
+
+
+def _Sampler():
+    return Sampler('uniform', count=2, seed=3)
+
+
+def _Key(entry):
+    return json.dumps(entry, sort_keys=True)
+
+
+@pytest.mark.parametrize('chunksize', [1, 2, 16])
+def test_Ordered(tmp_path, pgnDirectory, chunksize):
+    # The same entries in the same order as LoadGames
+    expected = str(tmp_path / 'expected.ndjson')
+    MoveExporter(_Sampler()).LoadGames(str(pgnDirectory), expected, chunksize=chunksize, format='ndjson')
+    outfile = str(tmp_path / 'out.ndjson')
+    errorReport = str(tmp_path / 'errors.ndjson')
+    report = RunPipeline(str(pgnDirectory), outfile, sampler=_Sampler(), workers=2, chunksize=chunksize,
+                         queueSize=1, ordered=True, errorReport=errorReport)
+    assert list(ReadNDJSON(outfile)) == list(ReadNDJSON(expected))
+
+    stages = {stage["stage"]: stage for stage in report["stages"]}
+    assert stages["reader"]["items"] == stages["workers"]["items"] == 3*len(sampleGames) + 1
+    assert stages["writer"]["items"] == len(list(ReadNDJSON(expected)))
+    assert [record["move"] for record in ReadNDJSON(errorReport)] == ['Ke3']
+    assert report["errors"] == {'move': 1}
+
+
+def test_Unordered(tmp_path, pgnDirectory):
+    expected = str(tmp_path / 'expected.ndjson')
+    MoveExporter(_Sampler()).LoadGames(str(pgnDirectory), expected, chunksize=1, format='ndjson')
+    outfile = str(tmp_path / 'out.ndjson')
+    RunPipeline([str(pgnDirectory / 'a.pgn'), str(pgnDirectory / 'b.pgn')], outfile, sampler=_Sampler(),
+                workers=3, chunksize=1)
+    assert sorted(map(_Key, ReadNDJSON(outfile))) == sorted(map(_Key, ReadNDJSON(expected)))
+
+
+def test_Format(tmp_path, pgnDirectory):
+    with pytest.raises(ValueError):
+        RunPipeline(str(pgnDirectory), str(tmp_path / 'out.json'), format='json', workers=1)
+
+
+def test_Follow(tmp_path, pgnDirectory):
+    # A following pipeline picks up files as they arrive and finishes them when stopped
+    incoming = tmp_path / 'incoming'
+    incoming.mkdir()
+    outfile = str(tmp_path / 'out.ndjson')
+    pipeline = Pipeline(str(incoming), outfile, sampler=Sampler('nth', minPly=0, every=1), workers=1, chunksize=2,
+                        follow=True, pollInterval=0.02)
+    thread = threading.Thread(target=asyncio.run, args=(pipeline.Run(),))
+    thread.start()
+    try:
+        (incoming / 'a.pgn').write_text(PGNText(sampleGames))
+        (incoming / 'notes.txt').write_text(PGNText(sampleGames))
+        deadline = time.monotonic() + 30
+        while pipeline.stats["reader"].items < len(sampleGames) and time.monotonic() < deadline:
+            time.sleep(0.02)
+        (incoming / 'b.pgn').write_text(PGNText([brokenGame]))
+        while pipeline.stats["reader"].items < len(sampleGames) + 1 and time.monotonic() < deadline:
+            time.sleep(0.02)
+        assert thread.is_alive()
+    finally:
+        pipeline.Stop()
+        thread.join(30)
+    assert not thread.is_alive()
+
+    events = [entry['tags']['Event'] for entry in ReadNDJSON(outfile)]
+    assert sorted(set(events)) == sorted([tags['Event'] for tags, _, _ in sampleGames] + ['Broken'])
+    assert len(pipeline.errors) == 1
@@ -0,0 +1,104 @@
+import pytest
+from conftest import sampleGames, brokenGame, PGNText
+from PGNReader.board import PackedFEN, packedSize
+from PGNReader.diagnostics import ErrorReport
+from PGNReader.game import Replay
+from PGNReader.MoveExport import MoveExporter
+from PGNReader.pgn import ReadGames
+from PGNReader.positioncache import PositionCache, GameKey
+from PGNReader.sampling import Sampler
+
+
+@pytest.fixture
+def games(pgnFile):
+    return list(ReadGames(pgnFile))
+
+
+def _Size(game):
+    return (len(game.moves) + 1)*packedSize
+
+
+def test_Positions(tmp_path, games):
+    with PositionCache(str(tmp_path / 'cache.db')) as cache:
+        for game in games[:len(sampleGames)]:
+            positions, errorPly = cache.Positions(game)
+            assert errorPly == None
+            replay = Replay()
+            replay.LoadGame(game)
+            assert [PackedFEN(positions, offset) for offset in range(0, len(positions), packedSize)] == \
+                replay.BoardPositions()
+
+        errors = ErrorReport()
+        positions, errorPly = cache.Positions(games[-1], errors)
+        assert errorPly == 4
+        assert len(positions) == 5*packedSize
+        assert [record["move"] for record in errors] == ['Ke3']
+        assert (cache.hits, cache.misses) == (0, len(games))
+
+    with PositionCache(str(tmp_path / 'cache.db')) as cache:
+        assert len(cache) == len(games)
+        assert cache.Size() == sum(_Size(game) for game in games[:len(sampleGames)]) + 5*packedSize
+        errors = ErrorReport()
+        for game in games:
+            cache.Positions(game, errors)
+        assert (cache.hits, cache.misses) == (len(games), 0)
+        # The error of a cached game is reported again
+        assert len(errors) == 1
+
+
+def test_GameKey(games):
+    # Only the start position and moves identify a game
+    game = games[0]
+    renamed = type(game)(dict(game.tags, Event='Other'), game.moves, game.result)
+    assert GameKey(renamed) == GameKey(game)
+    assert GameKey(games[1]) != GameKey(game)
+    started = type(game)(dict(game.tags, FEN='4k3/8/8/8/8/8/4P3/4K3 w - - 0 1'), game.moves, game.result)
+    assert GameKey(started) != GameKey(game)
+
+
+def test_LeastRecentlyUsed(tmp_path, games):
+    scholar, castles, promotion = games[:3]
+    maxBytes = _Size(scholar) + _Size(castles) + _Size(promotion) - 1
+    with PositionCache(str(tmp_path / 'cache.db'), maxBytes=maxBytes, commitGames=1) as cache:
+        cache.Positions(scholar)
+        cache.Positions(castles)
+        # Using the first game makes the second one the least recently used
+        cache.Positions(scholar)
+        cache.Positions(promotion)
+        assert cache.Get(GameKey(castles)) == None
+        assert cache.Get(GameKey(scholar)) != None
+        assert cache.Get(GameKey(promotion)) != None
+        assert cache.Size() == _Size(scholar) + _Size(promotion)
+        assert cache.Size() <= maxBytes
+
+
+def test_MaxBytes(tmp_path, games):
+    maxBytes = 2*_Size(games[1])
+    with PositionCache(str(tmp_path / 'cache.db'), maxBytes=maxBytes, commitGames=2) as cache:
+        for _ in range(3):
+            for game in games:
+                cache.Positions(game)
+                assert cache.Size() <= maxBytes
+    with PositionCache(str(tmp_path / 'cache.db'), maxBytes=maxBytes) as cache:
+        assert 0 < cache.Size() <= maxBytes
+        cache.Clear()
+        assert len(cache) == 0
+        assert cache.Size() == 0
+
+
+def test_Exporter(tmp_path, pgnFile):
+    # The cached positions give the same entries as replaying the games, whatever the sampler
+    for strategy in ('uniform', 'nth', 'phase'):
+        expected = list(MoveExporter(Sampler(strategy, count=3, seed=5, minPly=0, every=2)).ProcessFile(pgnFile))
+        for _ in range(2):
+            with PositionCache(str(tmp_path / 'cache.db')) as cache:
+                exporter = MoveExporter(Sampler(strategy, count=3, seed=5, minPly=0, every=2), positionCache=cache)
+                assert list(exporter.ProcessFile(pgnFile)) == expected
+
+
+def test_Version(tmp_path):
+    path = str(tmp_path / 'cache.db')
+    with PositionCache(path) as cache:
+        cache._SetInfo('version', 0)
+    with pytest.raises(ValueError):
+        PositionCache(path)
@@ -0,0 +1,40 @@
+from conftest import sampleGames
+from PGNReader.board import Board, startFEN
+from PGNReader.game import Replay
+from PGNReader.pgn import ReadGames
+from PGNReader.positionindex import PositionIndex
+
+
+def test_PositionIndex(tmp_path, pgnFile):
+    games = list(ReadGames(pgnFile))
+    path = str(tmp_path / 'positions.db')
+    with PositionIndex(path) as index:
+        counts = [index.AddGame('game' + str(number), game) for number, game in enumerate(games)]
+    assert counts == [len(game.moves) + 1 for game in games[:len(sampleGames)]] + [5]
+
+    with PositionIndex(path) as index:
+        # Every game starts from the start position
+        assert sorted(index.GamesForFEN(startFEN)) == [('game' + str(number), 0) for number in range(len(games))]
+        # 1. e4 is played in every game
+        afterE4 = Board('rnbqkbnr/pppppppp/8/8/4P3/8/PPPP1PPP/RNBQKBNR b KQkq e3 0 1').ZobristKey()
+        assert sorted(index.Games(afterE4)) == [('game' + str(number), 1) for number in range(len(games))]
+
+        for number, (_, _, finalFEN) in enumerate(sampleGames):
+            replay = Replay()
+            replay.LoadGame(games[number])
+            assert index.GamesForFEN(finalFEN) == [('game' + str(number), replay.MoveCount())]
+
+        assert index.Contains(afterE4)
+        assert not index.Contains(Board('4k3/8/8/8/8/8/8/4K3 w - - 0 1').ZobristKey())
+        keys = list(index.UniquePositions())
+        assert len(keys) == len(set(keys))
+        assert afterE4 in keys and all(0 <= key < 1 << 64 for key in keys)
+
+
+def test_Add(tmp_path):
+    # Keys with the top bit set are stored as signed sqlite integers and come back unchanged
+    with PositionIndex(str(tmp_path / 'positions.db')) as index:
+        index.Add((1 << 64) - 1, 'high', 3)
+        index.Add(5, 'low', 4)
+        assert index.Games((1 << 64) - 1) == [('high', 3)]
+        assert sorted(index.UniquePositions()) == [5, (1 << 64) - 1]
@@ -0,0 +1,86 @@
+import pytest
+from conftest import sampleGames
+from PGNReader.board import startFEN
+from PGNReader.diagnostics import ErrorReport
+from PGNReader.game import Replay
+from PGNReader.MoveExport import MoveExporter
+from PGNReader.pgn import ReadGames
+from PGNReader.prefixtrie import PrefixTrie, BatchReplayer, _Node
+from PGNReader.sampling import Sampler
+
+
+@pytest.fixture
+def games(pgnFile):
+    return list(ReadGames(pgnFile))
+
+
+def _Positions(game):
+    replay = Replay()
+    replay.LoadGame(game)
+    return replay.BoardPositions()
+
+
+@pytest.mark.parametrize('maxDepth', [0, 3, 20])
+def test_BatchReplayer(games, maxDepth):
+    replayer = BatchReplayer(PrefixTrie(maxDepth=maxDepth))
+    for _ in range(2):
+        for game in games[:len(sampleGames)]:
+            assert replayer.Replay(game) == _Positions(game)
+            assert replayer.errorPly == None
+            assert list(replayer.Positions(game, [1, 4, 1000])) == [(1, _Positions(game)[1]),
+                                                                    (4, _Positions(game)[4])]
+    # Every game starts with 1. e4 and the second pass finds the games cached up to maxDepth
+    assert replayer.pliesSkipped >= min(maxDepth, 1)*len(sampleGames)
+    assert replayer.games == 4*len(sampleGames)
+
+
+def test_Errors(games):
+    errors = ErrorReport()
+    replayer = BatchReplayer(errors=errors)
+    broken = games[-1]
+    for _ in range(2):
+        assert replayer.Replay(broken) == _Positions(broken)[:5]
+        assert replayer.errorPly == 4
+    assert [(record["ply"], record["move"]) for record in errors] == [(4, 'Ke3'), (4, 'Ke3')]
+
+
+def test_Path():
+    trie = PrefixTrie()
+    root = trie.Root(startFEN, startFEN)
+    e4 = trie.Add(root, 'e4', 'fen e4')
+    e5 = trie.Add(e4, 'e5', 'fen e5')
+    assert trie.Add(root, 'e4', 'other') is e4
+    assert trie.Path(startFEN, ['e4', 'e5', 'Nf3']) == [root, e4, e5]
+    assert trie.Path(startFEN, ['d4']) == [root]
+    assert trie.Path('8/8/8/8/8/8/8/8 w - - 0 1', ['e4']) == []
+    assert len(trie) == 3
+    trie.Clear()
+    assert len(trie) == 0 and trie.memory == 0
+
+
+def test_Eviction():
+    # Room for about four nodes
+    nodeSize = _Node('x'*50).size
+    trie = PrefixTrie(maxMemory=4*nodeSize + nodeSize // 2)
+    root = trie.Root(startFEN, 'x'*50)
+    e4 = trie.Add(root, 'e4', 'x'*50)
+    d4 = trie.Add(root, 'd4', 'x'*50)
+    e5 = trie.Add(e4, 'e5', 'x'*50)
+    # d4 is the least recently used leaf
+    c4 = trie.Add(root, 'c4', 'x'*50)
+    assert trie.memory <= trie.maxMemory
+    assert set(root.children) == {'e4', 'c4'}
+    assert d4.parent == None
+    # A lookup makes the path recently used, so the next node added evicts c4
+    assert trie.Path(startFEN, ['e4', 'e5']) == [root, e4, e5]
+    trie.Add(e5, 'Nf3', 'x'*50)
+    assert set(root.children) == {'e4'}
+    assert len(trie) == 4
+
+
+def test_Exporter(pgnFile):
+    # The same entries with and without the trie
+    expected = list(MoveExporter(Sampler('uniform', count=3, seed=2)).ProcessFile(pgnFile))
+    exporter = MoveExporter(Sampler('uniform', count=3, seed=2), prefixMemory=1 << 20)
+    assert list(exporter.ProcessFile(pgnFile)) == expected
+    assert [record["move"] for record in exporter.errors] == ['Ke3']
@@ -0,0 +1,77 @@
+import pytest
+from PGNReader import profiling, pgn, game
+from PGNReader.board import Board
+from PGNReader.MoveExport import MoveExporter
+from PGNReader.sampling import Sampler
+from PGNReader.search import Search
+
+
+@pytest.fixture
+def profiler():
+    profiling.Reset()
+    yield profiling
+    profiling.Disable()
+    profiling.Reset()
+
+
+def test_EnableDisable(profiler, pgnFile):
+    originals = (Board.MakeMove, Search.GetMoveSquares, pgn.ReadGames, game.ReadGames)
+    profiler.Enable()
+    assert profiler.Enabled()
+    assert Board.MakeMove is not originals[0]
+    assert Search.GetMoveSquares is not originals[1]
+    # Functions are replaced in the modules that imported them as well
+    assert pgn.ReadGames is not originals[2]
+    assert game.ReadGames is pgn.ReadGames
+    # Enabling twice does not wrap twice
+    wrapper = Board.MakeMove
+    profiler.Enable()
+    assert Board.MakeMove is wrapper
+
+    entries = list(MoveExporter(Sampler('nth', minPly=0, every=1)).ProcessFile(pgnFile))
+    profiler.Disable()
+    assert not profiler.Enabled()
+    assert (Board.MakeMove, Search.GetMoveSquares, pgn.ReadGames, game.ReadGames) == originals
+
+    counters = profiler.Summary()["counters"]
+    assert counters["pgn.ReadGames"]["calls"] == 5
+    assert counters["MoveExporter.SampleGame"]["calls"] == 4
+    # Every sampled ply but the start positions needs a move
+    assert counters["Board.MakeMove"]["calls"] >= len(entries) - 4
+    assert counters["Board.MakeMove"]["stage"] == 'move'
+    assert set(profiler.Summary()["stages"]) >= {'io', 'san', 'move', 'fen', 'game'}
+
+    # Nothing is counted once disabled
+    calls = counters["Board.MakeMove"]["calls"]
+    Board().MakeMove(12, 28)
+    assert profiler.Summary()["counters"]["Board.MakeMove"]["calls"] == calls
+
+
+def test_SlowGames(profiler, pgnFile):
+    profiler.Enable()
+    list(MoveExporter(Sampler('nth', minPly=0, every=1)).ProcessFile(pgnFile))
+    profiler.Disable()
+    slowest = profiler.Summary()["slowestGames"]
+    assert len(slowest) == 4
+    assert [game["seconds"] for game in slowest] == sorted((game["seconds"] for game in slowest), reverse=True)
+    assert {game["tags"]["Event"] for game in slowest} == {'Scholar', 'Castles', 'Promotion', 'Broken'}
+    assert 'slow game' in profiler.FormatSummary()
+
+
+def test_Timer(profiler):
+    for _ in range(3):
+        with profiler.Timer('block', 'custom'):
+            pass
+    counter = profiler.Summary()["counters"]["block"]
+    assert counter["calls"] == 3 and counter["stage"] == 'custom'
+    assert 'custom block' in profiler.FormatSummary()
+
+
+def test_CProfile(profiler, tmp_path):
+    with pytest.raises(ValueError):
+        profiler.DumpStats(str(tmp_path / 'export.pstats'))
+    profiler.Enable(cprofile=True)
+    Board().MakeMove(12, 28)
+    profiler.Disable()
+    profiler.DumpStats(str(tmp_path / 'export.pstats'))
+    assert (tmp_path / 'export.pstats').stat().st_size > 0
@@ -0,0 +1,103 @@
+import pytest
+from conftest import sampleGames, PGNText
+from PGNReader.board import Board, startFEN, pawnTwoUpFlag
+from PGNReader.diagnostics import ErrorReport
+from PGNReader.game import Replay, PlayMoves
+from PGNReader.MoveExport import MoveExporter
+from PGNReader.pgn import ReadGames
+from PGNReader.sampling import Sampler
+
+
+@pytest.fixture
+def games(pgnFile):
+    return list(ReadGames(pgnFile))
+
+
+def test_PlayMoves(games):
+    board = Board()
+    errors = ErrorReport()
+    broken = games[-1]
+    played = [(ply, board.ExportFEN()) for ply, _ in PlayMoves(board, broken.moves, errors, broken.tags)]
+    assert [ply for ply, _ in played] == [0, 1, 2, 3]
+    assert played[1][1] == 'rnbqkbnr/pppp1ppp/8/4p3/4P3/8/PPPP1PPP/RNBQKBNR w KQkq e6 0 2'
+    assert [(record["ply"], record["move"]) for record in errors] == [(4, 'Ke3')]
+
+    # The moves can start later in the game, the plies count from firstPly
+    board = Board()
+    assert [move for _, move in PlayMoves(board, ['e4'])] == [(12, 28, pawnTwoUpFlag)]
+    assert [ply for ply, _ in PlayMoves(board, ['e5', 'Nf3'], firstPly=1)] == [1, 2]
+    assert board.ExportFEN() == played[2][1]
+
+
+@pytest.mark.parametrize('number', range(len(sampleGames)))
+def test_Replay(games, number):
+    replay = Replay()
+    replay.LoadGame(games[number])
+    finalFEN = sampleGames[number][2]
+
+    positions = replay.BoardPositions()
+    assert len(positions) == replay.MoveCount() + 1
+    assert positions[0] == startFEN
+    assert positions[-1] == finalFEN
+
+    replay.NextMove(replay.MoveCount())
+    assert replay.CurrentFEN() == finalFEN
+    replay.PreviousMove(3)
+    assert replay.CurrentFEN() == positions[-4]
+    replay.NextMove()
+    assert replay.CurrentFEN() == positions[-3]
+    replay.PreviousMove(replay.currentMove)
+    assert replay.CurrentFEN() == startFEN
+    # Going back past the start stays at the start
+    replay.NextMove(2)
+    assert replay.PreviousMove(5) == startFEN
+    assert replay.currentMove == 0
+    assert replay.PreviousMove() == startFEN
+    replay.NextMove()
+    assert replay.CurrentFEN() == positions[1]
+
+
+@pytest.mark.parametrize('number', range(len(sampleGames)))
+def test_Lazy(games, number):
+    eager = Replay()
+    eager.LoadGame(games[number])
+    positions = eager.BoardPositions()
+
+    lazy = Replay(lazy=True)
+    lazy.LoadGame(games[number])
+    # Nothing is resolved until it is asked for
+    assert len(lazy.BoardPositions()) == 1
+    lazy.NextMove(4)
+    assert lazy.CurrentFEN() == positions[4]
+    assert len(lazy.BoardPositions()) == 5
+    lazy.PreviousMove(2)
+    assert lazy.CurrentFEN() == positions[2]
+    for ply in range(3, lazy.MoveCount() + 1):
+        lazy.NextMove()
+        assert lazy.CurrentFEN() == positions[ply]
+    assert lazy.BoardPositions() == positions
+
+
+def test_ReadFile(pgnFile):
+    replay = Replay(pgnFile)
+    assert replay.MoveCount() == 7
+    assert replay.BoardPositions()[-1] == sampleGames[0][2]
+
+
+def test_BlackToMove(tmp_path):
+    # The side to move comes from the start position, not from the ply number
+    start = '4k3/4p3/8/8/8/8/4P3/4K3 b - - 0 30'
+    path = tmp_path / 'black.pgn'
+    path.write_text(PGNText([({'FEN': start, 'SetUp': '1'}, '30... e5 31. e4 Kd7 32. Kd2 *')]))
+    replay = Replay(str(path))
+    assert replay.BoardPositions() == [start, '4k3/8/8/4p3/8/8/4P3/4K3 w - e6 0 31',
+                                       '4k3/8/8/4p3/4P3/8/8/4K3 b - e3 0 31',
+                                       '8/3k4/8/4p3/4P3/8/8/4K3 w - - 1 32',
+                                       '8/3k4/8/4p3/4P3/8/3K4/8 b - - 2 32']
+    replay.NextMove(3)
+    assert replay.board.SideToMove() == 'w'
+    replay.PreviousMove(1)
+    assert replay.board.SideToMove() == 'b'
+
+    entries = list(MoveExporter(Sampler('nth', minPly=0, every=1)).ProcessFile(str(path)))
+    assert [entry['FEN'].split()[1] for entry in entries] == ['b', 'w', 'b', 'w']
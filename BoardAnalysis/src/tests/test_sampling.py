@@ -0,0 +1,78 @@
+import pytest
+from PGNReader.MoveExport import MoveExporter
+from PGNReader.sampling import Sampler, strategies
+
+
+def test_Uniform():
+    sampler = Sampler('uniform', count=5, seed=1, minPly=2)
+    for numMoves in range(4, 80):
+        plies = sampler.Plies(numMoves)
+        assert plies == sorted(set(plies))
+        assert len(plies) == min(5, numMoves - 2)
+        assert all(2 <= ply <= numMoves - 1 for ply in plies)
+
+
+def test_Nth():
+    assert Sampler('nth', minPly=2, every=10).Plies(35) == [2, 12, 22, 32]
+    assert Sampler('nth', minPly=0, every=3, count=1).Plies(7) == [0, 3, 6]
+
+
+def test_Phase():
+    sampler = Sampler('phase', count=4, seed=2, minPly=0)
+    for _ in range(20):
+        plies = sampler.Plies(60)
+        assert len(plies) == 4
+        # Two in the opening third, one in each of the others
+        assert [sum(low <= ply < low + 20 for ply in plies) for low in (0, 20, 40)] == [2, 1, 1]
+
+
+def test_SkipOpening():
+    sampler = Sampler('skipOpening', count=3, seed=3, openingPlies=20)
+    for numMoves in range(22, 60):
+        plies = sampler.Plies(numMoves)
+        assert len(plies) == min(3, numMoves - 20)
+        assert all(20 <= ply < numMoves for ply in plies)
+    assert sampler.Plies(20) == []
+
+
+@pytest.mark.parametrize('strategy', sorted(strategies))
+def test_ShortGames(strategy):
+    sampler = Sampler(strategy, count=3, seed=4, minPly=2)
+    assert sampler.Plies(0) == []
+    assert sampler.Plies(3) == []
+
+
+def test_UnknownStrategy():
+    with pytest.raises(ValueError):
+        Sampler('random')
+
+
+def test_Seed():
+    # Samplers with the same seed choose the same plies, different seeds do not
+    first = Sampler('uniform', count=3, seed=9)
+    second = Sampler('uniform', count=3, seed=9)
+    other = Sampler('uniform', count=3, seed=10)
+    firstPlies = [first.Plies(80) for _ in range(10)]
+    assert firstPlies == [second.Plies(80) for _ in range(10)]
+    assert firstPlies != [other.Plies(80) for _ in range(10)]
+
+
+def test_Fork():
+    sampler = Sampler('phase', count=6, seed=9, minPly=1, every=4, openingPlies=12)
+    fork = sampler.Fork(3)
+    assert (fork.strategy, fork.count, fork.minPly, fork.every, fork.openingPlies) == ('phase', 6, 1, 4, 12)
+    # Forks depend only on the seed and the index, not on what the parent sampled
+    sampler.Plies(50)
+    fresh = Sampler('phase', count=6, seed=9, minPly=1, every=4, openingPlies=12)
+    assert [sampler.Fork(3).Plies(50) for _ in range(5)] == [fresh.Fork(3).Plies(50) for _ in range(5)]
+    assert sampler.Fork(3).Plies(200) != sampler.Fork(4).Plies(200)
+    assert Sampler(seed=None).Fork(3).seed == None
+
+
+def test_MultipleSamples(pgnFile):
+    entries = list(MoveExporter(Sampler('uniform', count=3, seed=5)).ProcessFile(pgnFile))
+    plies = {}
+    for entry in entries:
+        plies.setdefault(entry['tags']['Event'], []).append(entry['move'])
+    assert all(len(gamePlies) == 3 and gamePlies == sorted(set(gamePlies))
+               for event, gamePlies in plies.items() if event != 'Broken')
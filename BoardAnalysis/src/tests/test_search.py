@@ -0,0 +1,115 @@
+import pytest
+from PGNReader.board import Board, noFlag, castleFlag, enPassantFlag, pawnTwoUpFlag, promoteToQueenFlag, \
+    promoteToKnightFlag, promoteToRookFlag, squareNames
+from PGNReader.movegen import GenerateMoves
+from PGNReader.perft import referencePositions
+from PGNReader.search import Search, ParseSAN, MoveToSAN
+
+
+def _Square(name):
+    return squareNames.index(name)
+
+
+# FEN, SAN and the expected (start, end, flag), None if the move can not be resolved
+moveCases = [
+    ('rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1', 'e4', ('e2', 'e4', pawnTwoUpFlag)),
+    ('rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1', 'e3', ('e2', 'e3', noFlag)),
+    ('rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1', 'Nf3', ('g1', 'f3', noFlag)),
+    ('rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1', 'e5', None),
+    ('rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1', 'Ke3', None),
+    ('rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1', 'Zz9', None),
+    # Pushes do not jump over a piece
+    ('rnbqkbnr/pppppppp/8/8/8/4N3/PPPPPPPP/R1BQKBNR w KQkq - 0 1', 'e4', None),
+    # The pawn to push is not on its start square
+    ('rnbqkbnr/pppp1ppp/8/4p3/8/8/PPPPPPPP/RNBQKBNR b KQkq - 0 1', 'e4', ('e5', 'e4', noFlag)),
+    # En passant
+    ('rnbqkbnr/ppp1p1pp/8/3pPp2/8/8/PPPP1PPP/RNBQKBNR w KQkq f6 0 3', 'exf6', ('e5', 'f6', enPassantFlag)),
+    ('rnbqkbnr/pppp1ppp/8/8/3Pp3/8/PPP1PPPP/RNBQKBNR b KQkq d3 0 2', 'exd3', ('e4', 'd3', enPassantFlag)),
+    # Promotions, by push and capture, for both sides
+    ('1r5k/P7/8/8/8/8/8/K7 w - - 0 1', 'a8=Q', ('a7', 'a8', promoteToQueenFlag)),
+    ('1r5k/P7/8/8/8/8/8/K7 w - - 0 1', 'axb8=N+', ('a7', 'b8', promoteToKnightFlag)),
+    ('7k/8/8/8/8/8/5p2/K5N1 b - - 0 1', 'fxg1=R', ('f2', 'g1', promoteToRookFlag)),
+    ('7k/8/8/8/8/8/5p2/K5N1 b - - 0 1', 'f1=Q+', ('f2', 'f1', promoteToQueenFlag)),
+    # A pawn on its own first rank is not mistaken for another square
+    ('7k/8/8/8/8/8/8/K1P5 w - - 0 1', 'c2', ('c1', 'c2', noFlag)),
+    ('7k/8/8/8/8/8/8/K7 w - - 0 1', 'b2', None),
+    # Castling
+    ('r3k2r/8/8/8/8/8/8/R3K2R w KQkq - 0 1', 'O-O', ('e1', 'g1', castleFlag)),
+    ('r3k2r/8/8/8/8/8/8/R3K2R b KQkq - 0 1', 'O-O-O', ('e8', 'c8', castleFlag)),
+    # Disambiguation by file, rank and square
+    ('7k/8/8/8/8/8/8/KR4R1 w - - 0 1', 'Rbd1', ('b1', 'd1', noFlag)),
+    ('7k/8/8/R7/8/8/8/KR5R w - - 0 1', 'R5a4', ('a5', 'a4', noFlag)),
+    ('7k/8/8/8/Q1Q5/8/Q7/K7 w - - 0 1', 'Qa4b3', ('a4', 'b3', noFlag)),
+    # Only one of the knights is not pinned, so SAN does not disambiguate
+    ('4k3/4r3/8/8/8/8/2N1N3/4K3 w - - 0 1', 'Nd4', ('c2', 'd4', noFlag)),
+    ('4k3/8/8/8/1b6/2N5/8/4K1N1 w - - 0 1', 'Ne2', ('g1', 'e2', noFlag)),
+    # Neither knight can block the check
+    ('4k3/8/8/8/8/2N3N1/8/4K2r w - - 0 1', 'Ne2', None),
+    # Pushes onto an occupied square, captures of own pieces and of empty squares that are not the ep square
+    ('rnbqkbnr/pppp1ppp/8/4p3/4P3/8/PPPP1PPP/RNBQKBNR w KQkq - 0 2', 'e5', None),
+    ('rnbqkbnr/pppp1ppp/8/4p3/4P3/8/PPPP1PPP/RNBQKBNR w KQkq - 0 2', 'Nd2', None),
+    ('rnbqkbnr/pppp1ppp/8/8/3Pp3/8/PPP1PPPP/RNBQKBNR b KQkq - 0 2', 'exd3', None),
+    ('rnbqkbnr/pppp1ppp/8/8/3Pp3/8/PPP1PPPP/RNBQKBNR b KQkq - 0 2', 'exf3', None),
+    ('rnbqkbnr/ppp1pppp/8/3p4/4P3/8/PPPP1PPP/RNBQKBNR w KQkq - 0 2', 'exd5', ('e4', 'd5', noFlag)),
+    # Promotion only on the last rank, and always there
+    ('1r5k/P7/8/8/8/8/8/K7 w - - 0 1', 'a8', None),
+    ('7k/8/8/8/8/P7/8/K7 w - - 0 1', 'a4=Q', None),
+    ('7k/8/8/8/8/8/8/K5N1 w - - 0 1', 'Nf3=Q', None),
+    # Castling needs the right, the king and rook on their start squares, empty squares between them and no
+    # attacked square on the king's path
+    ('r3k2r/8/8/8/8/8/8/R3K2R w Qkq - 0 1', 'O-O', None),
+    ('r3k2r/8/8/8/8/8/8/R4RK1 w KQkq - 0 1', 'O-O', None),
+    ('r3k2r/8/8/8/8/8/8/R3K3 w KQkq - 0 1', 'O-O', None),
+    ('r3k2r/8/8/8/8/8/8/RN2K2R w KQkq - 0 1', 'O-O-O', None),
+    ('r3k2r/8/8/8/8/8/8/R3K2R w KQkq - 0 1', 'O-O-O', ('e1', 'c1', castleFlag)),
+    ('r3k2r/8/8/8/8/8/5r2/R3K2R w KQkq - 0 1', 'O-O', None),
+    ('r3k2r/8/8/8/8/8/4r3/R3K2R w KQkq - 0 1', 'O-O-O', None),
+    ('r3k2r/8/8/8/8/8/6r1/R3K2R w KQkq - 0 1', 'O-O', None),
+    ('r3k2r/8/8/8/8/8/1r6/R3K2R w KQkq - 0 1', 'O-O-O', ('e1', 'c1', castleFlag)),
+]
+
+
+@pytest.mark.parametrize('fen,move,expected', moveCases)
+def test_GetMoveSquares(fen, move, expected):
+    result = Search(Board(fen)).GetMoveSquares(move)
+    if expected == None:
+        assert result == None
+    else:
+        assert result == (_Square(expected[0]), _Square(expected[1]), expected[2])
+
+
+def test_ParseSAN():
+    assert ParseSAN('Nbd7') == ('N', 1, None, _Square('d7'), noFlag)
+    assert ParseSAN('e8=Q#') == ('P', None, None, _Square('e8'), promoteToQueenFlag)
+    assert ParseSAN('O-O-O') == ('O', None, None, -2, castleFlag)
+    assert ParseSAN('') == None
+    assert ParseSAN('Xe4') == None
+
+
+def test_GetMove():
+    search = Search(Board('r3k2r/8/8/3pP3/8/8/1P6/R3K2R w KQkq d6 0 1'))
+    assert search.GetMove('exd6') == (('e', 5), ('d', 6), 'ep')
+    assert search.GetMove('O-O-O') == (('e', 1), ('c', 1), 'castle')
+    assert search.GetMove('b4') == (('b', 2), ('b', 4), None)
+    assert search.GetMove('b5') == None
+
+
+
+@pytest.mark.parametrize('fen', [fen for fen, _ in referencePositions] + [case[0] for case in moveCases])
+def test_MoveToSAN(fen):
+    # SAN of every legal move resolves back to the same move and leaves the board unchanged
+    board = Board(fen)
+    search = Search(board)
+    for move in GenerateMoves(board):
+        san = MoveToSAN(board, move)
+        assert search.GetMoveSquares(san) == move, san
+        assert board.ExportFEN() == fen
+        assert ('=' in san) == (move[2] >= promoteToQueenFlag)
+
+
+def test_MoveToSANCheck():
+    board = Board('r1bqkb1r/pppp1ppp/2n2n2/4p2Q/2B1P3/8/PPPP1PPP/RNB1K1NR w KQkq - 4 4')
+    assert MoveToSAN(board, (_Square('h5'), _Square('f7'), noFlag)) == 'Qxf7#'
+    board = Board('4k3/8/8/8/8/8/8/R3K3 w Q - 0 1')
+    assert MoveToSAN(board, (_Square('a1'), _Square('a8'), noFlag)) == 'Ra8+'
+    assert MoveToSAN(board, (_Square('e1'), _Square('c1'), castleFlag)) == 'O-O-O'
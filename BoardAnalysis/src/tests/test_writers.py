@@ -0,0 +1,83 @@
+import json
+import pytest
+from PGNReader.MoveExport import MoveExporter
+from PGNReader.sampling import Sampler
+from PGNReader.writers import NDJSONWriter, BinaryWriter, ReadNDJSON, ReadBinary, OpenWriter
+
+
+@pytest.fixture
+def entries(pgnFile):
+    entries = list(MoveExporter(Sampler('nth', minPly=0, every=3)).ProcessFile(pgnFile))
+    # Positions with en passant, castling rights and promoted pieces are among them
+    assert len(entries) > 10
+    return entries
+
+
+def test_NDJSON(tmp_path, entries):
+    path = str(tmp_path / 'out.ndjson')
+    with NDJSONWriter(path) as writer:
+        for entry in entries:
+            writer.Write(entry)
+    assert list(ReadNDJSON(path)) == entries
+
+
+def test_Binary(tmp_path, entries):
+    path = str(tmp_path / 'out.bin')
+    with BinaryWriter(path) as writer:
+        for entry in entries:
+            writer.Write(entry)
+    assert list(ReadBinary(path)) == entries
+
+    # Only the tags asked for are kept
+    tags = ('White', 'Opening')
+    with BinaryWriter(path, tags) as writer:
+        for entry in entries:
+            writer.Write(entry)
+    assert list(ReadBinary(path)) == [dict(entry, tags={'White': entry['tags']['White']}) for entry in entries]
+
+
+def test_OpenWriter(tmp_path, entries):
+    for format, writerType, Read in (('ndjson', NDJSONWriter, ReadNDJSON), ('binary', BinaryWriter, ReadBinary)):
+        path = str(tmp_path / ('out.' + format))
+        with OpenWriter(path, format) as writer:
+            assert type(writer) == writerType
+            writer.Write(entries[0])
+        assert list(Read(path)) == entries[:1]
+    # json is written as a whole list by MoveExporter, not streamed
+    for format in ('json', 'xml'):
+        with pytest.raises(ValueError):
+            OpenWriter(str(tmp_path / 'out'), format)
+
+
+def test_BinaryNotBinary(tmp_path):
+    path = tmp_path / 'out.bin'
+    path.write_bytes(b'nothing')
+    with pytest.raises(ValueError):
+        list(ReadBinary(str(path)))
+
+
+@pytest.mark.parametrize('fen', ['', 'rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP w KQkq - 0 1'])
+def test_BinaryMalformedFEN(tmp_path, entries, fen):
+    # The entry is rejected instead of being written with the previous entry's position
+    with BinaryWriter(str(tmp_path / 'out.bin')) as writer:
+        writer.Write(entries[0])
+        with pytest.raises(ValueError):
+            writer.Write(dict(entries[0], FEN=fen))
+
+
+@pytest.mark.parametrize('format', ['json', 'ndjson', 'binary'])
+def test_LoadPGN(tmp_path, pgnFile, entries, format):
+    outfile = str(tmp_path / ('out.' + format))
+    errorReport = str(tmp_path / 'errors.ndjson')
+    MoveExporter(Sampler('nth', minPly=0, every=3)).LoadPGN(pgnFile, outfile, format=format,
+                                                            errorReport=errorReport)
+
+    if format == 'json':
+        with open(outfile, "r") as outputFile:
+            written = json.load(outputFile)
+    elif format == 'ndjson':
+        written = list(ReadNDJSON(outfile))
+    else:
+        written = list(ReadBinary(outfile))
+    assert written == entries
+    assert [record['move'] for record in ReadNDJSON(errorReport)] == ['Ke3']